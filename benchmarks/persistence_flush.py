@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Compares how long a persistence flush takes, and how much memory the bot holds, with ``SessionPicklePersistence``
+and ``SqlitePersistence`` as the number of stored users grows.
+
+Every case runs in a fresh process. The sessions are loaded the way ``Application.initialize`` and
+``Application.process_update`` load them (all at once with ``SessionPicklePersistence``, on a user's first update with
+``SqlitePersistence``), then ``--dirty`` users change their session before each flush, which is driven the way
+``Application.update_persistence`` drives it: one ``update_user_data`` per touched user, all gathered at once.
+
+Usage:
+    python -m benchmarks.persistence_flush --users 1000 10000 100000 --dirty 50 --flushes 5
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import pickle
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from telegram.ext import BasePersistence
+
+from utils.context import Session, SessionUser
+from utils.persistence import SessionPicklePersistence, SqlitePersistence
+
+
+def build_session(user_id: int) -> Session:
+    return Session(
+        user=SessionUser(user_id=user_id, username=f"user{user_id}"),
+        language='en',
+        tag_editor={
+            'artist': 'Some Artist',
+            'title': f"Track {user_id}",
+            'album': 'Some Album',
+            'genre': 'Rock',
+            'year': '2024',
+            'art_path': f"/data/downloads/{user_id}/art.jpg",
+        },
+        bitrate_changer={},
+        music_path=f"/data/downloads/{user_id}/music.mp3",
+        music_duration=215,
+        art_path='',
+        new_art_path='',
+        current_module='',
+        music_message_id=1000 + user_id,
+    )
+
+
+def seed_pickle(path: Path, users: int) -> None:
+    with path.open('wb') as file:
+        pickle.dump({
+            'user_data': {user_id: build_session(user_id) for user_id in range(users)},
+            'chat_data': {},
+            'bot_data': {},
+            'callback_data': None,
+            'conversations': {},
+        }, file)
+
+
+async def measure(persistence: BasePersistence, users: int, dirty: int, flushes: int) -> list[float]:
+    user_data = await persistence.get_user_data()
+    durations = []
+
+    for flush in range(flushes):
+        for user_id in range(flush * dirty, (flush + 1) * dirty):
+            # Like ``Application.process_update``: the session is created if missing, then refreshed.
+            session = user_data.setdefault(user_id % users, Session())
+            await persistence.refresh_user_data(user_id % users, session)
+            session['music_duration'] += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(
+            persistence.update_user_data(user_id % users, user_data[user_id % users])
+            for user_id in range(flush * dirty, (flush + 1) * dirty)
+        ))
+        durations.append(time.perf_counter() - started_at)
+
+    await persistence.flush()
+
+    return durations
+
+
+async def import_pickle(persistence: SqlitePersistence) -> None:
+    await persistence.get_user_data()
+    await persistence.flush()
+
+
+def seed_case(backend: str, directory: str, users: int) -> None:
+    pickle_path = Path(directory) / 'persistence.pickle'
+    seed_pickle(pickle_path, users)
+
+    if backend == 'sqlite':
+        persistence = SqlitePersistence(Path(directory) / 'persistence.sqlite3', import_from=pickle_path)
+        asyncio.run(import_pickle(persistence))
+        pickle_path.unlink()
+
+
+def run_case(backend: str, directory: str, users: int, dirty: int, flushes: int) -> tuple[float, float, int]:
+    if backend == 'pickle':
+        stored_path = Path(directory) / 'persistence.pickle'
+        persistence = SessionPicklePersistence(filepath=stored_path)
+    else:
+        stored_path = Path(directory) / 'persistence.sqlite3'
+        persistence = SqlitePersistence(stored_path)
+
+    durations = asyncio.run(measure(persistence, users, dirty, flushes))
+    max_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return statistics.median(durations), max_rss_mib, stored_path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--dirty', type=int, default=50)
+    parser.add_argument('--flushes', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=['pickle', 'sqlite'], choices=['pickle', 'sqlite'])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+
+    for users in args.users:
+        for backend in args.backends:
+            with tempfile.TemporaryDirectory() as directory:
+                # Fresh processes for seeding and for every case, so the peak RSS only shows what the bot would hold.
+                with context.Pool(1) as pool:
+                    pool.apply(seed_case, (backend, directory, users))
+
+                with context.Pool(1) as pool:
+                    flush_seconds, max_rss_mib, file_size = pool.apply(
+                        run_case, (backend, directory, users, args.dirty, args.flushes)
+                    )
+
+            print(
+                f"{users:>8} users {backend:>7}: flush of {args.dirty} users {flush_seconds * 1000:9.1f} ms, "
+                f"peak RSS {max_rss_mib:7.1f} MiB, file {file_size / 1024 / 1024:7.1f} MiB"
+            )
+
+
+if __name__ == '__main__':
+    main()
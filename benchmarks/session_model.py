@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Compares the ``user_data`` of earlier versions, a dict serialized with ``pickle``, with :class:`utils.context.Session`
+serialized with ``Session.to_bytes``: the memory ``--users`` sessions hold, the size of a serialized session, and
+how long it takes to serialize ``--users`` of them, which is what ``SqlitePersistence`` does for every changed
+session on a flush.
+
+Usage:
+    python -m benchmarks.session_model --users 100000
+"""
+
+import argparse
+import pickle
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.persistence_flush import build_session
+from utils.context import Session
+
+
+def build_dict(user_id: int) -> dict:
+    return {key: value for key, value in build_session(user_id).items()}
+
+
+def measure(build: Callable[[int], object], encode: Callable[[object], bytes], users: int) -> tuple[float, int, float]:
+    tracemalloc.start()
+    sessions = [build(user_id) for user_id in range(users)]
+    memory, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started_at = time.perf_counter()
+    sizes = [len(encode(session)) for session in sessions]
+    encode_seconds = time.perf_counter() - started_at
+
+    return memory / users, sum(sizes) // users, encode_seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    args = parser.parse_args()
+
+    cases = {
+        'dict + pickle': (build_dict, lambda data: pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)),
+        'Session': (build_session, Session.to_bytes),
+    }
+
+    for name, (build, encode) in cases.items():
+        bytes_per_session, serialized_size, encode_seconds = measure(build, encode, args.users)
+
+        print(
+            f"{name:>14}: {bytes_per_session:7.0f} B in memory, {serialized_size:5} B serialized per session, "
+            f"{args.users} serialized in {encode_seconds * 1000:8.1f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Measures how handler throughput scales with the number of shard workers.
+
+Every simulated update burns a fixed amount of CPU in Python to stand in for handler work that holds the GIL (parsing,
+tag editing, rendering replies). The updates are routed with ``ShardRouter`` exactly like the front process does, and
+each worker reports back when it has handled one.
+
+Usage:
+    python -m benchmarks.sharded_dispatch --users 200 --updates-per-user 5 --handler-ms 5 --workers 1 2 4
+"""
+
+import argparse
+import functools
+import multiprocessing
+import time
+
+from telegram import Chat, Message, Update, User
+
+from utils.sharding import ShardRouter
+
+
+def build_updates(users: int, updates_per_user: int) -> list[Update]:
+    return [
+        Update(
+            update_id=sequence * users + user_id,
+            message=Message(
+                message_id=sequence,
+                date=None,
+                chat=Chat(id=user_id, type=Chat.PRIVATE),
+                from_user=User(id=user_id, first_name='User', is_bot=False),
+            ),
+        )
+        for sequence in range(updates_per_user)
+        for user_id in range(users)
+    ]
+
+
+def burn(rounds: int) -> None:
+    for _ in range(rounds):
+        sum(range(100))
+
+
+def calibrate(seconds: float) -> int:
+    """Get how many rounds of :func:`burn` take ``seconds`` of CPU time in this process."""
+    started_at = time.process_time()
+    burn(10_000)
+
+    return max(int(10_000 * seconds / (time.process_time() - started_at)), 1)
+
+
+def cpu_bound_worker(results, rounds: int, shard: int, _shards: int, queue) -> None:
+    results.put(('ready', shard))
+
+    while (data := queue.get()) is not None:
+        burn(rounds)
+        results.put(('done', data['message']['from']['id']))
+
+
+def dispatch(workers: int, updates: list[Update], rounds: int) -> float:
+    results = multiprocessing.get_context('spawn').Queue()
+    router = ShardRouter(workers, functools.partial(cpu_bound_worker, results, rounds))
+    router.start()
+
+    try:
+        for _ in range(workers):
+            results.get()
+
+        started_at = time.perf_counter()
+
+        for update in updates:
+            router.route(update)
+
+        for _ in updates:
+            results.get()
+
+        return time.perf_counter() - started_at
+    finally:
+        router.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--updates-per-user', type=int, default=5)
+    parser.add_argument('--handler-ms', type=float, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    updates = build_updates(args.users, args.updates_per_user)
+    rounds = calibrate(args.handler_ms / 1000)
+    baseline = None
+
+    print(f"{multiprocessing.cpu_count()} CPU core(s)")
+
+    for workers in args.workers:
+        elapsed = dispatch(workers, updates, rounds)
+        baseline = baseline or elapsed
+
+        print(
+            f"{workers:>3} worker(s): {len(updates)} updates in {elapsed:7.3f}s "
+            f"({len(updates) / elapsed:8.1f} updates/s, {baseline / elapsed:4.2f}x)"
+        )
+
+
+if __name__ == '__main__':
+    main()
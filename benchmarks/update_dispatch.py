@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Compares serial and per-user concurrent update dispatch.
+
+Every simulated update sleeps for a while to stand in for handler I/O (Telegram API calls, downloads, ffmpeg). The
+updates are fed to the processors the same way ``Application`` does: one task per update, created in arrival order.
+
+Usage:
+    python -m benchmarks.update_dispatch --users 50 --updates-per-user 4 --handler-ms 50 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from telegram.ext import SimpleUpdateProcessor
+
+from utils.concurrency import PerUserUpdateProcessor
+
+
+def build_updates(users: int, updates_per_user: int) -> list[SimpleNamespace]:
+    updates = [
+        SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=None, sequence=sequence)
+        for user_id in range(users)
+        for sequence in range(updates_per_user)
+    ]
+
+    # Interleave users but keep each user's own updates in order, like a real polling stream.
+    random.Random(0).shuffle(updates)
+
+    return sorted(updates, key=lambda update: update.sequence)
+
+
+async def dispatch(processor, updates: list[SimpleNamespace], handler_seconds: float) -> tuple[float, bool]:
+    seen: dict[int, list[int]] = {}
+
+    async def handle(update: SimpleNamespace) -> None:
+        await asyncio.sleep(handler_seconds)
+        seen.setdefault(update.effective_user.id, []).append(update.sequence)
+
+    started_at = time.perf_counter()
+
+    if processor.max_concurrent_updates > 1:
+        tasks = [asyncio.create_task(processor.process_update(update, handle(update))) for update in updates]
+        await asyncio.gather(*tasks)
+    else:
+        for update in updates:
+            await processor.process_update(update, handle(update))
+
+    elapsed = time.perf_counter() - started_at
+    is_ordered = all(sequence == sorted(sequence) for sequence in seen.values())
+
+    return elapsed, is_ordered
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--updates-per-user', type=int, default=4)
+    parser.add_argument('--handler-ms', type=float, default=50)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    updates = build_updates(args.users, args.updates_per_user)
+    handler_seconds = args.handler_ms / 1000
+
+    for name, processor in (
+            ('serial', SimpleUpdateProcessor(1)),
+            (f'per-user x{args.concurrency}', PerUserUpdateProcessor(args.concurrency)),
+    ):
+        elapsed, is_ordered = await dispatch(processor, updates, handler_seconds)
+
+        print(
+            f"{name:>16}: {len(updates)} updates in {elapsed:7.3f}s "
+            f"({len(updates) / elapsed:8.1f} updates/s), per-user order kept: {is_ordered}"
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
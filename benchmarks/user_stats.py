@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Compares the time and peak RSS of counting users for ``/stats`` by loading every row with ``User.all()`` and bucketing
+it in Python, as earlier versions did, and with the grouped query of ``modules.admin.service.collect_user_stats``,
+against the database configured in ``.env`` (run the migrations and seeds first). The activity counts now come from
+the rollups of ``utils.rollups``, which are not part of the comparison.
+
+``--users`` synthetic users with random languages, statuses and last interactions within the last 180 days (a tenth
+of them never interacted) are inserted by one ``INSERT ... SELECT`` from ``generate_series``, and deleted afterwards.
+Each case runs in a fresh process, and both must arrive at the same user counts.
+
+Usage:
+    python -m benchmarks.user_stats --users 1000000
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+from datetime import datetime, timedelta, timezone
+
+from database.models import User, UserStatus
+from modules.admin.service import STATS_LANGUAGES, USER_STATUSES, collect_user_stats
+from utils.languages import language_catalog
+from utils.rollups import ACTIVE_DAYS, MONTHLY_ACTIVE_DAYS
+
+ACTIVITY_COUNTS = ('daily', 'weekly', 'monthly_active', 'active_90d', 'inactive', 'churned')
+# The counts both ways take from ``users``.
+USER_COUNTS = ('total', 'inactive', 'status_totals', 'status_by_language')
+
+# Far above real Telegram user ids, so the benchmark never touches real users.
+FIRST_USER_ID = 9_000_000_000
+
+SEED_USERS_QUERY = """
+INSERT INTO users (user_id, username, language_id, user_status_id, number_of_files_sent, last_interaction_at,
+                   created_at, updated_at)
+SELECT
+    %s + series.index,
+    'user' || series.index,
+    languages.ids[1 + floor(random() * cardinality(languages.ids))::integer],
+    statuses.ids[1 + floor(random() * cardinality(statuses.ids))::integer],
+    0,
+    CASE WHEN random() < 0.1 THEN NULL ELSE NOW() - random() * INTERVAL '180 days' END,
+    NOW(),
+    NOW()
+FROM generate_series(0, %s - 1) AS series (index),
+    (SELECT array_agg(id) AS ids FROM languages) AS languages,
+    (SELECT array_agg(id) AS ids FROM user_statuses) AS statuses
+"""
+
+
+def legacy_collect_user_stats(now: datetime) -> dict:
+    status_slugs = {status.id: status.slug for status in UserStatus.where_in('slug', USER_STATUSES).get()}
+    stats = {
+        'total': 0,
+        'status_totals': dict.fromkeys(USER_STATUSES, 0),
+        'status_by_language': {lang: dict.fromkeys(USER_STATUSES, 0) for lang in STATS_LANGUAGES},
+        **dict.fromkeys(ACTIVITY_COUNTS, 0),
+    }
+    cutoffs = {
+        'daily': now - timedelta(hours=24),
+        'weekly': now - timedelta(hours=168),
+        'monthly_active': now - timedelta(days=MONTHLY_ACTIVE_DAYS),
+        'active_90d': now - timedelta(days=ACTIVE_DAYS),
+    }
+
+    for user in User.all():
+        language = language_catalog.by_id(user.language_id)
+        lang = language.iso if language else None
+        status = status_slugs.get(user.user_status_id, 'active')
+
+        if lang in stats['status_by_language']:
+            stats['status_by_language'][lang][status] += 1
+
+        stats['status_totals'][status] += 1
+        stats['total'] += 1
+
+        last_interaction_at = user.last_interaction_at
+
+        if last_interaction_at is None:
+            stats['inactive'] += 1
+
+            continue
+
+        last_interaction_at = last_interaction_at.replace(tzinfo=None)
+
+        for name, cutoff in cutoffs.items():
+            if last_interaction_at >= cutoff:
+                stats[name] += 1
+
+        if last_interaction_at < cutoffs['active_90d']:
+            stats['churned'] += 1
+
+    return stats
+
+
+def run_case(name: str, now: datetime) -> tuple[float, float, dict]:
+    language_catalog.refresh()
+
+    started_at = time.perf_counter()
+    stats = legacy_collect_user_stats(now) if name == 'User.all()' else collect_user_stats()
+    elapsed = time.perf_counter() - started_at
+
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, {key: stats[key] for key in USER_COUNTS}
+
+
+def delete_users(users: int) -> None:
+    User.where('user_id', '>=', FIRST_USER_ID).where('user_id', '<', FIRST_USER_ID + users).delete()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    delete_users(args.users)
+    User.statement(SEED_USERS_QUERY, [FIRST_USER_ID, args.users])
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+
+    try:
+        for name in ('User.all()', 'grouped query'):
+            with context.Pool(1) as pool:
+                elapsed, max_rss_mib, results[name] = pool.apply(run_case, (name, now))
+
+            print(f"{name:>13}: {elapsed:7.2f} s, peak RSS {max_rss_mib:8.1f} MiB")
+    finally:
+        delete_users(args.users)
+
+    if len(set(map(repr, results.values()))) != 1:
+        raise SystemExit(f"The counts differ: {results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Counts the database queries ``upsert_user`` costs per update, with the read-then-write flow of earlier versions and
+with ``utils.activity.UserActivityBuffer``, against the database configured in ``.env`` (run the migrations first).
+
+``--users`` users that do not exist yet send ``--updates-per-user`` updates each, users interleaved. The buffer is
+flushed every ``--flush-every`` updates, standing in for its flush interval. The users are deleted afterwards.
+
+Usage:
+    python -m benchmarks.user_upsert --users 200 --updates-per-user 10 --flush-every 100
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from config.database import DATABASES
+from database.models import Language, User
+from utils.activity import UserActivityBuffer
+
+# Far above real Telegram user ids, so the benchmark never touches real users.
+FIRST_USER_ID = 9_000_000_000
+
+
+class QueryCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.queries = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.queries += 1
+
+
+def legacy_upsert_user(user_id: int, username: str) -> None:
+    user = User.where('user_id', '=', user_id).first()
+
+    if not user:
+        default_language = Language.where('is_default', True).first()
+        User.create({
+            'user_id': user_id,
+            'username': username,
+            'language_id': default_language.id if default_language else None,
+            'number_of_files_sent': 0,
+            'user_status_id': 1,
+        })
+    else:
+        if username and user.username != username:
+            user.username = username
+
+        if user.user_status_id != 1:
+            user.user_status_id = 1
+
+        user.last_interaction_at = datetime.now(timezone.utc)
+        user.save()
+
+
+async def run_buffered(updates: list[tuple[int, str]], flush_every: int) -> None:
+    buffer = UserActivityBuffer()
+
+    for index, (user_id, username) in enumerate(updates, start=1):
+        await buffer.record(user_id, username)
+
+        if index % flush_every == 0:
+            await buffer.flush()
+
+    await buffer.flush()
+
+
+def delete_users(user_ids: list[int]) -> None:
+    User.where_in('user_id', user_ids).delete()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--updates-per-user', type=int, default=10)
+    parser.add_argument('--flush-every', type=int, default=100)
+    args = parser.parse_args()
+
+    user_ids = [FIRST_USER_ID + index for index in range(args.users)]
+    updates = [(user_id, f"user{user_id}") for _ in range(args.updates_per_user) for user_id in user_ids]
+
+    for connection in DATABASES.values():
+        if isinstance(connection, dict):
+            connection['log_queries'] = True
+
+    counter = QueryCounter()
+    query_logger = logging.getLogger('masoniteorm.connection.queries')
+    query_logger.setLevel(logging.DEBUG)
+    query_logger.propagate = False
+    query_logger.addHandler(counter)
+
+    cases = {
+        'read + write': lambda: [legacy_upsert_user(user_id, username) for user_id, username in updates],
+        'buffered': lambda: asyncio.run(run_buffered(updates, args.flush_every)),
+    }
+
+    for name, run in cases.items():
+        delete_users(user_ids)
+        counter.queries = 0
+
+        started_at = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started_at
+
+        print(
+            f"{name:>12}: {counter.queries / len(updates):5.2f} queries per update, "
+            f"{elapsed / len(updates) * 1000:6.2f} ms per update ({len(updates)} updates)"
+        )
+
+    delete_users(user_ids)
+
+
+if __name__ == '__main__':
+    main()
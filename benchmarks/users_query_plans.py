@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Records ``EXPLAIN ANALYZE`` plans and timings of the hot queries on ``users``, with and without the indexes of the
+``add_indexes_to_users_table`` migration, against the database configured in ``.env`` (run the migrations and seeds
+first).
+
+``--users`` synthetic users are seeded as in ``benchmarks.user_stats`` and deleted afterwards. Each query runs
+``--runs`` times with the indexes, and ``--runs`` times in a transaction that drops them and is rolled back, so the
+schema is left as it was. The median execution time and the plan's access paths are printed. Dropping the indexes
+locks ``users`` until the rollback, so do not run it against the database of a running bot.
+
+Usage:
+    python -m benchmarks.users_query_plans --users 1000000 --runs 5
+"""
+
+import argparse
+import importlib
+import json
+import statistics
+
+from benchmarks.user_stats import FIRST_USER_ID, SEED_USERS_QUERY, delete_users
+from config.database import connect
+from database.models import User
+from modules.admin.service import USER_STATS_QUERY
+
+INDEXES = importlib.import_module('database.migrations.2026_10_18_000006_add_indexes_to_users_table').INDEXES
+
+# The queries by what runs them, with the bindings ``%(user_id)s`` and ``%(language_id)s``.
+QUERIES = {
+    'upsert_user lookup': "SELECT username, user_status_id FROM users WHERE user_id = %(user_id)s",
+    'broadcast by language': "SELECT * FROM users WHERE language_id = %(language_id)s",
+    'active users by language': (
+        "SELECT user_id FROM users WHERE language_id = %(language_id)s AND user_status_id = 1"
+    ),
+    'broadcast status change': (
+        "UPDATE users SET user_status_id = user_status_id WHERE user_id = %(user_id)s"
+    ),
+    '/stats counts': USER_STATS_QUERY,
+    'users by status': "SELECT COUNT(*) FROM users WHERE user_status_id = 2",
+}
+
+
+def access_paths(plan: dict) -> list[str]:
+    """The scans of a plan, e.g. ``Index Scan using users_language_id_index``, depth first."""
+    paths = []
+
+    if 'Scan' in plan['Node Type']:
+        index = plan.get('Index Name')
+        paths.append(f"{plan['Node Type']} using {index}" if index else plan['Node Type'])
+
+    for child in plan.get('Plans', []):
+        paths.extend(access_paths(child))
+
+    return paths
+
+
+def explain(cursor, query: str, bindings: dict, runs: int) -> tuple[float, list[str]]:
+    durations = []
+    paths = []
+
+    for _ in range(runs):
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", bindings)
+        result = cursor.fetchone()[0]
+        result = json.loads(result) if isinstance(result, str) else result
+        durations.append(result[0]['Execution Time'])
+        paths = access_paths(result[0]['Plan'])
+
+    return statistics.median(durations), paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    delete_users(args.users)
+    User.statement(SEED_USERS_QUERY, [FIRST_USER_ID, args.users])
+
+    connection = connect()
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE users")
+            cursor.execute("SELECT language_id FROM users WHERE user_id = %s", [FIRST_USER_ID])
+            bindings = {'user_id': FIRST_USER_ID + args.users // 2, 'language_id': cursor.fetchone()[0]}
+            connection.commit()
+
+            for name, query in QUERIES.items():
+                with_indexes, paths = explain(cursor, query, bindings, args.runs)
+                connection.rollback()
+
+                for index in INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+                without_indexes, paths_without = explain(cursor, query, bindings, args.runs)
+                connection.rollback()
+
+                print(f"{name}:")
+                print(f"  with indexes    {with_indexes:10.3f} ms  {', '.join(paths)}")
+                print(f"  without indexes {without_indexes:10.3f} ms  {', '.join(paths_without)}")
+    finally:
+        connection.close()
+        delete_users(args.users)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,39 @@
 #!/usr/bin/env python
 
+import asyncio
 import logging
 import os
 import socket
 
-from config.envs import APP_ENV, DEBUGGER, DEBUGGER_HOST, DEBUGGER_PORT, DEBUGGER_SUSPEND
-from config.telegram_bot import app
+from config.envs import (
+    APP_ENV,
+    BOT_WORKERS,
+    DEBUGGER,
+    DEBUGGER_HOST,
+    DEBUGGER_PORT,
+    DEBUGGER_SUSPEND,
+    FFMPEG_MAX_QUEUE,
+    FFMPEG_WORKERS,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    UPDATE_MODE,
+    WEBHOOK_LISTEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
+)
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+from config.constants import (
+    ADMIN_REFRESH_INTERVAL_SECONDS,
+    FILE_COUNTER_FLUSH_INTERVAL_SECONDS,
+    LANGUAGE_CATALOG_REFRESH_INTERVAL_SECONDS,
+    SESSION_EVICTION_INTERVAL_SECONDS,
+    USER_ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    USER_ACTIVITY_ROLLUP_INTERVAL_SECONDS,
+)
+from config.telegram_bot import app, build_application, persistence_path
 from modules.admin import register as register_admin
 from modules.bitrate_changer import register as register_bitrate_changer
 from modules.core import register as register_core
@@ -13,7 +41,18 @@ from modules.cutter import register as register_cutter
 from modules.donation import register as register_donation
 from modules.tag_editor import register as register_tag_editor
 from modules.voice_converter import register as register_voice_converter
+from utils.activity import flush_user_activity
+from utils.admins import admin_registry, refresh_admins
+from utils.counters import flush_file_counters
+from utils.job_queue import resume_interrupted_jobs
+from utils.languages import language_catalog, refresh_language_catalog
 from utils.logging import configure_logging, get_logger
+from utils.persistence import evict_idle_sessions
+from utils.rollups import compact_user_activity
+from utils.sharding import ShardRouter, check_shard_layout, get_shard_persistence_path, serve_shard
+from utils.shutdown import run_polling
+from utils.transcoding import transcoding_scheduler
+from utils.webhook import run_webhook
 
 logger = get_logger(__name__)
 
@@ -65,18 +104,102 @@ def main():
         logging.getLogger("httpx").setLevel(logging.WARNING)
         logging.getLogger("httpcore").setLevel(logging.WARNING)
 
-    logger.info("Starting bot polling")
-    app.run_polling()
-    app.idle()
+    check_shard_layout(persistence_path, BOT_WORKERS)
 
+    if BOT_WORKERS > 1:
+        # The front process only receives updates and routes them; the workers run the handlers.
+        front = build_application(persistence_filepath=None)
+        router = ShardRouter(BOT_WORKERS, run_shard_worker)
+        front.add_handler(TypeHandler(Update, router.handle_update))
+        router.start()
 
-if __name__ == '__main__':
-    register_admin(app.add_handler)
-    register_bitrate_changer(app.add_handler)
-    register_cutter(app.add_handler)
-    register_donation(app.add_handler)
-    register_tag_editor(app.add_handler)
-    register_voice_converter(app.add_handler)
-    register_core(app.add_handler)
+        try:
+            run(front)
+        finally:
+            router.stop()
+    else:
+        register_modules(app)
+        run(app)
+
+
+def run(application: Application):
+    if UPDATE_MODE == "webhook":
+        logger.info("Starting bot in webhook mode")
+        asyncio.run(
+            run_webhook(
+                application,
+                url=WEBHOOK_URL,
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                secret_token=WEBHOOK_SECRET_TOKEN,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                drain_timeout=SHUTDOWN_DRAIN_TIMEOUT,
+            )
+        )
+    else:
+        logger.info("Starting bot polling")
+        asyncio.run(run_polling(application, drain_timeout=SHUTDOWN_DRAIN_TIMEOUT))
+
+
+def register_modules(application: Application, shard: int = 0, shards: int = 1):
+    language_catalog.refresh()
+    admin_registry.refresh()
+
+    # Picks up the transcoding jobs the previous run left unfinished or undelivered, once the application is running.
+    application.job_queue.run_once(resume_interrupted_jobs, 0, data=(shard, shards), name='resume_interrupted_jobs')
+    application.job_queue.run_repeating(
+        evict_idle_sessions,
+        SESSION_EVICTION_INTERVAL_SECONDS,
+        name='evict_idle_sessions',
+    )
+    application.job_queue.run_repeating(
+        flush_user_activity,
+        USER_ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        name='flush_user_activity',
+    )
+    application.job_queue.run_repeating(
+        compact_user_activity,
+        USER_ACTIVITY_ROLLUP_INTERVAL_SECONDS,
+        name='compact_user_activity',
+    )
+    application.job_queue.run_repeating(
+        flush_file_counters,
+        FILE_COUNTER_FLUSH_INTERVAL_SECONDS,
+        name='flush_file_counters',
+    )
+    application.job_queue.run_repeating(
+        refresh_language_catalog,
+        LANGUAGE_CATALOG_REFRESH_INTERVAL_SECONDS,
+        name='refresh_language_catalog',
+    )
+    application.job_queue.run_repeating(
+        refresh_admins,
+        ADMIN_REFRESH_INTERVAL_SECONDS,
+        name='refresh_admins',
+    )
+
+    register_admin(application.add_handler)
+    register_bitrate_changer(application.add_handler)
+    register_cutter(application.add_handler)
+    register_donation(application.add_handler)
+    register_tag_editor(application.add_handler)
+    register_voice_converter(application.add_handler)
+    register_core(application.add_handler)
+
+
+def run_shard_worker(shard: int, shards: int, queue):
+    configure_logging()
 
+    # FFMPEG_WORKERS and FFMPEG_MAX_QUEUE are limits for the whole bot, so every worker gets its share.
+    transcoding_scheduler.slots = max(FFMPEG_WORKERS // shards, 1)
+    transcoding_scheduler.max_queue = max(FFMPEG_MAX_QUEUE // shards, 1)
+
+    application = build_application(get_shard_persistence_path(persistence_path, shard, shards))
+    register_modules(application, shard, shards)
+
+    logger.info("Shard worker %s/%s started", shard + 1, shards)
+    asyncio.run(serve_shard(application, queue, drain_timeout=SHUTDOWN_DRAIN_TIMEOUT))
+
+
+if __name__ == '__main__':
     main()
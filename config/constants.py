@@ -3,4 +3,26 @@ from pathlib import Path
 from config.envs import DATA_DIR
 
 PERSISTENCE_UPDATE_INTERVAL = 5
+SESSION_EVICTION_INTERVAL_SECONDS = 60
+USER_ACTIVITY_FLUSH_INTERVAL_SECONDS = 5
+USER_ACTIVITY_BATCH_SIZE = 1000
+USER_ACTIVITY_ROLLUP_INTERVAL_SECONDS = 5 * 60
+FILE_COUNTER_FLUSH_INTERVAL_SECONDS = 10
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL_SECONDS = 300
+LANGUAGE_CATALOG_REFRESH_INTERVAL_SECONDS = 60 * 60
+ADMIN_REFRESH_INTERVAL_SECONDS = 60
+# Telegram allows bots about 30 messages per second overall; the rest is left for replies to users.
+BROADCAST_MESSAGES_PER_SECOND = 25
+BROADCAST_BURST = 5
+BROADCAST_CONCURRENCY = 8
+BROADCAST_MAX_ATTEMPTS = 3
+BROADCAST_BATCH_SIZE = 1000
+FFMPEG_TIMEOUT_SECONDS = 30 * 60
+PROGRESS_UPDATE_INTERVAL_SECONDS = 3
+HEALTH_CHECK_PATH = '/healthz'
+JOB_POLL_INTERVAL_SECONDS = 0.5
+JOB_LEASE_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+JOB_RESUME_WINDOW_HOURS = 24
 DOWNLOAD_DIR_PATH = Path(DATA_DIR) / 'downloads'
@@ -21,3 +21,21 @@ DATABASES = {
 }
 
 DB = ConnectionResolver().set_connection_details(DATABASES)
+
+
+def connect():
+    """
+    Opens a psycopg2 connection of its own to the default database, for what the ORM does not cover, like server-side
+    cursors. It is not in autocommit mode, so statements run in a transaction until it is committed or rolled back.
+    """
+    import psycopg2
+
+    details = DATABASES[DATABASES['default']]
+
+    return psycopg2.connect(
+        host=details['host'],
+        port=details['port'],
+        dbname=details['database'],
+        user=details['user'],
+        password=details['password'],
+    )
@@ -26,6 +26,25 @@ BOT_USERNAME = get_env("BOT_USERNAME")
 BOT_TOKEN = get_env("BOT_TOKEN")
 
 DATA_DIR = get_env("DATA_DIR", "/data")
+PERSISTENCE_BACKEND = get_env("PERSISTENCE_BACKEND", "sqlite")
+SESSION_IDLE_TTL = int(get_env("SESSION_IDLE_TTL", 3600))
+MAX_RESIDENT_SESSIONS = int(get_env("MAX_RESIDENT_SESSIONS", 10000))
+
+CONCURRENT_UPDATES = int(get_env("CONCURRENT_UPDATES", 16))
+BOT_WORKERS = int(get_env("BOT_WORKERS", 1))
+SHUTDOWN_DRAIN_TIMEOUT = float(get_env("SHUTDOWN_DRAIN_TIMEOUT", 20))
+
+UPDATE_MODE = get_env("UPDATE_MODE", "polling")
+WEBHOOK_URL = get_env("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = get_env("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(get_env("WEBHOOK_PORT", 8443))
+WEBHOOK_SECRET_TOKEN = get_env("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_MAX_CONNECTIONS = int(get_env("WEBHOOK_MAX_CONNECTIONS", 40))
+
+FFMPEG_WORKERS = int(get_env("FFMPEG_WORKERS", os.cpu_count() or 1))
+FFMPEG_MAX_QUEUE = int(get_env("FFMPEG_MAX_QUEUE", 50))
+FFMPEG_QUEUE_NOTIFY_AT = int(get_env("FFMPEG_QUEUE_NOTIFY_AT", 3))
+TRANSCODING_BACKEND = get_env("TRANSCODING_BACKEND", "local")
 
 DB_HOST = get_env("DB_HOST", "localhost")
 DB_PORT = int(get_env("DB_PORT", 5432))
@@ -1,25 +1,74 @@
 from pathlib import Path
 
 from telegram.constants import ParseMode
-from telegram.ext import Application, Defaults, PicklePersistence
+from telegram.ext import Application, BasePersistence, ContextTypes, Defaults
 
 from config.constants import PERSISTENCE_UPDATE_INTERVAL
-from config.envs import BOT_TOKEN, DATA_DIR
+from config.envs import (
+    BOT_TOKEN,
+    CONCURRENT_UPDATES,
+    DATA_DIR,
+    MAX_RESIDENT_SESSIONS,
+    PERSISTENCE_BACKEND,
+    SESSION_IDLE_TTL,
+)
+from utils.concurrency import PerUserUpdateProcessor
+from utils.context import Session
+from utils.persistence import SessionPicklePersistence, SqlitePersistence
 
 data_dir = Path(DATA_DIR)
 data_dir.mkdir(parents=True, exist_ok=True)
 
-pickle = PicklePersistence(filepath=str(data_dir / "persistence.pickle"), update_interval=PERSISTENCE_UPDATE_INTERVAL)
+pickle_persistence_path = data_dir / "persistence.pickle"
+sqlite_persistence_path = data_dir / "persistence.sqlite3"
+
+persistence_path = sqlite_persistence_path if PERSISTENCE_BACKEND == "sqlite" else pickle_persistence_path
 
 defaults = Defaults(parse_mode=ParseMode.HTML)
 
-app = (
-    Application.builder()
-    .token(BOT_TOKEN)
-    .defaults(defaults)
-    .persistence(pickle)
-    .concurrent_updates(False)
-    .build()
-)
+
+def build_persistence(filepath: Path) -> BasePersistence:
+    """
+    Builds the persistence for a file, by its suffix: ``.sqlite3`` files get a :class:`SqlitePersistence`, which
+    imports the pickle file of the same name on first use and keeps only recently active sessions in memory, anything
+    else a :class:`SessionPicklePersistence`.
+
+    :param filepath: Path: The file to persist sessions in
+    :return: BasePersistence: The persistence
+    """
+    if filepath.suffix == ".sqlite3":
+        return SqlitePersistence(
+            filepath=filepath,
+            update_interval=PERSISTENCE_UPDATE_INTERVAL,
+            import_from=filepath.with_suffix(".pickle"),
+            session_ttl=SESSION_IDLE_TTL or None,
+            max_sessions=MAX_RESIDENT_SESSIONS or None,
+        )
+
+    return SessionPicklePersistence(filepath=str(filepath), update_interval=PERSISTENCE_UPDATE_INTERVAL)
+
+
+def build_application(persistence_filepath: Path | None = persistence_path) -> Application:
+    """
+    Builds an application with the bot's defaults.
+
+    :param persistence_filepath: Path | None: The file to persist sessions in; ``None`` disables persistence
+    :return: Application: The application
+    """
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .defaults(defaults)
+        .context_types(ContextTypes(user_data=Session))
+        .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES) if CONCURRENT_UPDATES > 1 else False)
+    )
+
+    if persistence_filepath:
+        builder.persistence(build_persistence(persistence_filepath))
+
+    return builder.build()
+
+
+app = build_application()
 
 add_handler = app.add_handler
@@ -0,0 +1,42 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+TABLE_NAME = 'jobs'
+
+
+class CreateJobsTable(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        with self.schema.create(TABLE_NAME) as table:
+            table.increments('id')
+            table.big_integer('user_id')
+            table.big_integer('chat_id')
+            table.string('operation', 32)
+            table.jsonb('parameters')
+            table.string('status', 16).default('pending')
+            table.float('duration').default(0)
+            table.float('expected_seconds').default(0)
+            table.double('priority').default(0)
+            table.float('progress_seconds').default(0)
+            table.float('real_time_factor').nullable()
+            table.integer('attempts').default(0)
+            table.string('worker', 100).nullable()
+            table.text('error').nullable()
+            table.datetime('started_at').nullable()
+            table.datetime('finished_at').nullable()
+
+            table.timestamps()
+
+            table.index('user_id')
+
+        # Workers only ever look for the pending job with the lowest priority, so only pending jobs are indexed.
+        self._statement(
+            f"CREATE INDEX {TABLE_NAME}_pending_priority_index ON {TABLE_NAME} (priority) WHERE status = 'pending';"
+        )
+
+    def down(self):
+        self.schema.drop(TABLE_NAME)
@@ -0,0 +1,35 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+TABLE_NAME = 'jobs'
+
+
+class AddDeliveryColumnsToJobs(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        with self.schema.table(TABLE_NAME) as table:
+            table.big_integer('music_message_id').nullable()
+            table.big_integer('status_message_id').nullable()
+            table.jsonb('delivery').nullable()
+            table.datetime('delivery_started_at').nullable()
+            table.datetime('delivered_at').nullable()
+
+        # On startup the bot looks for recent jobs whose result was never sent.
+        self._statement(
+            f"CREATE INDEX {TABLE_NAME}_undelivered_index ON {TABLE_NAME} (created_at) "
+            "WHERE delivery_started_at IS NULL;"
+        )
+
+    def down(self):
+        self._statement(f"DROP INDEX IF EXISTS {TABLE_NAME}_undelivered_index;")
+
+        with self.schema.table(TABLE_NAME) as table:
+            table.drop_column('music_message_id')
+            table.drop_column('status_message_id')
+            table.drop_column('delivery')
+            table.drop_column('delivery_started_at')
+            table.drop_column('delivered_at')
@@ -0,0 +1,31 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+TABLE_NAME = 'user_activity_daily'
+# Days of activity kept, as in `ACTIVE_DAYS` of `utils.rollups` when this migration was written.
+ACTIVE_DAYS = 90
+
+
+class CreateUserActivityDailyTable(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        with self.schema.create(TABLE_NAME) as table:
+            table.date('day')
+            table.big_integer('user_id')
+
+            table.primary(['day', 'user_id'])
+
+        # Only the last interaction of each user is known, so the users active within the window are backfilled on
+        # that day. The counts of today's rollup come out right; earlier days have no history.
+        self._statement(
+            f"INSERT INTO {TABLE_NAME} (day, user_id) "
+            f"SELECT (last_interaction_at AT TIME ZONE 'UTC')::date, user_id FROM users "
+            f"WHERE last_interaction_at >= NOW() - INTERVAL '{ACTIVE_DAYS} days';"
+        )
+
+    def down(self):
+        self.schema.drop(TABLE_NAME)
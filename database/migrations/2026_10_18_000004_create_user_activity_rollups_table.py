@@ -0,0 +1,22 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+
+TABLE_NAME = 'user_activity_rollups'
+
+
+class CreateUserActivityRollupsTable(Migration):
+    def up(self):
+        with self.schema.create(TABLE_NAME) as table:
+            table.date('day')
+            table.integer('daily_users').default(0)
+            table.integer('weekly_users').default(0)
+            table.integer('monthly_active_users').default(0)
+            table.integer('active_users_90d').default(0)
+
+            table.timestamps()
+
+            table.primary('day')
+
+    def down(self):
+        self.schema.drop(TABLE_NAME)
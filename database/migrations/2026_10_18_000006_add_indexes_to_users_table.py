@@ -0,0 +1,34 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+TABLE_NAME = 'users'
+# ``user_statuses.id`` of ``active``, as seeded when this migration was written.
+ACTIVE_USER_STATUS_ID = 1
+
+# ``user_id`` is covered by its unique index already. ``last_interaction_at`` is left out on purpose: it changes on
+# every interaction, and an index on it would make each of those updates write to every index of the table instead
+# of staying a heap-only tuple update. The activity counts read ``user_activity_daily`` instead.
+INDEXES = {
+    # Broadcasts by language, and deleting a language (the foreign key sets it to null).
+    f'{TABLE_NAME}_language_id_index': '(language_id)',
+    # Status changes of broadcasts, and deleting a status.
+    f'{TABLE_NAME}_user_status_id_index': '(user_status_id)',
+    # The users a message can actually reach, per language. Blocked and deleted users are left out, so it stays small.
+    f'{TABLE_NAME}_active_language_id_index': f'(language_id) WHERE user_status_id = {ACTIVE_USER_STATUS_ID}',
+}
+
+
+class AddIndexesToUsersTable(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        # Statements autocommit, so the indexes are built without blocking writes to a large ``users`` table.
+        for name, definition in INDEXES.items():
+            self._statement(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {TABLE_NAME} {definition};")
+
+    def down(self):
+        for name in INDEXES:
+            self._statement(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
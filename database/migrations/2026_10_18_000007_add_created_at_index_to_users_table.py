@@ -0,0 +1,20 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+TABLE_NAME = 'users'
+INDEX_NAME = f'{TABLE_NAME}_created_at_id_index'
+
+
+class AddCreatedAtIndexToUsersTable(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        # `/listusers` pages through the users newest first, by `(created_at, id)`, so each page is read off the index
+        # instead of sorting the whole table.
+        self._statement(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON {TABLE_NAME} (created_at, id);")
+
+    def down(self):
+        self._statement(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME};")
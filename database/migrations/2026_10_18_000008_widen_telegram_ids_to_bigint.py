@@ -0,0 +1,27 @@
+# pylint: disable=invalid-name
+
+from masoniteorm.migrations import Migration
+from masoniteorm.query import QueryBuilder
+
+# Telegram ids may exceed 32 bits, and ``utils.activity`` already binds them as ``bigint``.
+#
+# Changing a column's type rewrites the whole table, and its indexes, under an ACCESS EXCLUSIVE lock: every query of
+# the table waits until the rewrite is done, which takes a while on a large ``users`` table. Stop the bot before
+# running this migration (see "Deploying a New Version" in the README).
+COLUMNS = (
+    ('users', 'user_id'),
+    ('admins', 'admin_user_id'),
+)
+
+
+class WidenTelegramIdsToBigint(Migration):
+    def _statement(self, query: str) -> None:
+        QueryBuilder(connection=self.connection, schema=self.schema_name).statement(query)
+
+    def up(self):
+        for table, column in COLUMNS:
+            self._statement(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT;")
+
+    def down(self):
+        for table, column in COLUMNS:
+            self._statement(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE INTEGER;")
@@ -1,4 +1,5 @@
 from .admin import Admin
+from .job import Job
 from .language import Language
 from .user import User
 from .user_status import UserStatus
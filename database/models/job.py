@@ -0,0 +1,44 @@
+from masoniteorm.models import Model
+
+
+class Job(Model):
+    """
+    A transcoding job and the delivery of its result. Its ``status`` goes from ``created`` to ``running`` (through
+    ``pending`` if a transcoding worker runs it) and then to ``done``, ``failed`` or ``cancelled``. A ``done`` job is
+    delivered once: ``delivery_started_at`` is set right before its result is sent, and ``delivered_at`` afterwards.
+    """
+
+    __fillable__ = [
+        'user_id',
+        'chat_id',
+        'music_message_id',
+        'status_message_id',
+        'operation',
+        'parameters',
+        'delivery',
+        'status',
+        'duration',
+        'expected_seconds',
+        'priority',
+        'progress_seconds',
+        'real_time_factor',
+        'attempts',
+        'worker',
+        'error',
+        'started_at',
+        'finished_at',
+        'delivery_started_at',
+        'delivered_at',
+    ]
+
+    __casts__ = {'parameters': 'json', 'delivery': 'json'}
+
+    CREATED = 'created'
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    UNFINISHED_STATUSES = (CREATED, PENDING, RUNNING)
+    FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
@@ -1,25 +1,33 @@
 import asyncio
-import threading
 import time
 
 from telegram import Update
-from telegram.error import Forbidden, BadRequest
 from telegram.ext import CallbackContext
 from telegram.ext import ConversationHandler
 
-from database.models import Language, User, UserStatus
 from modules.admin.utils import is_admin_owner, is_user_admin
 from utils import get_effective_user_id, get_message_text
+from utils.broadcast import Broadcast
+from utils.languages import language_catalog
 from utils.logging import get_logger
-from .service import add_admin, del_admin, list_users, show_stats
+from .service import (
+    add_admin,
+    del_admin,
+    export_users,
+    list_users,
+    list_users_page,
+    reload_languages,
+    show_daily_active_users,
+    show_session_stats,
+    show_stats,
+    show_transcoding_stats,
+)
 from .utils import get_list_limit
 
-SLEEP_TIME_TO_NEXT_USER_IN_SECONDS = 3
-
 AWAITING_MESSAGE = 1
 CONVERSATION_TIMEOUT = 10
-broadcasting_active = False
-broadcast_thread = None
+active_broadcast: Broadcast | None = None
+broadcast_task: asyncio.Task | None = None
 logger = get_logger(__name__)
 
 
@@ -62,6 +70,62 @@ async def show_stats_if_user_is_admin(update: Update, _context: CallbackContext)
     await show_stats(update)
 
 
+async def show_transcoding_stats_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
+    """
+    Checks if the user is an admin. If they are, it calls :func:`show_transcoding_stats` to display the state of the
+    transcoding scheduler.
+
+    :param update: Update: The ``update`` object
+    :param _context: CallbackContext: Unused
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        return
+
+    await show_transcoding_stats(update)
+
+
+async def show_session_stats_if_user_is_admin(update: Update, context: CallbackContext) -> None:
+    """
+    Checks if the user is an admin. If they are, it calls :func:`show_session_stats` to display the session cache
+    metrics of this process.
+
+    :param update: Update: The ``update`` object
+    :param context: CallbackContext: The ``context`` object
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        return
+
+    await show_session_stats(update, context.application.persistence)
+
+
+async def reload_languages_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
+    """
+    Checks if the user is an admin. If they are, it calls :func:`reload_languages` to read the ``languages`` table
+    again.
+
+    :param update: Update: The ``update`` object
+    :param _context: CallbackContext: Unused
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        return
+
+    await reload_languages(update)
+
+
+async def show_daily_active_users_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
+    """
+    Checks if the user is an admin. If they are, it calls :func:`show_daily_active_users` to display the daily active
+    users of the last days, e.g. ``/activity 30``.
+
+    :param update: Update: The ``update`` object
+    :param _context: CallbackContext: Unused
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        return
+
+    await show_daily_active_users(update, get_list_limit(message=get_message_text(update)))
+
+
 async def list_users_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
     """
     Checks if the user who sent the message is an owner of the bot. If so, calls :func:`list_users`.
@@ -75,6 +139,35 @@ async def list_users_if_user_is_admin(update: Update, _context: CallbackContext)
     await list_users(update, get_list_limit(message=get_message_text(update)))
 
 
+async def list_users_page_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
+    """
+    Checks if the user who pressed a button of a ``/listusers`` page is an admin. If so, calls
+    :func:`list_users_page`.
+
+    :param update: Update: The ``update`` object
+    :param _context: CallbackContext: Unused
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        await update.callback_query.answer()
+
+        return
+
+    await list_users_page(update)
+
+
+async def export_users_if_user_is_admin(update: Update, _context: CallbackContext) -> None:
+    """
+    Checks if the user who sent the message is an admin. If so, calls :func:`export_users`.
+
+    :param update: Update: The ``update`` object
+    :param _context: CallbackContext: Unused
+    """
+    if not is_user_admin(get_effective_user_id(update)):
+        return
+
+    await export_users(update)
+
+
 async def broadcast_command(update: Update, context: CallbackContext) -> int:
     """
     Starts the process of sending a message to all users, optionally filtered by language.
@@ -115,203 +208,95 @@ async def broadcast_command(update: Update, context: CallbackContext) -> int:
 
 async def handle_admin_message(update: Update, context: CallbackContext) -> int:
     """
-    Starts a new thread to broadcast the message to users (optionally filtered by language)
-    without blocking the bot.
+    Starts a :class:`Broadcast` of the message to the active users (optionally filtered by language) as a task on the
+    event loop, without blocking the bot.
 
     If a language filter was set via ``/broadcast <lang>``, the broadcast will only be sent
     to users whose stored language code matches. Otherwise, it broadcasts to all users.
 
-    This function retrieves the target users and starts broadcasting the message to them
-    in a background thread. The broadcasting process can be canceled at any time
-    using ``/cancel_broadcast``. Messages will stop sending as soon as cancellation is triggered.
+    Original messages are copied and forwarded ones forwarded again, so every kind of message works. The broadcast
+    can be canceled at any time using ``/cancel_broadcast``. The admin gets a summary when it is over.
 
     :param update: Update: The ``update`` object
     :param context: CallbackContext: The ``context`` object
     :return: ConversationHandler.END: Ends the conversation state.
     """
-    global broadcasting_active, broadcast_thread
-    broadcasting_active = True
+    global active_broadcast, broadcast_task
 
     user_id = update.effective_user.id
     language_code = context.user_data.pop("broadcast_language", None)
+    language = language_catalog.by_iso(language_code) if language_code else None
 
-    if language_code:
-        language = Language.where('iso', '=', language_code).first()
-        users = User.where('language_id', '=', language.id).get() if language else []
-    else:
-        users = User.all()
+    if active_broadcast and not active_broadcast.done:
+        await update.message.reply_text("ℹ️ A broadcast is already running. Use /cancel_broadcast to cancel it.")
+
+        return ConversationHandler.END
+
+    if language_code and not language:
+        await update.message.reply_text(f"❌ Unknown language: <code>{language_code}</code>")
+
+        return ConversationHandler.END
 
     message_to_send = update.message
     admin_chat_id = update.message.chat_id
-    loop = asyncio.get_event_loop()
+
+    async def send(chat_id: int) -> None:
+        if message_to_send.forward_origin is not None:
+            await context.bot.forward_message(
+                chat_id=chat_id,
+                from_chat_id=message_to_send.chat_id,
+                message_id=message_to_send.message_id,
+            )
+        else:
+            await context.bot.copy_message(
+                chat_id=chat_id,
+                from_chat_id=message_to_send.chat_id,
+                message_id=message_to_send.message_id,
+                disable_notification=True,
+            )
+
+    broadcast = Broadcast(send, language_id=language.id if language else None)
+    active_broadcast = broadcast
 
     logger.info(
-        "Admin %s started broadcast%s to %s users",
+        "Admin %s started broadcast%s",
         user_id,
         f" (language: {language_code})" if language_code else "",
-        len(users),
     )
 
-    def broadcast():
-        """
-        Runs the broadcast process in a separate thread.
-
-        This function iterates through the target users and sends the provided message.
-        Messages are sent using ``asyncio.run_coroutine_threadsafe()`` to ensure
-        they execute safely in the main event loop. A delay is added between
-        messages to avoid hitting Telegram's rate limits.
-
-        If the admin's message is forwarded, it re-forwards it to each user.
-        If it's an original message, it sends the content directly.
-
-        When a delivery fails, the user's status is updated accordingly:
-        - ``Forbidden`` with "user is deactivated" → status set to ``deleted``
-        - ``Forbidden`` (other) → status set to ``blocked``
-        - ``BadRequest`` → logged but no status change
-        """
-        global broadcasting_active
-        success_count = 0
-        failed_count = 0
-        is_forwarded = message_to_send.forward_origin is not None
-
-        blocked_status = UserStatus.where('slug', 'blocked').first()
-        deleted_status = UserStatus.where('slug', 'deleted').first()
-
-        for user in users:
-            if not broadcasting_active:
-                break
-
-            try:
-                if is_forwarded:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.forward_message(
-                            chat_id=user.user_id,
-                            from_chat_id=message_to_send.chat_id,
-                            message_id=message_to_send.message_id,
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.text:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_message(
-                            chat_id=user.user_id,
-                            text=message_to_send.text,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.photo:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_photo(
-                            chat_id=user.user_id,
-                            photo=message_to_send.photo[-1].file_id,
-                            caption=message_to_send.caption,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.video:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_video(
-                            chat_id=user.user_id,
-                            video=message_to_send.video.file_id,
-                            caption=message_to_send.caption,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.document:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_document(
-                            chat_id=user.user_id,
-                            document=message_to_send.document.file_id,
-                            caption=message_to_send.caption,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.audio:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_audio(
-                            chat_id=user.user_id,
-                            audio=message_to_send.audio.file_id,
-                            caption=message_to_send.caption,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.voice:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_voice(
-                            chat_id=user.user_id,
-                            voice=message_to_send.voice.file_id,
-                            caption=message_to_send.caption,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-                elif message_to_send.sticker:
-                    asyncio.run_coroutine_threadsafe(
-                        context.bot.send_sticker(
-                            chat_id=user.user_id,
-                            sticker=message_to_send.sticker.file_id,
-                            disable_notification=True
-                        ),
-                        loop
-                    ).result()
-
-                success_count += 1
-                time.sleep(SLEEP_TIME_TO_NEXT_USER_IN_SECONDS)
-
-            except Forbidden as error:
-                failed_count += 1
-                error_message = str(error).lower()
-
-                if "user is deactivated" in error_message:
-                    logger.warning(
-                        "User %s has deleted their account. Marking as deleted.",
-                        user.user_id,
-                    )
-
-                    if deleted_status:
-                        user.user_status_id = deleted_status.id
-                        user.save()
-                else:
-                    logger.warning(
-                        "User %s has blocked the bot. Marking as blocked.",
-                        user.user_id,
-                    )
-
-                    if blocked_status:
-                        user.user_status_id = blocked_status.id
-                        user.save()
-
-            except BadRequest as error:
-                logger.warning("Broadcast delivery to user %s failed: %s", user.user_id, error)
-                failed_count += 1
-
-            except Exception as error:
-                logger.warning("Broadcast delivery to user %s failed: %s", user.user_id, error)
-                failed_count += 1
-
-        broadcasting_active = False
+    async def run() -> None:
+        started_at = time.monotonic()
+
+        try:
+            result = await broadcast.run()
+        except Exception:
+            logger.exception("Broadcast for admin %s failed", user_id)
+            await context.bot.send_message(chat_id=admin_chat_id, text="❌ Broadcast failed, see the logs.")
+
+            return
+
         logger.info(
-            "Broadcast finished for admin %s: sent=%s failed=%s",
+            "Broadcast finished for admin %s: sent=%s failed=%s blocked=%s deleted=%s cancelled=%s in %.0fs",
             user_id,
-            success_count,
-            failed_count
+            result.sent,
+            result.failed,
+            result.blocked,
+            result.deleted,
+            result.cancelled,
+            time.monotonic() - started_at,
         )
 
-        asyncio.run_coroutine_threadsafe(
-            context.bot.send_message(
-                chat_id=admin_chat_id,
-                text=f"✅ Broadcast complete:\n✔️ {success_count} sent\n❌ {failed_count} failed."
+        await context.bot.send_message(
+            chat_id=admin_chat_id,
+            text=(
+                f"{'⏹ Broadcast canceled' if result.cancelled else '✅ Broadcast complete'}:\n"
+                f"✔️ {result.sent} sent\n"
+                f"❌ {result.failed} failed ({result.blocked} blocked, {result.deleted} deleted)."
             ),
-            loop
         )
 
-    broadcast_thread = threading.Thread(target=broadcast, daemon=True)
-    broadcast_thread.start()
+    # Not ``Application.create_task``: ``Application.stop`` would wait for the whole broadcast on shutdown.
+    broadcast_task = asyncio.create_task(run(), name='broadcast')
 
     await update.message.reply_text("🚀 Broadcasting started in the background.")
 
@@ -322,9 +307,9 @@ async def cancel_broadcast(update: Update, context: CallbackContext) -> int:
     """
     Cancels the broadcasting process immediately.
 
-    This function sets ``broadcasting_active`` to False, signaling the broadcast
-    thread to stop processing further messages. It also ensures that no further
-    messages are sent. If no broadcast is active, it informs the admin.
+    This function cancels the active :class:`Broadcast`, so it stops taking further
+    recipients. Messages already being sent are still delivered. If no broadcast
+    is active, it informs the admin.
 
     :param update: Update: The ``update`` object
     :param context: CallbackContext: The ``context`` object
@@ -335,17 +320,12 @@ async def cancel_broadcast(update: Update, context: CallbackContext) -> int:
     if not is_user_admin(user_id):
         return -1
 
-    global broadcasting_active, broadcast_thread
-
     context.user_data.pop("broadcast_language", None)
 
-    if broadcasting_active:
-        broadcasting_active = False
+    if active_broadcast and not active_broadcast.done and not active_broadcast.result.cancelled:
+        active_broadcast.cancel()
         logger.info("Admin %s canceled active broadcast", user_id)
 
-        if broadcast_thread and broadcast_thread.is_alive():
-            broadcast_thread = None
-
         await update.message.reply_text("❌ Broadcasting canceled. No further messages will be sent.")
     else:
         await update.message.reply_text("ℹ️ No active broadcast to cancel.")
@@ -1,5 +1,6 @@
 from telegram.ext import (
     BaseHandler,
+    CallbackQueryHandler,
     ConversationHandler,
     CommandHandler,
     MessageHandler,
@@ -12,16 +13,19 @@ from .handlers import (
     cancel_broadcast,
     add_admin_if_user_is_owner,
     list_users_if_user_is_admin,
+    list_users_page_if_user_is_admin,
+    export_users_if_user_is_admin,
     show_stats_if_user_is_admin,
+    show_transcoding_stats_if_user_is_admin,
+    show_session_stats_if_user_is_admin,
+    reload_languages_if_user_is_admin,
+    show_daily_active_users_if_user_is_admin,
     del_admin_if_user_is_owner,
 )
-
-SLEEP_TIME_TO_NEXT_USER_IN_SECONDS = 3
+from .utils import USERS_PAGE_CALLBACK_PREFIX
 
 AWAITING_MESSAGE = 1
 CONVERSATION_TIMEOUT = 10
-broadcasting_active = False
-broadcast_thread = None
 
 
 def registry() -> list[BaseHandler]:
@@ -40,7 +44,13 @@ def registry() -> list[BaseHandler]:
         CommandHandler('addadmin', add_admin_if_user_is_owner),
         CommandHandler('deladmin', del_admin_if_user_is_owner),
         CommandHandler('stats', show_stats_if_user_is_admin),
+        CommandHandler('transcoding', show_transcoding_stats_if_user_is_admin),
+        CommandHandler('sessions', show_session_stats_if_user_is_admin),
+        CommandHandler('reload_languages', reload_languages_if_user_is_admin),
+        CommandHandler('activity', show_daily_active_users_if_user_is_admin),
         CommandHandler('listusers', list_users_if_user_is_admin),
+        CallbackQueryHandler(list_users_page_if_user_is_admin, pattern=f'^{USERS_PAGE_CALLBACK_PREFIX}:'),
+        CommandHandler('exportusers', export_users_if_user_is_admin),
         CommandHandler('cancel_broadcast', cancel_broadcast),
     ]
 
@@ -1,41 +1,72 @@
+import asyncio
+import csv
+import gzip
+import io
 import os
-from datetime import datetime, timedelta, timezone
+import tempfile
+from datetime import datetime, timezone
 from typing import (
+    BinaryIO,
     Optional,
 )
 
 import psutil
 from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
     Update,
 )
+from telegram.ext import (
+    BasePersistence,
+)
 
 from config.constants import DOWNLOAD_DIR_PATH
+from config.database import connect
+from config.envs import TRANSCODING_BACKEND
 from database.models import (
     Admin,
-    Language,
+    Job,
     User,
     UserStatus,
 )
 from utils import (
     get_message_text,
 )
+from utils.admins import (
+    admin_registry,
+)
+from utils.languages import (
+    language_catalog,
+)
+from utils.persistence import (
+    SqlitePersistence,
+)
+from utils.rollups import (
+    ACTIVE_DAYS,
+    get_daily_active_users,
+    get_today_rollup,
+)
+from utils.transcoding import (
+    transcoding_scheduler,
+)
+from utils.users import (
+    user_cache,
+)
 from .utils import (
+    decode_users_page_cursor,
+    encode_users_page_cursor,
     extract_user_id,
     is_user_admin,
     get_dir_size_in_bytes,
     pretty_print_size,
 )
 
-SLEEP_TIME_TO_NEXT_USER_IN_SECONDS = 3
-
 AWAITING_MESSAGE = 1
 CONVERSATION_TIMEOUT = 10
-broadcasting_active = False
-broadcast_thread = None
-
-ACTIVE_DAYS = 90
-MONTHLY_ACTIVE_DAYS = 30
-CHURN_DAYS = 90
+DAILY_ACTIVE_USERS_DAYS = 14
+USERS_PER_PAGE = 90
+USERS_EXPORT_BATCH_SIZE = 10000
+USERS_EXPORT_WRITE_TIMEOUT_SECONDS = 120
 
 
 async def add_admin(update: Update) -> None:
@@ -55,6 +86,7 @@ async def add_admin(update: Update) -> None:
     admin.admin_user_id = admin_id_to_add_int
 
     admin.save()
+    admin_registry.add(admin_id_to_add_int)
 
     await update.message.reply_text(text=f"User {admin_id_to_add} has been added as admins.")
 
@@ -74,12 +106,97 @@ async def del_admin(update: Update) -> None:
 
     if is_user_admin(admin_id_to_delete_int):
         Admin.where('admin_user_id', '=', admin_id_to_delete).delete()
+        admin_registry.remove(admin_id_to_delete_int)
 
         await update.message.reply_text(text=f"User {admin_id_to_delete} is no longer an admin")
     else:
         await update.message.reply_text(text=f"User {admin_id_to_delete} is not an admin")
 
 
+USER_STATS_QUERY = """
+SELECT
+    language_id,
+    user_status_id,
+    COUNT(*) AS users,
+    COUNT(*) FILTER (WHERE last_interaction_at IS NULL) AS inactive
+FROM users
+GROUP BY language_id, user_status_id
+"""
+QUEUED_JOBS_QUERY = """
+SELECT
+    COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+    COUNT(*) FILTER (WHERE status = 'running') AS running
+FROM jobs
+WHERE status IN ('pending', 'running')
+"""
+STATS_LANGUAGES = ('en', 'fa', 'ru', 'es', 'fr', 'ar', 'hi', 'id')
+USER_STATUSES = ('active', 'blocked', 'deleted')
+
+
+def count_users_by_language_and_status() -> list[dict]:
+    """
+    Counts the users, and those who never interacted, per language and status in one grouped query. The result has a
+    row per language and status pair, however many users there are.
+
+    :return: list[dict]: The counts by ``language_id`` and ``user_status_id``
+    """
+    rows = User.statement(USER_STATS_QUERY)
+    columns = ('language_id', 'user_status_id', 'users', 'inactive')
+
+    return [{column: getattr(row, column) for column in columns} for row in rows or []]
+
+
+def count_queued_jobs() -> tuple[int, int]:
+    """
+    :return: tuple[int, int]: The number of pending and running jobs in the ``jobs`` table, counted in one query
+    """
+    row = Job.statement(QUEUED_JOBS_QUERY).first()
+
+    return (row.pending, row.running) if row else (0, 0)
+
+
+def collect_user_stats() -> dict:
+    """
+    Sums the counts of :func:`count_users_by_language_and_status` up for ``/stats``, and adds the activity counts of
+    today's rollup. Users of a status other than the known ones count as active, and users of a language other than
+    ``STATS_LANGUAGES`` only count in the totals.
+
+    :return: dict: The ``total`` users, the ``status_totals``, the ``status_by_language`` and the activity counts
+    """
+    status_slugs = {
+        status.id: status.slug
+        for status in UserStatus.where_in('slug', USER_STATUSES).get()
+    }
+    stats = {
+        'total': 0,
+        'inactive': 0,
+        'status_totals': dict.fromkeys(USER_STATUSES, 0),
+        'status_by_language': {lang: dict.fromkeys(USER_STATUSES, 0) for lang in STATS_LANGUAGES},
+    }
+
+    for row in count_users_by_language_and_status():
+        language = language_catalog.by_id(row['language_id'])
+        lang = language.iso if language else None
+        status = status_slugs.get(row['user_status_id'], 'active')
+
+        if lang in stats['status_by_language']:
+            stats['status_by_language'][lang][status] += row['users']
+
+        stats['status_totals'][status] += row['users']
+        stats['total'] += row['users']
+        stats['inactive'] += row['inactive']
+
+    rollup = get_today_rollup()
+    stats['daily'] = rollup.daily_users
+    stats['weekly'] = rollup.weekly_users
+    stats['monthly_active'] = rollup.monthly_active_users
+    stats['active_90d'] = rollup.active_users_90d
+    # Everyone who interacted at some point, but not within the last ``ACTIVE_DAYS`` days.
+    stats['churned'] = max(stats['total'] - stats['inactive'] - rollup.active_users_90d, 0)
+
+    return stats
+
+
 async def show_stats(update: Update) -> None:
     """
     Displays a summary about how the bot is being used:
@@ -87,95 +204,17 @@ async def show_stats(update: Update) -> None:
      - The number of English and Persian users
      - The number & size of the files on the disk
      - How much disk space is occupied.
-     - Daily / weekly / monthly active / active / inactive / churned user counts
+     - The users active today and in the last 7 / 30 / 90 days, counted in UTC calendar days including today, and
+       the inactive / churned user counts
+
+    The users are counted by the database, off the event loop, and the activity counts are read from today's rollup,
+    see :func:`collect_user_stats`.
 
     :param update: Update: The ``update`` object
     """
-    language_counts: dict[str, int] = {
-        'en': 0,
-        'fa': 0,
-        'ru': 0,
-        'es': 0,
-        'fr': 0,
-        'ar': 0,
-        'hi': 0,
-        'id': 0,
-    }
-
-    active_status = UserStatus.where('slug', 'active').first()
-    blocked_status = UserStatus.where('slug', 'blocked').first()
-    deleted_status = UserStatus.where('slug', 'deleted').first()
-
-    language_iso_by_id: dict[int, str] = {
-        language.id: language.iso for language in Language.all()
-    }
-
-    status_by_language: dict[str, dict[str, int]] = {
-        lang: {'active': 0, 'blocked': 0, 'deleted': 0}
-        for lang in language_counts
-    }
-    status_totals: dict[str, int] = {'active': 0, 'blocked': 0, 'deleted': 0}
-
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
-    daily_cutoff = now - timedelta(hours=24)
-    weekly_cutoff = now - timedelta(hours=168)
-    monthly_active_cutoff = now - timedelta(days=MONTHLY_ACTIVE_DAYS)
-    active_cutoff = now - timedelta(days=ACTIVE_DAYS)
-
-    total_users = 0
-    daily_users = 0
-    weekly_users = 0
-    monthly_active_users = 0
-    active_users_90d = 0
-    inactive_users = 0
-    churned_users = 0
-
-    for user in User.all():
-        iso = language_iso_by_id.get(getattr(user, 'language_id', None))
-        lang = iso if iso in language_counts else None
-
-        user_status_id = getattr(user, 'user_status_id', None)
-
-        if user_status_id == (active_status.id if active_status else None):
-            status = 'active'
-        elif user_status_id == (blocked_status.id if blocked_status else None):
-            status = 'blocked'
-        elif user_status_id == (deleted_status.id if deleted_status else None):
-            status = 'deleted'
-        else:
-            status = 'active'
-
-        if lang:
-            language_counts[lang] += 1
-            status_by_language[lang][status] += 1
-
-        status_totals[status] += 1
-        total_users += 1
-
-        last_interaction_at = getattr(user, 'last_interaction_at', None)
-
-        if last_interaction_at is None:
-            inactive_users += 1
-        elif isinstance(last_interaction_at, datetime):
-            if last_interaction_at.tzinfo is not None:
-                last_interaction_at = last_interaction_at.replace(tzinfo=None)
-
-            if last_interaction_at >= daily_cutoff:
-                daily_users += 1
-                weekly_users += 1
-                monthly_active_users += 1
-                active_users_90d += 1
-            elif last_interaction_at >= weekly_cutoff:
-                weekly_users += 1
-                monthly_active_users += 1
-                active_users_90d += 1
-            elif last_interaction_at >= monthly_active_cutoff:
-                monthly_active_users += 1
-                active_users_90d += 1
-            elif last_interaction_at >= active_cutoff:
-                active_users_90d += 1
-            else:
-                churned_users += 1
+    stats = await asyncio.to_thread(collect_user_stats)
+    status_totals = stats['status_totals']
+    status_by_language = stats['status_by_language']
 
     downloads_dir_size = pretty_print_size(get_dir_size_in_bytes(DOWNLOAD_DIR_PATH))
     number_of_downloaded_files = len(os.listdir(DOWNLOAD_DIR_PATH))
@@ -197,23 +236,23 @@ async def show_stats(update: Update) -> None:
         f"  {language_labels[lang]}: {status_by_language[lang]['active']} ✅"
         f" / {status_by_language[lang]['blocked']} 🚫"
         f" / {status_by_language[lang]['deleted']} 🗑"
-        for lang in language_counts
+        for lang in STATS_LANGUAGES
     )
 
     await update.message.reply_text(
         text=(
-            f"👥 {total_users} users are using this bot!\n\n"
-            f"📊 User status breakdown ({total_users} total):\n"
+            f"👥 {stats['total']} users are using this bot!\n\n"
+            f"📊 User status breakdown ({stats['total']} total):\n"
             f"  ✅ Active: {status_totals['active']}\n"
             f"  🚫 Blocked: {status_totals['blocked']}\n"
             f"  🗑 Deleted: {status_totals['deleted']}\n\n"
             f"📈 Usage stats:\n"
-            f"  🟢 Daily (24h): {daily_users}\n"
-            f"  🟡 Weekly (7d): {weekly_users}\n"
-            f"  🔵 Monthly Active (30d): {monthly_active_users}\n"
-            f"  🟣 Active (90d): {active_users_90d}\n"
-            f"  ⚪ Inactive (no interaction): {inactive_users}\n"
-            f"  🔴 Churned (90d+ idle): {churned_users}\n\n"
+            f"  🟢 Today (UTC): {stats['daily']}\n"
+            f"  🟡 Last 7 days (UTC): {stats['weekly']}\n"
+            f"  🔵 Last 30 days (UTC): {stats['monthly_active']}\n"
+            f"  🟣 Last 90 days (UTC): {stats['active_90d']}\n"
+            f"  ⚪ Inactive (no interaction): {stats['inactive']}\n"
+            f"  🔴 Churned (idle for 90+ days): {stats['churned']}\n\n"
             f"🌐 By language:\n"
             f"{language_lines}\n\n"
             f"📁 There are {number_of_downloaded_files} files on the filesystem, occupying {downloads_dir_size}\n"
@@ -224,38 +263,266 @@ async def show_stats(update: Update) -> None:
     )
 
 
-async def list_users(update: Update, limit: Optional[int] = None) -> None:
+async def show_transcoding_stats(update: Update) -> None:
     """
-    Displays a list of all or specified last users in groups of `90` users per message.
+    Displays the state of the transcoding scheduler and the cost model it has learned so far: the real-time factor of
+    each operation (seconds of processing per second of audio), how many jobs it is based on, and what a 10-minute
+    file is expected to cost.
 
     :param update: Update: The ``update`` object
-    :param limit: Optional[int]: Number of last users to return
-    """
-    users = list(User.all())
-    users.sort(
-        key=lambda user: (
-            getattr(user, 'created_at', None) is not None,
-            getattr(user, 'created_at', None),
-            getattr(user, 'id', 0),
-        ),
-        reverse=True,
+    """
+    scheduler = transcoding_scheduler
+    cost_model = scheduler.cost_model
+
+    operation_lines = '\n'.join(
+        f"  {operation.value}: {cost.real_time_factor:.4f}x ({cost.samples} jobs), "
+        f"10 min ≈ {cost_model.estimate(operation, 600):.1f}s"
+        for operation, cost in cost_model.costs.items()
+    )
+    job_lines = '\n'.join(
+        f"  {job.operation.value}: {job.duration:.0f}s of audio, "
+        f"{'?' if job.percent is None else job.percent}% done"
+        + (
+            f", {job.progress.real_time_factor:.3f}x"
+            if job.progress and job.progress.real_time_factor is not None else ''
+        )
+        for job in scheduler.jobs
+    ) or '  -'
+
+    if TRANSCODING_BACKEND == 'postgres':
+        pending_jobs, running_jobs = await asyncio.to_thread(count_queued_jobs)
+        queue_lines = f"🗄 Jobs table: {pending_jobs} pending, {running_jobs} running\n\n"
+    else:
+        queue_lines = (
+            f"⚙️ Transcoding slots: {scheduler.running}/{scheduler.slots} busy\n"
+            f"⏳ Waiting: {scheduler.waiting}/{scheduler.max_queue}\n\n"
+            f"🏃 Running jobs:\n"
+            f"{job_lines}\n\n"
+        )
+
+    await update.message.reply_text(
+        text=(
+            f"{queue_lines}"
+            f"📐 Cost model (processing time per audio second):\n"
+            f"{operation_lines}"
+        )
     )
 
-    if limit:
-        users = users[:limit]
 
-    users.reverse()
+async def show_session_stats(update: Update, persistence: BasePersistence | None) -> None:
+    """
+    Displays how many sessions are in memory, and how often the session of a user who sent an update was already in
+    memory (hit), had to be loaded from the persistence (miss) or did not exist yet (new). Also displays the same for
+    the cache of ``users`` rows.
 
-    users_per_message = 90
-    user_chunks = [users[i:i + users_per_message] for i in range(0, len(users), users_per_message)]
+    :param update: Update: The ``update`` object
+    :param persistence: BasePersistence | None: The persistence of the application
+    """
+    user_stats = user_cache.stats
+    user_hit_rate = '-' if user_stats.hit_rate is None else f"{user_stats.hit_rate:.1%}"
+    user_lines = (
+        f"👤 Cached users: {len(user_cache)}/{user_cache.max_size} ({user_cache.ttl}s TTL)\n"
+        f"🎯 Hits: {user_stats.hits}, 💾 misses: {user_stats.misses}, 📈 hit rate: {user_hit_rate}"
+    )
 
-    for index, chunk in enumerate(user_chunks):
-        reply_message = "\n".join(
-            f"{user.user_id}: {f'@{user.username}' if user.username else '-'}: {user.number_of_files_sent}"
-            for user in chunk
+    if not isinstance(persistence, SqlitePersistence):
+        await update.message.reply_text(
+            text=f"Session stats are only kept with PERSISTENCE_BACKEND=sqlite.\n\n{user_lines}"
         )
 
-        await update.message.reply_text(
-            text=f"👥 List of users ({len(users)} total) - Page {index + 1}/{len(user_chunks)}:\n\n"
-                 f"{reply_message}",
+        return
+
+    stats = persistence.stats
+    hit_rate = '-' if stats.hit_rate is None else f"{stats.hit_rate:.1%}"
+
+    await update.message.reply_text(
+        text=(
+            f"🧠 Sessions in memory: {persistence.resident_sessions}/{persistence.max_sessions or '∞'}\n"
+            f"⏱ Idle TTL: {persistence.session_ttl or '∞'}s\n\n"
+            f"🎯 Hits: {stats.hits}\n"
+            f"💾 Misses: {stats.misses}\n"
+            f"🆕 New: {stats.new}\n"
+            f"📈 Hit rate: {hit_rate}\n"
+            f"🧹 Evicted: {stats.evicted}\n\n"
+            f"{user_lines}"
+        )
+    )
+
+
+async def reload_languages(update: Update) -> None:
+    """
+    Reads the ``languages`` table into the language catalog of this process again, e.g. after seeding a new language.
+    Other worker processes pick the change up within ``LANGUAGE_CATALOG_REFRESH_INTERVAL_SECONDS``.
+
+    :param update: Update: The ``update`` object
+    """
+    languages = language_catalog.refresh()
+
+    await update.message.reply_text(
+        text=f"🌐 Reloaded {languages} languages: {', '.join(language.iso for language in language_catalog.languages)}"
+    )
+
+
+async def show_daily_active_users(update: Update, days: Optional[int] = None) -> None:
+    """
+    Displays the daily active users of the last ``days`` days from the activity rollups, without reading ``users``.
+
+    :param update: Update: The ``update`` object
+    :param days: Optional[int]: Number of days to show, up to ``ACTIVE_DAYS``
+    """
+    days = min(days or DAILY_ACTIVE_USERS_DAYS, ACTIVE_DAYS)
+    daily_active_users = await asyncio.to_thread(get_daily_active_users, days)
+
+    if not daily_active_users:
+        await update.message.reply_text("ℹ️ No user activity has been rolled up yet.")
+
+        return
+
+    lines = '\n'.join(f"  {day.isoformat()}: {users}" for day, users in daily_active_users)
+
+    await update.message.reply_text(text=f"📅 Daily active users (last {days} days):\n{lines}")
+
+
+USERS_PAGE_QUERY = """
+SELECT id, user_id, username, number_of_files_sent, created_at FROM users
+{after}
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+USERS_PAGE_AFTER = "WHERE (created_at, id) < (%s, %s)"
+USERS_EXPORT_QUERY = """
+SELECT
+    users.user_id,
+    users.username,
+    languages.iso AS language,
+    user_statuses.slug AS status,
+    users.number_of_files_sent,
+    users.last_interaction_at,
+    users.created_at
+FROM users
+LEFT JOIN languages ON languages.id = users.language_id
+LEFT JOIN user_statuses ON user_statuses.id = users.user_status_id
+ORDER BY users.id
+"""
+USERS_EXPORT_COLUMNS = (
+    'user_id', 'username', 'language', 'status', 'number_of_files_sent', 'last_interaction_at', 'created_at',
+)
+
+
+def get_users_page(page_size: int, after: tuple[datetime, int] | None = None) -> tuple[list[User], bool]:
+    """
+    Reads a page of users, newest first, starting after a given user. Only the page is read: the database walks the
+    ``(created_at, id)`` index from the previous page on, however far back that is.
+
+    :param page_size: int: The number of users per page
+    :param after: tuple[datetime, int] | None: The ``created_at`` and ``id`` of the last user of the previous page
+    :return: tuple[list[User], bool]: The users of the page, and whether there are more
+    """
+    query = USERS_PAGE_QUERY.format(after=USERS_PAGE_AFTER if after else '')
+    users = list(User.statement(query, [*(after or ()), page_size + 1]) or [])
+
+    return users[:page_size], len(users) > page_size
+
+
+async def send_users_page(update: Update, page: int, page_size: int, after: tuple[datetime, int] | None) -> None:
+    """
+    Displays a page of :func:`get_users_page` with a button to the next one. The first page is sent as a new
+    message, and the next pages replace it.
+
+    :param update: Update: The ``update`` object
+    :param page: int: The number of the page
+    :param page_size: int: The number of users per page
+    :param after: tuple[datetime, int] | None: The ``created_at`` and ``id`` of the last user of the previous page
+    """
+    users, has_more = await asyncio.to_thread(get_users_page, page_size, after)
+    reply_message = "\n".join(
+        f"{user.user_id}: {f'@{user.username}' if user.username else '-'}: {user.number_of_files_sent}"
+        for user in users
+    )
+    text = f"👥 List of users - Page {page}:\n\n{reply_message or 'No more users.'}"
+    reply_markup = None
+    last_user = users[-1] if users else None
+
+    if has_more and last_user.created_at is not None:
+        reply_markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton(
+                text="Next ▶️",
+                callback_data=encode_users_page_cursor(page + 1, page_size, last_user.created_at, last_user.id),
+            ),
+        ]])
+
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text=text, reply_markup=reply_markup)
+    else:
+        await update.message.reply_text(text=text, reply_markup=reply_markup)
+
+
+async def list_users(update: Update, limit: Optional[int] = None) -> None:
+    """
+    Displays the newest users, `90` (or ``limit``, if fewer) per page. Further pages are shown by the button below the
+    message, see :func:`list_users_page`.
+
+    :param update: Update: The ``update`` object
+    :param limit: Optional[int]: Number of users per page
+    """
+    await send_users_page(update, page=1, page_size=min(limit or USERS_PER_PAGE, USERS_PER_PAGE), after=None)
+
+
+async def list_users_page(update: Update) -> None:
+    """
+    Displays the page of users the pressed button of :func:`send_users_page` points at.
+
+    :param update: Update: The ``update`` object
+    """
+    page, page_size, created_at, row_id = decode_users_page_cursor(update.callback_query.data)
+
+    await update.callback_query.answer()
+    await send_users_page(update, page=page, page_size=page_size, after=(created_at, row_id))
+
+
+def write_users_csv(file: BinaryIO) -> int:
+    """
+    Writes all users to a file as gzipped CSV. The rows are streamed from a server-side cursor in batches of
+    ``USERS_EXPORT_BATCH_SIZE`` and compressed as they come, so memory stays bounded however many users there are.
+
+    :param file: BinaryIO: The file to write to
+    :return: int: The number of users written
+    """
+    written = 0
+    connection = connect()
+
+    try:
+        # A named cursor is a server-side one: rows are fetched ``itersize`` at a time as the loop asks for them.
+        with connection.cursor(name='export_users') as cursor, \
+                gzip.GzipFile(fileobj=file, mode='wb') as compressed, \
+                io.TextIOWrapper(compressed, encoding='utf-8', newline='') as text:
+            cursor.itersize = USERS_EXPORT_BATCH_SIZE
+            cursor.execute(USERS_EXPORT_QUERY)
+            writer = csv.writer(text)
+            writer.writerow(USERS_EXPORT_COLUMNS)
+
+            for row in cursor:
+                writer.writerow(row)
+                written += 1
+    finally:
+        connection.close()
+
+    return written
+
+
+async def export_users(update: Update) -> None:
+    """
+    Sends all users as one gzipped CSV document, see :func:`write_users_csv`. The file is spooled to disk, not memory.
+
+    :param update: Update: The ``update`` object
+    """
+    with tempfile.TemporaryFile() as file:
+        users = await asyncio.to_thread(write_users_csv, file)
+        file.seek(0)
+
+        await update.message.reply_document(
+            document=file,
+            filename=f"users-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.csv.gz",
+            caption=f"👥 {users} users",
+            write_timeout=USERS_EXPORT_WRITE_TIMEOUT_SECONDS,
         )
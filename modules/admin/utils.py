@@ -1,7 +1,8 @@
 import re
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from database.models import Admin
+from utils.admins import admin_registry
 
 
 def pretty_print_size(number_of_bytes: float) -> str:
@@ -62,28 +63,55 @@ def get_list_limit(message: str) -> int | None:
     return limit
 
 
+USERS_PAGE_CALLBACK_PREFIX = 'listusers'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_users_page_cursor(page: int, page_size: int, created_at: datetime, row_id: int) -> str:
+    """
+    Encodes where a page of ``/listusers`` starts as the callback data of its button, which may be 64 bytes at most.
+
+    :param page: int: The number of the page
+    :param page_size: int: The number of users per page
+    :param created_at: datetime: The ``created_at`` of the last user of the previous page
+    :param row_id: int: The ``id`` of the last user of the previous page
+    :return: str: The callback data
+    """
+    microseconds = int(created_at.timestamp()) * 1_000_000 + created_at.microsecond
+
+    return f'{USERS_PAGE_CALLBACK_PREFIX}:{page}:{page_size}:{microseconds}:{row_id}'
+
+
+def decode_users_page_cursor(data: str) -> tuple[int, int, datetime, int]:
+    """
+    Decodes the callback data of :func:`encode_users_page_cursor`.
+
+    :param data: str: The callback data
+    :return: tuple[int, int, datetime, int]: The page, the page size, and the ``created_at`` and ``id`` to start after
+    """
+    _prefix, page, page_size, microseconds, row_id = data.split(':')
+
+    return int(page), int(page_size), EPOCH + timedelta(microseconds=int(microseconds)), int(row_id)
+
+
 def is_admin_owner(user_id: int) -> bool:
     """
-    Checks if the user is the bot owner.
+    Checks if the user is the bot owner, without a database query, see :class:`utils.admins.AdminRegistry`.
 
     :param user_id: int: The ``user_id`` of the user whom we want to check their ownership
     :return: bool: Whether the user is the owner
     """
-    owner = Admin.where('admin_user_id', '=', user_id).where('is_owner', '=', True).first()
-
-    return owner.is_owner if owner else False
+    return admin_registry.is_owner(user_id)
 
 
 def is_user_admin(user_id: int) -> bool:
     """
-    Check if the user is the bot owner.
+    Check if the user is an admin of the bot, without a database query, see :class:`utils.admins.AdminRegistry`.
 
     :param user_id: int: The ``user_id`` of the user whom we want to check
     :return: bool: Whether the user is an admin
     """
-    admin = Admin.where('admin_user_id', '=', user_id).first()
-
-    return bool(admin)
+    return admin_registry.is_admin(user_id)
 
 
 def extract_user_id(message: str) -> str:
@@ -1,4 +1,10 @@
+import asyncio
+
+from masoniteorm.exceptions import (
+    QueryException,
+)
 from telegram import (
+    Bot,
     ReplyKeyboardRemove,
     Update,
 )
@@ -18,6 +24,9 @@ from config.envs import (
 from config.modules import (
     Module,
 )
+from database.models import (
+    Job,
+)
 from modules.core.utils import (
     generate_start_over_keyboard,
 )
@@ -36,10 +45,13 @@ from utils import (
     get_file_name,
     upsert_user,
 )
+from utils.job_queue import create_job, deliver_job, job_delivery, run_job
+from utils.jobs import JobCancelledError, run_user_job
 from utils.logging import get_logger
-from .service import (
-    convert_bitrate,
-)
+from utils.progress import ProgressReporter
+from utils.transcoding import Operation, TranscodingQueueFullError
+# Importing the service registers the operation it performs with ``utils.transcoding``.
+from . import service  # noqa: F401 pylint: disable=unused-import
 from .utils import (
     generate_bitrate_selector_keyboard,
     parse_bitrate_number,
@@ -110,7 +122,7 @@ async def change_bitrate(update: Update, context: CallbackContext) -> None:
     output_bitrate = parse_bitrate_number(message.text)
     music_duration = user_data['music_duration']
     music_tags = user_data['tag_editor']
-    possible_art = art_path = music_tags.get('art_path')
+    music_message_id = user_data['music_message_id']
     logger.info(
         "User %s started bitrate change input=%s output=%s target_bitrate=%sk",
         user_id,
@@ -119,43 +131,100 @@ async def change_bitrate(update: Update, context: CallbackContext) -> None:
         output_bitrate
     )
 
+    async def convert_and_upload() -> None:
+        job = await asyncio.to_thread(
+            create_job,
+            Operation.CONVERT_BITRATE,
+            music_duration,
+            {'input_path': input_path, 'output_bitrate': output_bitrate, 'output_path': output_path},
+            user_id=user_id,
+            chat_id=get_chat_id(update),
+            music_message_id=music_message_id,
+            status_message_id=uploading_message.message_id,
+            delivery={'language': language, 'tags': music_tags},
+        )
+
+        progress_reporter = ProgressReporter(uploading_message, language, music_duration)
+
+        finished_job = await run_job(
+            job,
+            on_queued=lambda position: uploading_message.edit_text(
+                text=t(language, 'queuePosition', position=position)
+            ),
+            on_progress=progress_reporter,
+        )
+
+        await progress_reporter.finish()
+        await deliver_job(context.bot, finished_job)
+
     try:
-        convert_bitrate(input_path, output_bitrate, output_path)
-
-        if art_path:
-            original_art_path = art_path
-            resized_art_path = f"{original_art_path}_resized.jpg"
-
-            resize_image(original_art_path, resized_art_path)
-
-            with open(resized_art_path, "rb") as art:
-                possible_art = art.read()
-
-        with open(output_path, 'rb') as music_file:
-            await context.bot.send_audio(
-                audio=music_file,
-                chat_id=get_chat_id(update),
-                thumbnail=possible_art,
-                duration=music_duration,
-                performer=music_tags.get('artist'),
-                title=music_tags.get('title'),
-                filename=f"{get_file_name(music_tags)}.mp3",
-                caption=f"🆔 {BOT_USERNAME}",
-                reply_markup=start_over_button_keyboard,
-                reply_to_message_id=user_data['music_message_id']
-            )
+        await run_user_job(user_id, convert_and_upload())
+
+        logger.info("User %s completed bitrate change output=%s", user_id, output_path)
+    except JobCancelledError:
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
+        logger.info("User %s cancelled bitrate change", user_id)
+    except TranscodingQueueFullError:
+        await message.reply_text(
+            text=t(language, 'errServerBusy'),
+            reply_markup=start_over_button_keyboard
+        )
 
         await uploading_message.delete()
 
-        logger.info("User %s completed bitrate change output=%s", user_id, output_path)
-    except (TelegramError, RuntimeError, OSError) as error:
+        logger.warning("Rejected bitrate change for user %s: transcoding queue is full", user_id)
+    except (TelegramError, RuntimeError, OSError, QueryException) as error:
         await message.reply_text(
             text=t(language, 'errOnUploading'),
             reply_markup=start_over_button_keyboard
         )
 
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
         logger.exception("Failed to change bitrate for user %s: %s", user_id, error)
 
     delete_file(output_path)
 
     reset_user_data_context(user_id, user_data)
+
+
+@job_delivery(Operation.CONVERT_BITRATE)
+async def deliver_converted_bitrate(bot: Bot, job: Job) -> None:
+    """
+    Sends the output of a finished bitrate change job to its user, with the tags and cover art of the original file.
+
+    :param bot: Bot: The bot to send the file with
+    :param job: Job: The finished job
+    """
+    language = job.delivery['language']
+    music_tags = job.delivery['tags']
+    possible_art = art_path = music_tags.get('art_path')
+
+    if art_path:
+        resized_art_path = f"{art_path}_resized.jpg"
+
+        resize_image(art_path, resized_art_path)
+
+        with open(resized_art_path, "rb") as art:
+            possible_art = art.read()
+
+    with open(job.parameters['output_path'], 'rb') as music_file:
+        await bot.send_audio(
+            audio=music_file,
+            chat_id=job.chat_id,
+            thumbnail=possible_art,
+            duration=job.duration,
+            performer=music_tags.get('artist'),
+            title=music_tags.get('title'),
+            filename=f"{get_file_name(music_tags)}.mp3",
+            caption=f"🆔 {BOT_USERNAME}",
+            reply_markup=generate_start_over_keyboard(language),
+            reply_to_message_id=job.music_message_id
+        )
@@ -1,9 +1,16 @@
 from pathlib import Path
 
-from utils.logging import run_ffmpeg
+from utils.ffmpeg import ProgressCallback, run_ffmpeg
+from utils.transcoding import Operation, transcoding_operation
 
 
-def convert_bitrate(input_path: str, output_bitrate: int, output_path: str) -> None:
+@transcoding_operation(Operation.CONVERT_BITRATE)
+async def convert_bitrate(
+        input_path: str,
+        output_bitrate: int,
+        output_path: str,
+        on_progress: ProgressCallback | None = None,
+) -> None:
     """
     Re-encodes audio to the given bitrate while preserving metadata and album art.
 
@@ -15,6 +22,7 @@ def convert_bitrate(input_path: str, output_bitrate: int, output_path: str) -> N
     :param input_path: Path to input audio file
     :param output_bitrate: Target audio bitrate (kbps)
     :param output_path: Path to output audio file
+    :param on_progress: Optional callback that receives ffmpeg's progress
     """
     in_path = Path(input_path)
     out_path = Path(output_path)
@@ -46,4 +54,4 @@ def convert_bitrate(input_path: str, output_bitrate: int, output_path: str) -> N
         str(out_path),
     ]
 
-    run_ffmpeg(cmd, "change audio bitrate")
+    await run_ffmpeg(cmd, "change audio bitrate", on_progress=on_progress)
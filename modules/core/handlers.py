@@ -13,10 +13,6 @@ from telegram.ext import (
     CallbackContext,
 )
 
-from database.models import (
-    Language,
-    User,
-)
 from modules.cutter.handlers import (
     handle_cutter,
 )
@@ -48,8 +44,14 @@ from utils import (
     t,
     upsert_user,
 )
+from utils.job_queue import create_job, mark_used, run_job
+from utils.languages import language_catalog
+from utils.jobs import JobCancelledError, cancel_user_jobs, run_user_job
 from utils.logging import get_logger
-from .service import convert_m4a_to_mp3
+from utils.transcoding import Operation, TranscodingQueueFullError
+from utils.users import update_user
+# Importing the service registers the operation it performs with ``utils.transcoding``.
+from . import service  # noqa: F401 pylint: disable=unused-import
 from .utils import (
     generate_module_selector_keyboard,
     increment_file_counter_for_user,
@@ -78,6 +80,7 @@ async def command_start(update: Update, context: CallbackContext) -> None:
 
     user_data = get_user_data(context)
 
+    cancel_user_jobs(user_id)
     reset_user_data_context(user_id, user_data)
     logger.info("User %s issued /start", user_id)
 
@@ -92,7 +95,8 @@ async def command_start(update: Update, context: CallbackContext) -> None:
 @upsert_user
 async def start_over(update: Update, context: CallbackContext) -> None:
     """
-    Resets all the user's data to initial values and asks them to send an audio file.
+    Cancels the user's in-flight jobs, resets all the user's data to initial values and asks them to send an audio
+    file.
 
     :param update: Update: The ``update`` object
     :param context: CallbackContext: The ``context`` object
@@ -101,6 +105,7 @@ async def start_over(update: Update, context: CallbackContext) -> None:
     user_id = user.user_id
     user_data = get_user_data(context)
 
+    cancel_user_jobs(user_id)
     reset_user_data_context(user_id, user_data)
     logger.info("User %s reset current workflow", user_id)
 
@@ -147,7 +152,7 @@ async def show_language_selector(update: Update, _context: CallbackContext) -> N
     :param update: Update: The ``update`` object
     :param _context: CallbackContext: The ``context`` object
     """
-    languages = Language.ordered()
+    languages = language_catalog.languages
     labels = [language.label for language in languages]
 
     language_button_keyboard = ReplyKeyboardMarkup(
@@ -174,7 +179,7 @@ async def set_language(update: Update, context: CallbackContext) -> None:
     user_data = get_user_data(context)
     selected_label = (get_message_text(update) or '').strip()
 
-    language = next((candidate for candidate in Language.ordered() if candidate.label == selected_label), None)
+    language = language_catalog.by_label(selected_label)
 
     if not language:
         logger.warning("User %s sent an unrecognized language button '%s'", user_id, selected_label)
@@ -190,7 +195,7 @@ async def set_language(update: Update, context: CallbackContext) -> None:
         reply_markup=ReplyKeyboardRemove()
     )
 
-    User.where('user_id', '=', user_id).first().update({'language_id': language.id})
+    update_user(user_id, language_id=language.id)
 
     logger.info("User %s changed language to %s", user_id, language.iso)
 
@@ -231,8 +236,9 @@ async def handle_music_message(update: Update, context: CallbackContext) -> None
     user_id = user.user_id
     user_data = get_user_data(context)
 
+    cancel_user_jobs(user_id)
     reset_user_data_context(user_id, user_data)
-    increment_file_counter_for_user(user_id=user_id)
+    increment_file_counter_for_user(context.bot_data, user_id)
 
     music_duration = message.audio.duration.total_seconds()
     music_file_size = message.audio.file_size
@@ -294,12 +300,49 @@ async def handle_music_message(update: Update, context: CallbackContext) -> None
         m4a_file_download_path = file_download_path
         file_download_path = str(Path(file_download_path).with_suffix('.mp3'))
 
+        async def convert_to_mp3() -> None:
+            # The converted file only becomes the user's current file in this handler, so there is nothing to deliver
+            # if the bot goes down in the meantime; the job is recorded so the user can be asked to send it again, and
+            # marked as delivered once it is done.
+            job = await asyncio.to_thread(
+                create_job,
+                Operation.CONVERT_M4A_TO_MP3,
+                music_duration,
+                {'input_path': m4a_file_download_path, 'output_path': file_download_path},
+                user_id=user_id,
+                chat_id=get_chat_id(update),
+                music_message_id=message.message_id,
+                delivery={'language': language},
+            )
+
+            await run_job(
+                job,
+                on_queued=lambda position: message.reply_text(
+                    text=t(language, 'queuePosition', position=position)
+                ),
+            )
+            await asyncio.to_thread(mark_used, job.id)
+
         try:
-            await asyncio.to_thread(
-                convert_m4a_to_mp3,
-                m4a_file_download_path,
-                file_download_path,
+            await run_user_job(user_id, convert_to_mp3())
+        except JobCancelledError:
+            delete_file(m4a_file_download_path)
+            delete_file(file_download_path)
+
+            logger.info("User %s cancelled m4a conversion", user_id)
+
+            return
+        except TranscodingQueueFullError:
+            delete_file(m4a_file_download_path)
+
+            await message.reply_text(
+                text=t(language, 'errServerBusy'),
+                reply_markup=generate_start_over_keyboard(language),
             )
+
+            logger.warning("Rejected m4a conversion for user %s: transcoding queue is full", user_id)
+
+            return
         except Exception:
             delete_file(m4a_file_download_path)
 
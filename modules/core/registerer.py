@@ -1,5 +1,3 @@
-import re
-
 from telegram.ext import (
     CommandHandler,
     filters,
@@ -7,7 +5,7 @@ from telegram.ext import (
     BaseHandler,
 )
 
-from database.models import Language
+from utils.languages import LanguageButtonFilter, language_catalog
 from utils.logging import get_logger
 from .handlers import (
     command_start,
@@ -27,16 +25,15 @@ logger = get_logger(__name__)
 
 def build_language_button_filter() -> filters.BaseFilter | None:
     """
-    Build a filter matching every language button label in the ``languages`` table.
+    Build a filter matching every language button label in the language catalog. Labels are looked up when an update
+    comes in, so the filter follows refreshes of the catalog.
 
     Returns ``None`` when the table is empty, so the bot still boots on an unseeded database.
     """
-    labels = [language.label for language in Language.ordered()]
-
-    if not labels:
+    if not language_catalog.languages:
         return None
 
-    return filters.Regex('^(' + '|'.join(re.escape(label) for label in labels) + ')$')
+    return LanguageButtonFilter()
 
 
 def registry() -> list[BaseHandler]:
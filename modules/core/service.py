@@ -1,9 +1,11 @@
 from pathlib import Path
 
-from utils.logging import run_ffmpeg
+from utils.ffmpeg import ProgressCallback, run_ffmpeg
+from utils.transcoding import Operation, transcoding_operation
 
 
-def convert_m4a_to_mp3(input_path: str, output_path: str) -> None:
+@transcoding_operation(Operation.CONVERT_M4A_TO_MP3)
+async def convert_m4a_to_mp3(input_path: str, output_path: str, on_progress: ProgressCallback | None = None) -> None:
     in_path = Path(input_path)
     out_path = Path(output_path)
 
@@ -35,4 +37,4 @@ def convert_m4a_to_mp3(input_path: str, output_path: str) -> None:
         str(out_path),
     ]
 
-    run_ffmpeg(cmd, "convert m4a to mp3")
+    await run_ffmpeg(cmd, "convert m4a to mp3", on_progress=on_progress)
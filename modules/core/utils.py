@@ -5,8 +5,8 @@ from pathlib import Path
 from telegram import ReplyKeyboardMarkup
 
 from config.constants import DOWNLOAD_DIR_PATH
-from database.models import User
 from utils import t
+from utils.counters import FILE_COUNTER_DELTAS
 
 PYPROJECT_PATH = Path(__file__).resolve().parents[2] / 'pyproject.toml'
 VERSION_PATTERN = re.compile(r'^\s*version\s*=\s*"([^"]+)"\s*$')
@@ -101,21 +101,16 @@ def does_user_have_music_file(music_path: str) -> bool:
     return bool(music_path)
 
 
-def increment_file_counter_for_user(user_id: int) -> None:
+def increment_file_counter_for_user(bot_data: dict, user_id: int) -> None:
     """
-    Increments the ``number_of_files_sent`` field for a given user.
+    Counts a file a given user sent. The count is kept in ``bot_data`` and added to their ``number_of_files_sent``
+    field by the ``flush_file_counters`` job, together with the counts of all other users.
 
+    :param bot_data: dict: The ``bot_data`` of the application
     :param user_id: int: The ``user_id`` of the user whose file count we want to increment
-    :raises LookupError: No Such a user in the database
     """
-    user = User.where('user_id', '=', user_id).first()
-
-    if not user:
-        raise LookupError(f'User with id {user_id} not found.')
-
-    user.update({
-        "number_of_files_sent": user.number_of_files_sent + 1
-    })
+    deltas = bot_data.setdefault(FILE_COUNTER_DELTAS, {})
+    deltas[user_id] = deltas.get(user_id, 0) + 1
 
 
 @lru_cache(maxsize=1)
@@ -1,7 +1,13 @@
+import asyncio
+
+from masoniteorm.exceptions import (
+    QueryException,
+)
 from persiantools import (
     digits,
 )
 from telegram import (
+    Bot,
     ReplyKeyboardRemove,
     Update,
 )
@@ -24,6 +30,9 @@ from config.envs import (
 from config.modules import (
     Module,
 )
+from database.models import (
+    Job,
+)
 from modules.core.utils import (
     generate_start_over_keyboard,
     generate_back_button_keyboard,
@@ -46,10 +55,12 @@ from utils import (
     get_file_name,
     upsert_user,
 )
+from utils.job_queue import create_job, deliver_job, job_delivery, run_job
+from utils.jobs import JobCancelledError, run_user_job
 from utils.logging import get_logger
-from .service import (
-    cut,
-)
+from utils.transcoding import Operation, TranscodingQueueFullError
+# Importing the service registers the operation it performs with ``utils.transcoding``.
+from . import service  # noqa: F401 pylint: disable=unused-import
 from .utils import (
     convert_seconds_to_human_readable_form,
     parse_cutting_range,
@@ -136,52 +147,66 @@ async def handle_cutter(update: Update, context: CallbackContext) -> None:
         diff_sec
     )
     music_tags = user_data['tag_editor']
-    art_path = music_tags.get('art_path')
-    new_art_path = music_tags.get('new_art_path')
-
-    try:
-        cut(input_path, beginning_sec, diff_sec, output_path)
-        save_tags_to_file(
-            file=output_path,
-            tags=music_tags,
-            new_art_path=new_art_path
+    music_message_id = user_data['music_message_id']
+
+    async def cut_and_upload() -> None:
+        job = await asyncio.to_thread(
+            create_job,
+            Operation.CUT,
+            diff_sec,
+            {
+                'input_path': input_path,
+                'beginning_sec': beginning_sec,
+                'duration': diff_sec,
+                'output_path': output_path,
+            },
+            user_id=user_id,
+            chat_id=get_chat_id(update),
+            music_message_id=music_message_id,
+            status_message_id=uploading_message.message_id,
+            delivery={'language': language, 'tags': music_tags, 'ending_sec': ending_sec},
         )
 
-        possible_art = None
-
-        if art_path:
-            original_art_path = art_path
-            resized_art_path = f"{original_art_path}_resized.jpg"
+        finished_job = await run_job(
+            job,
+            on_queued=lambda position: uploading_message.edit_text(
+                text=t(language, 'queuePosition', position=position)
+            ),
+        )
 
-            resize_image(original_art_path, resized_art_path)
+        await deliver_job(context.bot, finished_job)
 
-            with open(resized_art_path, "rb") as art:
-                possible_art = art.read()
+    try:
+        await run_user_job(user_id, cut_and_upload())
 
-        with open(output_path, 'rb') as music_file:
-            await context.bot.send_audio(
-                audio=music_file,
-                chat_id=get_chat_id(update),
-                thumbnail=possible_art,
-                duration=diff_sec,
-                performer=music_tags.get('artist'),
-                title=music_tags.get('title'),
-                filename=f"{get_file_name(music_tags)}.mp3",
-                caption=f"{t(language, 'fromTo', fromSecond=convert_seconds_to_human_readable_form(beginning_sec), toSecond=convert_seconds_to_human_readable_form(ending_sec))}\n"
-                        f"🆔 {BOT_USERNAME}",
-                reply_markup=start_over_button_keyboard,
-                reply_to_message_id=user_data['music_message_id']
-            )
+        logger.info("User %s completed audio cut output=%s", user_id, output_path)
+    except JobCancelledError:
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
+        logger.info("User %s cancelled audio cut", user_id)
+    except TranscodingQueueFullError:
+        await message.reply_text(
+            text=t(language, 'errServerBusy'),
+            reply_markup=start_over_button_keyboard
+        )
 
         await uploading_message.delete()
 
-        logger.info("User %s completed audio cut output=%s", user_id, output_path)
-    except (TelegramError, RuntimeError, OSError) as error:
+        logger.warning("Rejected audio cut for user %s: transcoding queue is full", user_id)
+    except (TelegramError, RuntimeError, OSError, QueryException) as error:
         await message.reply_text(
             text=t(language, 'errOnUploading'),
             reply_markup=start_over_button_keyboard
         )
 
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
         logger.exception("Cut audio flow failed for user %s: %s", user_id, error)
 
     delete_file(output_path)
@@ -189,6 +214,53 @@ async def handle_cutter(update: Update, context: CallbackContext) -> None:
     reset_user_data_context(user_id, user_data)
 
 
+@job_delivery(Operation.CUT)
+async def deliver_cut(bot: Bot, job: Job) -> None:
+    """
+    Tags the output of a finished cut job with the tags of the original file, and sends it to its user.
+
+    :param bot: Bot: The bot to send the file with
+    :param job: Job: The finished job
+    """
+    language = job.delivery['language']
+    music_tags = job.delivery['tags']
+    output_path = job.parameters['output_path']
+    beginning_sec = job.parameters['beginning_sec']
+    ending_sec = job.delivery['ending_sec']
+    art_path = music_tags.get('art_path')
+
+    save_tags_to_file(
+        file=output_path,
+        tags=music_tags,
+        new_art_path=music_tags.get('new_art_path')
+    )
+
+    possible_art = None
+
+    if art_path:
+        resized_art_path = f"{art_path}_resized.jpg"
+
+        resize_image(art_path, resized_art_path)
+
+        with open(resized_art_path, "rb") as art:
+            possible_art = art.read()
+
+    with open(output_path, 'rb') as music_file:
+        await bot.send_audio(
+            audio=music_file,
+            chat_id=job.chat_id,
+            thumbnail=possible_art,
+            duration=job.parameters['duration'],
+            performer=music_tags.get('artist'),
+            title=music_tags.get('title'),
+            filename=f"{get_file_name(music_tags)}.mp3",
+            caption=f"{t(language, 'fromTo', fromSecond=convert_seconds_to_human_readable_form(beginning_sec), toSecond=convert_seconds_to_human_readable_form(ending_sec))}\n"
+                    f"🆔 {BOT_USERNAME}",
+            reply_markup=generate_start_over_keyboard(language),
+            reply_to_message_id=job.music_message_id
+        )
+
+
 @upsert_user
 async def show_cutter_help(update: Update, context: CallbackContext) -> None:
     """
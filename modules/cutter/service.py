@@ -1,9 +1,17 @@
 from pathlib import Path
 
-from utils.logging import run_ffmpeg
-
-
-def cut(input_path: str, beginning_sec: int, duration: int, output_path: str) -> None:
+from utils.ffmpeg import ProgressCallback, run_ffmpeg
+from utils.transcoding import Operation, transcoding_operation
+
+
+@transcoding_operation(Operation.CUT)
+async def cut(
+        input_path: str,
+        beginning_sec: int,
+        duration: int,
+        output_path: str,
+        on_progress: ProgressCallback | None = None,
+) -> None:
     """
     Cuts a segment without re-encoding while preserving metadata and album art.
 
@@ -18,6 +26,7 @@ def cut(input_path: str, beginning_sec: int, duration: int, output_path: str) ->
     :param beginning_sec: int: The starting point of the cut
     :param duration: int: Duration of the cut
     :param output_path: str: The path of the output file
+    :param on_progress: ProgressCallback | None: Optional callback that receives ffmpeg's progress
     """
     in_path = Path(input_path)
     out_path = Path(output_path)
@@ -47,4 +56,4 @@ def cut(input_path: str, beginning_sec: int, duration: int, output_path: str) ->
         str(out_path),
     ]
 
-    run_ffmpeg(cmd, "cut audio")
+    await run_ffmpeg(cmd, "cut audio", on_progress=on_progress)
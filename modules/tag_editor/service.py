@@ -22,7 +22,8 @@ from utils import (
     get_user_language_or_fallback,
     t,
 )
-from utils.logging import get_logger, run_ffmpeg
+from utils.ffmpeg import run_ffmpeg
+from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
@@ -180,7 +181,7 @@ async def remove_album_art(update: Update, user_data: UD, language: str) -> None
     temp_path = f"{music_path}_temp.mp3"
 
     try:
-        run_ffmpeg(
+        await run_ffmpeg(
             [
                 "ffmpeg",
                 "-hide_banner",
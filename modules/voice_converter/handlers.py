@@ -1,4 +1,10 @@
+import asyncio
+
+from masoniteorm.exceptions import (
+    QueryException,
+)
 from telegram import (
+    Bot,
     ReplyKeyboardRemove,
     Update,
 )
@@ -18,6 +24,9 @@ from config.envs import (
 from config.modules import (
     Module,
 )
+from database.models import (
+    Job,
+)
 from modules.core.utils import (
     generate_start_over_keyboard,
 )
@@ -33,10 +42,13 @@ from utils import (
     get_file_name,
     upsert_user,
 )
+from utils.job_queue import create_job, deliver_job, job_delivery, run_job
+from utils.jobs import JobCancelledError, run_user_job
 from utils.logging import get_logger
-from .service import (
-    convert_to_voice,
-)
+from utils.progress import ProgressReporter
+from utils.transcoding import Operation, TranscodingQueueFullError
+# Importing the service registers the operation it performs with ``utils.transcoding``.
+from . import service  # noqa: F401 pylint: disable=unused-import
 
 logger = get_logger(__name__)
 
@@ -76,6 +88,8 @@ async def send_file_as_voice(update: Update, context: CallbackContext) -> None:
     start_over_button_keyboard = generate_start_over_keyboard(language)
 
     music_tags = user_data['tag_editor']
+    music_duration = user_data['music_duration']
+    music_message_id = user_data['music_message_id']
 
     uploading_message = await message.reply_text(
         text=t(language, 'uploading'),
@@ -87,30 +101,84 @@ async def send_file_as_voice(update: Update, context: CallbackContext) -> None:
         action=ChatAction.UPLOAD_VOICE
     )
 
+    async def convert_and_upload() -> None:
+        job = await asyncio.to_thread(
+            create_job,
+            Operation.CONVERT_TO_VOICE,
+            music_duration,
+            {'input_path': input_path, 'output_path': output_path},
+            user_id=user_id,
+            chat_id=get_chat_id(update),
+            music_message_id=music_message_id,
+            status_message_id=uploading_message.message_id,
+            delivery={'language': language, 'tags': music_tags},
+        )
+
+        progress_reporter = ProgressReporter(uploading_message, language, music_duration)
+
+        finished_job = await run_job(
+            job,
+            on_queued=lambda position: uploading_message.edit_text(
+                text=t(language, 'queuePosition', position=position)
+            ),
+            on_progress=progress_reporter,
+        )
+
+        await progress_reporter.finish()
+        await deliver_job(context.bot, finished_job)
+
     try:
-        convert_to_voice(input_path, output_path)
-
-        with open(output_path, 'rb') as voice_file:
-            await context.bot.send_voice(
-                voice=voice_file,
-                filename=f"{get_file_name(music_tags)}.opus",
-                chat_id=get_chat_id(update),
-                caption=f"🆔 {BOT_USERNAME}",
-                reply_markup=start_over_button_keyboard,
-                reply_to_message_id=user_data['music_message_id']
-            )
+        await run_user_job(user_id, convert_and_upload())
+
+        logger.info("User %s completed voice conversion output=%s", user_id, output_path)
+    except JobCancelledError:
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
+        logger.info("User %s cancelled voice conversion", user_id)
+    except TranscodingQueueFullError:
+        await message.reply_text(
+            text=t(language, 'errServerBusy'),
+            reply_markup=start_over_button_keyboard
+        )
 
         await uploading_message.delete()
 
-        logger.info("User %s completed voice conversion output=%s", user_id, output_path)
-    except (TelegramError, RuntimeError, OSError) as error:
+        logger.warning("Rejected voice conversion for user %s: transcoding queue is full", user_id)
+    except (TelegramError, RuntimeError, OSError, QueryException) as error:
         await message.reply_text(
             text=t(language, 'errOnUploading'),
             reply_markup=start_over_button_keyboard
         )
 
+        try:
+            await uploading_message.delete()
+        except TelegramError:
+            logger.debug("Failed to delete the uploading message of user %s", user_id)
+
         logger.exception("Voice conversion flow failed for user %s: %s", user_id, error)
 
     delete_file(output_path)
 
     reset_user_data_context(user_id, user_data)
+
+
+@job_delivery(Operation.CONVERT_TO_VOICE)
+async def deliver_voice(bot: Bot, job: Job) -> None:
+    """
+    Sends the output of a finished voice conversion job to its user as a voice message.
+
+    :param bot: Bot: The bot to send the voice message with
+    :param job: Job: The finished job
+    """
+    with open(job.parameters['output_path'], 'rb') as voice_file:
+        await bot.send_voice(
+            voice=voice_file,
+            filename=f"{get_file_name(job.delivery['tags'])}.opus",
+            chat_id=job.chat_id,
+            caption=f"🆔 {BOT_USERNAME}",
+            reply_markup=generate_start_over_keyboard(job.delivery['language']),
+            reply_to_message_id=job.music_message_id
+        )
@@ -1,15 +1,18 @@
 from pathlib import Path
 
-from utils.logging import run_ffmpeg
+from utils.ffmpeg import ProgressCallback, run_ffmpeg
+from utils.transcoding import Operation, transcoding_operation
 
 
-def convert_to_voice(input_path: str, output_path: str) -> None:
+@transcoding_operation(Operation.CONVERT_TO_VOICE)
+async def convert_to_voice(input_path: str, output_path: str, on_progress: ProgressCallback | None = None) -> None:
     """
     Creates a new file with `opus` format using `libopus` plugin. The new file can be recognized as a voice message by
     Telegram.
 
     :param input_path: str: The path of the input file
     :param output_path: str: The output path of the converted file
+    :param on_progress: ProgressCallback | None: Optional callback that receives ffmpeg's progress
     """
     in_path = Path(input_path)
     out_path = Path(output_path)
@@ -44,4 +47,4 @@ def convert_to_voice(input_path: str, output_path: str) -> None:
         str(out_path),
     ]
 
-    run_ffmpeg(cmd, "convert audio to voice")
+    await run_ffmpeg(cmd, "convert audio to voice", on_progress=on_progress)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import httpx
+from telegram import Update
+from telegram.ext import Application, MessageHandler, filters
+
+from config.constants import HEALTH_CHECK_PATH
+from utils.webhook import run_webhook
+
+BOT_TOKEN = '123456:TEST'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Test', 'username': 'test_bot'}
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+
+        return sock.getsockname()[1]
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'User'},
+            'text': text,
+        },
+    }
+
+
+class FakeTelegram:
+    """
+    Plays the Telegram side of a webhook deployment: answers the Bot API calls of the bot and delivers updates to the
+    webhook the bot registered, the way Telegram does.
+    """
+
+    def __init__(self):
+        self.webhook: dict[str, str] = {}
+        self.webhook_set = threading.Event()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                method = self.path.rsplit('/', 1)[-1]
+                body = self.rfile.read(int(self.headers.get('content-length', 0))).decode()
+                params = {key: values[0] for key, values in parse_qs(body).items()}
+                result = BOT_USER if method == 'getMe' else True
+
+                if method == 'setWebhook':
+                    fake.webhook = params
+                    fake.webhook_set.set()
+
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/bot'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'FakeTelegram':
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def deliver(self, client: httpx.AsyncClient, update: dict, secret_token: str | None = None) -> httpx.Response:
+        return await client.post(
+            self.webhook['url'],
+            json=update,
+            headers={'X-Telegram-Bot-Api-Secret-Token': secret_token or self.webhook['secret_token']},
+        )
+
+
+class TestWebhookMode(unittest.IsolatedAsyncioTestCase):
+    async def test_processes_updates_posted_by_telegram(self):
+        port = get_free_port()
+        received: list[str] = []
+        all_received = asyncio.Event()
+
+        async def record(update: Update, _context) -> None:
+            received.append(update.message.text)
+
+            if len(received) == 3:
+                all_received.set()
+
+        with FakeTelegram() as telegram:
+            application = Application.builder().token(BOT_TOKEN).base_url(telegram.base_url).build()
+            application.add_handler(MessageHandler(filters.TEXT, record))
+            stop_event = asyncio.Event()
+            webhook = asyncio.create_task(
+                run_webhook(
+                    application,
+                    url=f'http://127.0.0.1:{port}/telegram',
+                    listen='127.0.0.1',
+                    port=port,
+                    max_connections=5,
+                    stop_event=stop_event,
+                )
+            )
+
+            try:
+                await asyncio.wait_for(asyncio.to_thread(telegram.webhook_set.wait), timeout=10)
+
+                self.assertEqual(telegram.webhook['max_connections'], '5')
+                self.assertTrue(telegram.webhook['secret_token'])
+
+                async with httpx.AsyncClient() as client:
+                    for update_id, text in enumerate(('one', 'two', 'three'), start=1):
+                        response = await telegram.deliver(client, make_update(update_id, text))
+
+                        self.assertEqual(response.status_code, 200)
+
+                    forged = await telegram.deliver(client, make_update(4, 'forged'), secret_token='wrong')
+                    malformed = await client.post(
+                        telegram.webhook['url'],
+                        content=b'not json',
+                        headers={'X-Telegram-Bot-Api-Secret-Token': telegram.webhook['secret_token']},
+                    )
+                    health = await client.get(f'http://127.0.0.1:{port}{HEALTH_CHECK_PATH}')
+
+                await asyncio.wait_for(all_received.wait(), timeout=10)
+            finally:
+                stop_event.set()
+                await asyncio.wait_for(webhook, timeout=10)
+
+        self.assertEqual(received, ['one', 'two', 'three'])
+        self.assertEqual(forged.status_code, 403)
+        self.assertEqual(malformed.status_code, 400)
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(health.json()['ok'], True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from types import SimpleNamespace
+
+from utils.activity import UserActivity, UserActivityBuffer
+from utils.users import UserCache
+
+
+class RecordingBuffer(UserActivityBuffer):
+    """Keeps the ``users`` table in a dict instead of the database."""
+
+    def __init__(self):
+        super().__init__(UserCache())
+        self.users: dict[int, str | None] = {}
+        self.queries = 0
+
+    def _upsert_user(self, user_id: int, username: str | None) -> SimpleNamespace:
+        self.queries += 1
+        created = user_id not in self.users
+        previous_username = self.users.get(user_id)
+        self.users[user_id] = username or previous_username
+
+        return SimpleNamespace(
+            user_id=user_id,
+            username=self.users[user_id],
+            created=created,
+            previous_username=previous_username,
+            previous_user_status_id=1,
+        )
+
+    def _update_users(self, pending: dict[int, UserActivity]) -> list[SimpleNamespace]:
+        self.queries += 1
+        updated = []
+
+        for user_id, activity in pending.items():
+            if user_id in self.users:
+                previous_username = self.users[user_id]
+                self.users[user_id] = activity.username or previous_username
+                updated.append(SimpleNamespace(
+                    user_id=user_id,
+                    username=self.users[user_id],
+                    previous_username=previous_username,
+                    previous_user_status_id=1,
+                ))
+
+        return updated
+
+
+class TestUserActivityBuffer(unittest.IsolatedAsyncioTestCase):
+    async def test_creates_new_users_with_a_single_query(self):
+        buffer = RecordingBuffer()
+
+        await buffer.record(1, 'one')
+
+        self.assertEqual((buffer.users, buffer.queries, buffer.pending), ({1: 'one'}, 1, 0))
+
+    async def test_coalesces_interactions_into_one_update(self):
+        buffer = RecordingBuffer()
+        buffer.users = {1: 'one', 2: 'two'}
+
+        for username in ('one', 'uno', None, None):
+            await buffer.record(1, username)
+
+        await buffer.record(2, 'two')
+        await buffer.record(2, None)
+
+        self.assertEqual(buffer.pending, 2)
+        self.assertEqual(await buffer.flush(), 2)
+        self.assertEqual((buffer.users, buffer.queries, buffer.pending), ({1: 'uno', 2: 'two'}, 3, 0))
+        self.assertEqual(await buffer.flush(), 0)
+
+    async def test_creates_users_again_whose_row_is_gone(self):
+        buffer = RecordingBuffer()
+        await buffer.record(1, 'one')
+        await buffer.record(1, 'one')
+        del buffer.users[1]
+
+        self.assertEqual(await buffer.flush(), 0)
+
+        await buffer.record(1, 'one')
+
+        self.assertEqual(buffer.users, {1: 'one'})
+
+
+if __name__ == '__main__':
+    unittest.main()
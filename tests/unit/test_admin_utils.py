@@ -0,0 +1,18 @@
+import unittest
+from datetime import datetime, timezone
+
+from modules.admin.utils import decode_users_page_cursor, encode_users_page_cursor
+
+
+class TestUsersPageCursor(unittest.TestCase):
+    def test_round_trips_within_the_callback_data_limit(self):
+        created_at = datetime(2026, 10, 18, 12, 30, 45, 123456, tzinfo=timezone.utc)
+
+        data = encode_users_page_cursor(12, 90, created_at, 2_147_483_647)
+
+        self.assertLessEqual(len(data.encode()), 64)
+        self.assertEqual(decode_users_page_cursor(data), (12, 90, created_at, 2_147_483_647))
+
+
+if __name__ == '__main__':
+    unittest.main()
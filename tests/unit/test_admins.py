@@ -0,0 +1,58 @@
+import unittest
+
+from utils.admins import AdminRegistry
+
+
+class StaticRegistry(AdminRegistry):
+    """Reads ``admins`` and ``owners`` instead of the ``admins`` table."""
+
+    def __init__(self, admins: set[int], owners: set[int]):
+        super().__init__()
+        self.admins = admins
+        self.owners = owners
+        self.loads = 0
+        self.on_load = None
+
+    def _load_admins(self) -> tuple[frozenset[int], frozenset[int]]:
+        self.loads += 1
+
+        if self.on_load:
+            self.on_load()
+
+        return frozenset(self.admins), frozenset(self.owners)
+
+
+class TestAdminRegistry(unittest.TestCase):
+    def test_checks_admins_and_owners_in_memory(self):
+        registry = StaticRegistry({1, 2}, {1})
+
+        self.assertTrue(registry.is_owner(1))
+        self.assertFalse(registry.is_owner(2))
+        self.assertTrue(registry.is_admin(2))
+        self.assertFalse(registry.is_admin(3))
+        self.assertEqual(registry.loads, 1)
+
+    def test_applies_local_changes_and_refreshes(self):
+        registry = StaticRegistry({1, 2}, {1})
+        registry.add(3)
+        registry.remove(2)
+
+        self.assertEqual([registry.is_admin(user_id) for user_id in (1, 2, 3)], [True, False, True])
+
+        registry.admins = {1, 4}
+
+        self.assertEqual(registry.refresh(), 2)
+        self.assertEqual([registry.is_admin(user_id) for user_id in (3, 4)], [False, True])
+
+    def test_discards_a_refresh_that_overlaps_a_change(self):
+        registry = StaticRegistry({1, 2}, {1})
+        registry.is_admin(1)
+        registry.on_load = lambda: registry.remove(2)
+
+        registry.refresh()
+
+        self.assertFalse(registry.is_admin(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import unittest
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from utils.broadcast import Broadcast, TokenBucket
+
+
+class RecordingBroadcast(Broadcast):
+    """Reads the recipients from ``user_ids`` and records the users marked unreachable."""
+
+    def __init__(
+            self,
+            user_ids: list[int],
+            failures: dict[int, list[Exception]],
+            cancel_at: int | None = None,
+            **kwargs,
+    ):
+        super().__init__(self.send_message, **kwargs)
+        self.user_ids = user_ids
+        self.failures = failures
+        self.cancel_at = cancel_at
+        self.delivered: list[int] = []
+        self.marked: dict[str, list[int]] = {}
+
+    async def send_message(self, chat_id: int) -> None:
+        if chat_id == self.cancel_at:
+            self.cancel()
+
+        if self.failures.get(chat_id):
+            raise self.failures[chat_id].pop(0)
+
+        self.delivered.append(chat_id)
+
+    def _load_recipients(self, after_id: int, limit: int) -> list[tuple[int, int]]:
+        return [(user_id, user_id) for user_id in self.user_ids if user_id > after_id][:limit]
+
+    def _mark_users(self, user_ids: list[int], status: str) -> None:
+        self.marked.setdefault(status, []).extend(user_ids)
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_spaces_sends_out_after_a_burst(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+        started_at = time.monotonic()
+
+        for _ in range(15):
+            await bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.09)
+
+    def test_slows_down_after_a_flood_wait_and_recovers(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.pause(0)
+
+        self.assertEqual(bucket.rate, 15)
+
+        for _ in range(100):
+            bucket.recover()
+
+        self.assertEqual(bucket.rate, 20)
+
+
+class TestBroadcast(unittest.IsolatedAsyncioTestCase):
+    async def test_delivers_to_all_and_marks_unreachable_users(self):
+        broadcast = RecordingBroadcast(
+            list(range(1, 11)),
+            {
+                2: [RetryAfter(0)],
+                3: [TimedOut(), TimedOut(), TimedOut()],
+                4: [Forbidden('Forbidden: bot was blocked by the user')],
+                5: [Forbidden('Forbidden: user is deactivated')],
+                6: [BadRequest('Chat not found')],
+            },
+            bucket=TokenBucket(rate=1000, capacity=10),
+            concurrency=3,
+            batch_size=4,
+        )
+
+        result = await broadcast.run()
+
+        self.assertEqual(sorted(broadcast.delivered), [1, 2, 7, 8, 9, 10])
+        self.assertEqual((result.sent, result.failed, result.blocked, result.deleted), (6, 4, 1, 1))
+        self.assertEqual(broadcast.marked, {'blocked': [4], 'deleted': [5]})
+        self.assertTrue(broadcast.done)
+
+    async def test_stops_when_cancelled(self):
+        broadcast = RecordingBroadcast(list(range(1, 101)), {}, cancel_at=10, bucket=TokenBucket(rate=1000, capacity=1))
+
+        result = await broadcast.run()
+
+        self.assertTrue(result.cancelled)
+        self.assertLessEqual(len(broadcast.delivered), 10 + broadcast.concurrency)
+
+    async def test_stops_all_workers_when_reading_the_recipients_fails(self):
+        class FailingBroadcast(RecordingBroadcast):
+            def _load_recipients(self, after_id: int, limit: int) -> list[tuple[int, int]]:
+                if after_id:
+                    raise ConnectionError('connection lost')
+
+                return super()._load_recipients(after_id, limit)
+
+        broadcast = FailingBroadcast(list(range(1, 101)), {}, bucket=TokenBucket(rate=1000, capacity=10), batch_size=10)
+
+        with self.assertRaises(ConnectionError):
+            await asyncio.wait_for(broadcast.run(), timeout=5)
+
+        self.assertTrue(broadcast.done)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from utils.concurrency import PerUserUpdateProcessor, get_ordering_key
+
+
+def make_update(user_id: int) -> SimpleNamespace:
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=None)
+
+
+class TestPerUserUpdateProcessor(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_of_one_user_run_in_order(self):
+        processor = PerUserUpdateProcessor(8)
+        processed = []
+
+        async def handle(sequence: int, delay: float) -> None:
+            await asyncio.sleep(delay)
+            processed.append(sequence)
+
+        await asyncio.gather(*(
+            processor.process_update(make_update(1), handle(sequence, 0.03 - sequence * 0.01))
+            for sequence in range(3)
+        ))
+
+        self.assertEqual(processed, [0, 1, 2])
+
+    async def test_updates_of_different_users_run_concurrently(self):
+        processor = PerUserUpdateProcessor(8)
+        running = 0
+        peak = 0
+
+        async def handle() -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(processor.process_update(make_update(user_id), handle()) for user_id in range(4)))
+
+        self.assertEqual(peak, 4)
+
+    async def test_one_user_holds_at_most_one_slot(self):
+        processor = PerUserUpdateProcessor(2)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def block() -> None:
+            started.set()
+            await release.wait()
+
+        async def noop() -> None:
+            pass
+
+        first = asyncio.create_task(processor.process_update(make_update(1), block()))
+        await started.wait()
+        await asyncio.gather(*(processor.process_update(make_update(1), noop()) for _ in range(5)))
+
+        self.assertEqual(processor.current_concurrent_updates, 1)
+        self.assertEqual(processor.busy_keys, 1)
+
+        release.set()
+        await first
+
+        self.assertEqual(processor.busy_keys, 0)
+
+    def test_ordering_key_falls_back_to_chat(self):
+        update = SimpleNamespace(effective_user=None, effective_chat=SimpleNamespace(id=42))
+
+        self.assertEqual(get_ordering_key(update), 42)
+        self.assertIsNone(get_ordering_key(SimpleNamespace()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from modules.core.utils import increment_file_counter_for_user
+from utils.counters import FILE_COUNTER_DELTAS, flush_file_counters
+from utils.persistence import SqlitePersistence
+
+
+class RecordingPersistence(SqlitePersistence):
+    def __init__(self):
+        super().__init__(':memory:')
+        self.saved: list[dict] = []
+
+    async def update_bot_data(self, data: dict) -> None:
+        self.saved.append(dict(data[FILE_COUNTER_DELTAS]))
+
+
+class RecordingPicklePersistence(SimpleNamespace):
+    def __init__(self):
+        super().__init__(store_data=SimpleNamespace(bot_data=True), saved=[])
+
+    async def update_bot_data(self, data: dict) -> None:
+        self.saved.append(dict(data[FILE_COUNTER_DELTAS]))
+
+
+def create_context(bot_data: dict, persistence: object | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        bot_data=bot_data,
+        application=SimpleNamespace(persistence=persistence or RecordingPersistence()),
+    )
+
+
+class TestFileCounters(unittest.IsolatedAsyncioTestCase):
+    async def test_flushes_counts_in_one_statement_and_saves_the_rest(self):
+        context = create_context({})
+
+        for user_id in (1, 1, 2, 3):
+            increment_file_counter_for_user(context.bot_data, user_id)
+
+        batches = []
+
+        def add_files_sent(deltas: dict[int, int]) -> list:
+            batches.append(dict(deltas))
+            # A file counted while the statement runs stays for the next flush.
+            increment_file_counter_for_user(context.bot_data, 1)
+
+            return [SimpleNamespace(user_id=user_id) for user_id in deltas if user_id != 3]
+
+        with patch('utils.counters.add_files_sent', add_files_sent), patch('utils.counters.user_cache'):
+            await flush_file_counters(context)
+
+        self.assertEqual(batches, [{1: 2, 2: 1, 3: 1}])
+        self.assertEqual(context.bot_data[FILE_COUNTER_DELTAS], {1: 1})
+        self.assertEqual(context.application.persistence.saved, [{1: 1}])
+
+    async def test_keeps_counts_when_the_statement_fails(self):
+        context = create_context({})
+        increment_file_counter_for_user(context.bot_data, 1)
+
+        def add_files_sent(_deltas: dict[int, int]) -> list:
+            raise ConnectionError('database is down')
+
+        with patch('utils.counters.add_files_sent', add_files_sent):
+            await flush_file_counters(context)
+
+        self.assertEqual(context.bot_data[FILE_COUNTER_DELTAS], {1: 1})
+        self.assertEqual(context.application.persistence.saved, [])
+
+    async def test_leaves_saving_to_the_pickle_persistence(self):
+        context = create_context({}, RecordingPicklePersistence())
+        increment_file_counter_for_user(context.bot_data, 1)
+
+        def add_files_sent(deltas: dict[int, int]) -> list:
+            return [SimpleNamespace(user_id=user_id) for user_id in deltas]
+
+        with patch('utils.counters.add_files_sent', add_files_sent), patch('utils.counters.user_cache'):
+            await flush_file_counters(context)
+
+        self.assertEqual(context.bot_data[FILE_COUNTER_DELTAS], {})
+        self.assertEqual(context.application.persistence.saved, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
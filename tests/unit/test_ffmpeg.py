@@ -0,0 +1,74 @@
+import asyncio
+import sys
+import unittest
+
+from utils.ffmpeg import FFmpegTimeoutError, ProgressParser, run_ffmpeg
+
+
+def python_command(code: str) -> list[str]:
+    return [sys.executable, '-c', code]
+
+
+class TestRunFFmpeg(unittest.IsolatedAsyncioTestCase):
+    async def test_streams_stderr_lines_to_logger(self):
+        code = "import sys; sys.stderr.write('frame=1\\rframe=2\\nsize=3\\n')"
+
+        with self.assertLogs('music_tool_bot.ffmpeg', level='DEBUG') as logs:
+            await run_ffmpeg(python_command(code), 'test')
+
+        messages = [record.getMessage() for record in logs.records]
+
+        self.assertIn('test stderr: frame=1', messages)
+        self.assertIn('test stderr: frame=2', messages)
+        self.assertIn('test stderr: size=3', messages)
+
+    async def test_raises_on_non_zero_exit_code(self):
+        code = "import sys; sys.stderr.write('boom\\n'); sys.exit(1)"
+
+        with self.assertRaisesRegex(RuntimeError, 'boom'):
+            await run_ffmpeg(python_command(code), 'test')
+
+    async def test_kills_process_on_timeout(self):
+        with self.assertRaises(FFmpegTimeoutError):
+            await run_ffmpeg(python_command('import time; time.sleep(30)'), 'test', timeout=0.2)
+
+    async def test_kills_process_on_cancel(self):
+        task = asyncio.create_task(run_ffmpeg(python_command('import time; time.sleep(30)'), 'test'))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=5)
+
+
+class TestProgressParser(unittest.TestCase):
+    def test_emits_snapshot_at_end_of_block(self):
+        parser = ProgressParser()
+
+        self.assertIsNone(parser.feed('frame=10'))
+        self.assertIsNone(parser.feed('out_time_us=12500000'))
+        progress = parser.feed('progress=continue')
+
+        self.assertEqual(progress.processed_seconds, 12.5)
+        self.assertFalse(progress.is_done)
+
+    def test_falls_back_to_out_time(self):
+        parser = ProgressParser()
+
+        parser.feed('out_time=00:01:02.500000')
+        progress = parser.feed('progress=end')
+
+        self.assertEqual(progress.processed_seconds, 62.5)
+        self.assertTrue(progress.is_done)
+
+    def test_ignores_unknown_values(self):
+        parser = ProgressParser()
+
+        parser.feed('out_time_us=N/A')
+        parser.feed('out_time=N/A')
+
+        self.assertEqual(parser.feed('progress=continue').processed_seconds, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from utils.jobs import JobCancelledError, cancel_user_jobs, drain_user_jobs, is_draining, run_user_job
+
+
+class TestUserJobs(unittest.IsolatedAsyncioTestCase):
+    async def test_returns_the_result_of_the_job(self):
+        async def job() -> int:
+            return 42
+
+        self.assertEqual(await run_user_job(1, job()), 42)
+
+    async def test_cancelling_a_job_does_not_cancel_the_caller(self):
+        started = asyncio.Event()
+        uploaded = False
+
+        async def job() -> None:
+            nonlocal uploaded
+            started.set()
+            await asyncio.sleep(10)
+            uploaded = True
+
+        caller = asyncio.create_task(run_user_job(7, job()))
+        await started.wait()
+
+        self.assertEqual(cancel_user_jobs(7), 1)
+
+        with self.assertRaises(JobCancelledError):
+            await caller
+
+        self.assertFalse(uploaded)
+        self.assertEqual(cancel_user_jobs(7), 0)
+
+    async def test_only_cancels_jobs_of_the_given_user(self):
+        async def job() -> str:
+            await asyncio.sleep(0.05)
+
+            return 'done'
+
+        other = asyncio.create_task(run_user_job(2, job()))
+        await asyncio.sleep(0)
+
+        self.assertEqual(cancel_user_jobs(3), 0)
+        self.assertEqual(await other, 'done')
+
+    async def test_draining_finishes_quick_jobs_and_interrupts_slow_ones(self):
+        async def job(seconds: float) -> float:
+            await asyncio.sleep(seconds)
+
+            return seconds
+
+        quick = asyncio.create_task(run_user_job(4, job(0.01)))
+        slow = asyncio.create_task(run_user_job(5, job(10)))
+        await asyncio.sleep(0)
+
+        async with drain_user_jobs(0.2) as interrupted:
+            self.assertTrue(is_draining())
+            self.assertEqual(interrupted, 1)
+
+            with self.assertRaises(JobCancelledError):
+                await run_user_job(6, job(0))
+
+        self.assertFalse(is_draining())
+        self.assertEqual(await quick, 0.01)
+
+        with self.assertRaises(JobCancelledError):
+            await slow
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from utils.languages import CatalogLanguage, LanguageCatalog
+
+ENGLISH = CatalogLanguage(id=1, iso='en', name='English', native_name='English', flag='🇬🇧', is_default=True)
+PERSIAN = CatalogLanguage(id=2, iso='fa', name='Persian', native_name='فارسی', flag='🇮🇷', is_default=False)
+
+
+class StaticCatalog(LanguageCatalog):
+    """Reads ``rows`` instead of the ``languages`` table."""
+
+    def __init__(self, rows: tuple[CatalogLanguage, ...]):
+        super().__init__()
+        self.rows = rows
+        self.loads = 0
+
+    def _load_languages(self) -> tuple[CatalogLanguage, ...]:
+        self.loads += 1
+
+        return self.rows
+
+
+class TestLanguageCatalog(unittest.TestCase):
+    def test_looks_languages_up_by_id_iso_and_label(self):
+        catalog = StaticCatalog((ENGLISH, PERSIAN))
+
+        self.assertEqual(catalog.languages, (ENGLISH, PERSIAN))
+        self.assertIs(catalog.by_id(2), PERSIAN)
+        self.assertIs(catalog.by_iso('en'), ENGLISH)
+        self.assertIs(catalog.by_label('🇮🇷 فارسی'), PERSIAN)
+        self.assertIsNone(catalog.by_label('🇮🇷 Persian'))
+        self.assertIs(catalog.default, ENGLISH)
+        self.assertEqual(catalog.loads, 1)
+
+    def test_only_reads_the_table_again_on_refresh(self):
+        catalog = StaticCatalog((ENGLISH,))
+        catalog.by_iso('en')
+        catalog.rows = (ENGLISH, PERSIAN)
+
+        self.assertIsNone(catalog.by_iso('fa'))
+        self.assertEqual(catalog.refresh(), 2)
+        self.assertIs(catalog.by_iso('fa'), PERSIAN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import pickle
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from telegram.ext import PicklePersistence
+
+from utils.context import Session, SessionUser
+from utils.persistence import SqlitePersistence
+
+
+class TestSqlitePersistence(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'persistence.sqlite3'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def test_round_trips_sessions(self):
+        persistence = SqlitePersistence(self.path)
+        await persistence.get_user_data()
+
+        await persistence.update_user_data(1, {'music_path': '/data/1.mp3'})
+        await persistence.update_chat_data(2, {'x': 1})
+        await persistence.update_bot_data({'y': 2})
+        await persistence.update_conversation('broadcast', (1, 1), 1)
+        await persistence.flush()
+
+        reopened = SqlitePersistence(self.path)
+        user_data = {}
+
+        self.assertEqual(await reopened.get_user_data(), {})
+
+        await reopened.refresh_user_data(1, user_data)
+
+        self.assertEqual(user_data, {'music_path': '/data/1.mp3'})
+        self.assertEqual(await reopened.get_chat_data(), {2: {'x': 1}})
+        self.assertEqual(await reopened.get_bot_data(), {'y': 2})
+        self.assertEqual(await reopened.get_conversations('broadcast'), {(1, 1): 1})
+
+        await reopened.drop_user_data(1)
+        await reopened.update_conversation('broadcast', (1, 1), None)
+        await reopened.flush()
+
+        reopened = SqlitePersistence(self.path)
+        user_data = {}
+        await reopened.get_user_data()
+        await reopened.refresh_user_data(1, user_data)
+
+        self.assertEqual(user_data, {})
+        self.assertEqual(await reopened.get_conversations('broadcast'), {})
+        await reopened.flush()
+
+    async def test_only_writes_changed_sessions(self):
+        persistence = SqlitePersistence(self.path)
+        await persistence.get_user_data()
+        await persistence.update_user_data(1, {'language': 'en'})
+
+        changes = persistence._connection.total_changes  # pylint: disable=protected-access
+        await persistence.update_user_data(1, {'language': 'en'})
+
+        self.assertEqual(persistence._connection.total_changes, changes)  # pylint: disable=protected-access
+
+        await persistence.update_user_data(1, {'language': 'fa'})
+
+        self.assertEqual(persistence._connection.total_changes, changes + 1)  # pylint: disable=protected-access
+        await persistence.flush()
+
+    async def test_imports_the_pickle_file_once(self):
+        pickle_path = self.path.with_suffix('.pickle')
+        legacy = PicklePersistence(filepath=pickle_path)
+        await legacy.get_user_data()
+        await legacy.update_user_data(7, {'language': 'ru'})
+
+        persistence = SqlitePersistence(self.path, import_from=pickle_path)
+        user_data = {}
+        await persistence.get_user_data()
+        await persistence.refresh_user_data(7, user_data)
+
+        self.assertEqual(user_data, {'language': 'ru'})
+        await persistence.flush()
+
+        with sqlite3.connect(self.path) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM user_data").fetchone(), (1,))
+
+    async def test_converts_pickled_sessions_to_the_session_format(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE user_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+            connection.execute(
+                "INSERT INTO user_data VALUES (?, ?)",
+                (3, pickle.dumps({'user': SessionUser(3, 'three'), 'language': 'es', 'legacy_key': 1})),
+            )
+        connection.close()
+
+        persistence = SqlitePersistence(self.path)
+        user_data = Session()
+        await persistence.get_user_data()
+        await persistence.refresh_user_data(3, user_data)
+
+        self.assertEqual(user_data, Session(user=SessionUser(3, 'three'), language='es'))
+        await persistence.flush()
+
+        with sqlite3.connect(self.path) as connection:
+            data, = connection.execute("SELECT data FROM user_data").fetchone()
+            self.assertEqual(Session.from_bytes(data), user_data)
+        connection.close()
+
+    async def test_evicts_idle_sessions_and_loads_them_again(self):
+        persistence = SqlitePersistence(self.path, max_sessions=1)
+        application = FakeApplication()
+        await persistence.get_user_data()
+
+        for user_id in (1, 2):
+            await persistence.refresh_user_data(user_id, application.user_data.setdefault(user_id, {}))
+            application.user_data[user_id]['language'] = f"l{user_id}"
+
+        self.assertEqual(await persistence.evict(application), 1)
+        self.assertEqual(list(application.user_data), [2])
+
+        await persistence.drop_user_data(1)
+        await persistence.refresh_user_data(1, application.user_data.setdefault(1, {}))
+        await persistence.refresh_user_data(2, application.user_data[2])
+
+        self.assertEqual(application.user_data[1], {'language': 'l1'})
+        self.assertEqual((persistence.stats.hits, persistence.stats.misses, persistence.stats.new), (1, 1, 2))
+        await persistence.flush()
+
+    async def test_keeps_sessions_used_while_they_are_evicted(self):
+        application = FakeApplication()
+
+        class BusyPersistence(SqlitePersistence):
+            async def update_user_data(self, user_id: int, data: dict) -> None:
+                await super().update_user_data(user_id, data)
+                # A handler of the user runs while the session is written.
+                await self.refresh_user_data(user_id, application.user_data[user_id])
+
+        persistence = BusyPersistence(self.path, session_ttl=0)
+        await persistence.get_user_data()
+        await persistence.refresh_user_data(1, application.user_data.setdefault(1, {}))
+
+        self.assertEqual(await persistence.evict(application), 0)
+        self.assertEqual(list(application.user_data), [1])
+        self.assertEqual(persistence.resident_sessions, 1)
+        await persistence.flush()
+
+
+class FakeApplication(SimpleNamespace):
+    def __init__(self):
+        super().__init__(user_data={})
+
+    def drop_user_data(self, user_id: int) -> None:
+        self.user_data.pop(user_id, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import functools
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from telegram import Chat, Message, Update, User
+
+from utils.sharding import (
+    ShardLayoutChangedError,
+    ShardRouter,
+    check_shard_layout,
+    get_shard,
+    get_shard_persistence_path,
+)
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    user = User(id=user_id, first_name='User', is_bot=False)
+    chat = Chat(id=user_id, type=Chat.PRIVATE)
+
+    return Update(update_id=update_id, message=Message(message_id=update_id, date=None, chat=chat, from_user=user))
+
+
+def echo_worker(results, shard: int, _shards: int, queue) -> None:
+    while (data := queue.get()) is not None:
+        results.put((shard, data['message']['from']['id'], data['update_id']))
+
+
+def crash_once_worker(results, marker: str, shard: int, _shards: int, queue) -> None:
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+
+    echo_worker(results, shard, _shards, queue)
+
+
+class TestSharding(unittest.TestCase):
+    def test_get_shard_is_stable_per_user(self):
+        self.assertEqual(get_shard(42, 4), get_shard(42, 4))
+        self.assertEqual(get_shard(None, 4), 0)
+        self.assertEqual({get_shard(user_id, 4) for user_id in range(100)}, {0, 1, 2, 3})
+
+    def test_routes_all_updates_of_a_user_to_one_worker_in_order(self):
+        results = multiprocessing.get_context('spawn').Queue()
+        router = ShardRouter(3, functools.partial(echo_worker, results))
+        router.start()
+
+        try:
+            for update_id in range(30):
+                router.route(make_update(update_id, user_id=update_id % 5))
+        finally:
+            router.stop()
+
+        shards_by_user: dict[int, set[int]] = {}
+        updates_by_user: dict[int, list[int]] = {}
+
+        for _ in range(30):
+            shard, user_id, update_id = results.get(timeout=10)
+            shards_by_user.setdefault(user_id, set()).add(shard)
+            updates_by_user.setdefault(user_id, []).append(update_id)
+
+        self.assertTrue(all(len(shards) == 1 for shards in shards_by_user.values()))
+        self.assertTrue(all(updates == sorted(updates) for updates in updates_by_user.values()))
+
+    def test_seeds_shard_persistence_from_single_process_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'persistence.pickle'
+            path.write_bytes(b'sessions')
+
+            shard_path = get_shard_persistence_path(path, 1, 2)
+
+            self.assertEqual(shard_path.name, 'persistence.shard-1-of-2.pickle')
+            self.assertEqual(shard_path.read_bytes(), b'sessions')
+
+    def test_seeds_shard_persistence_with_the_uncheckpointed_sqlite_commits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'persistence.sqlite3'
+            connection = sqlite3.connect(path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA wal_autocheckpoint = 0")
+            connection.execute("CREATE TABLE user_data (id INTEGER PRIMARY KEY, data BLOB)")
+            connection.execute("INSERT INTO user_data VALUES (1, x'00')")
+
+            try:
+                shard_path = get_shard_persistence_path(path, 0, 2)
+            finally:
+                connection.close()
+
+            with sqlite3.connect(shard_path) as shard_connection:
+                self.assertEqual(shard_connection.execute("SELECT id FROM user_data").fetchall(), [(1,)])
+            shard_connection.close()
+
+    def test_refuses_to_change_the_number_of_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'persistence.sqlite3'
+            path.write_bytes(b'')
+
+            for shard in range(2):
+                get_shard_persistence_path(path, shard, 2)
+
+            Path(directory, 'persistence.shard-0-of-2.sqlite3-wal').write_bytes(b'')
+            check_shard_layout(path, 2)
+
+            for shards in (1, 3):
+                with self.assertRaises(ShardLayoutChangedError):
+                    check_shard_layout(path, shards)
+
+    def test_restarts_a_worker_that_died(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = multiprocessing.get_context('spawn').Queue()
+            marker = os.path.join(directory, 'crashed')
+            router = ShardRouter(1, functools.partial(crash_once_worker, results, marker), restart_delay=0)
+            router.start()
+
+            try:
+                router.route(make_update(1, user_id=1))
+
+                self.assertEqual(results.get(timeout=30), (0, 1, 1))
+            finally:
+                router.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
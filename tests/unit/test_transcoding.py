@@ -0,0 +1,165 @@
+import asyncio
+import unittest
+
+from utils import transcoding
+from utils.ffmpeg import FFmpegProgress
+from utils.transcoding import (
+    CostModel,
+    Operation,
+    TranscodingQueueFullError,
+    TranscodingScheduler,
+    run_operation,
+    transcode,
+    transcoding_operation,
+)
+
+
+class TestTranscodingScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_running_jobs_to_slots(self):
+        scheduler = TranscodingScheduler(slots=2, max_queue=10, notify_threshold=1)
+        running = 0
+        peak = 0
+
+        async def job() -> None:
+            nonlocal running, peak
+
+            async with scheduler.slot(Operation.CUT, 10):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(job() for _ in range(6)))
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(scheduler.running, 0)
+        self.assertEqual(scheduler.waiting, 0)
+
+    async def test_reports_queue_position_and_rejects_when_full(self):
+        scheduler = TranscodingScheduler(slots=1, max_queue=2, notify_threshold=2)
+        release = asyncio.Event()
+        positions = []
+
+        async def notify(position: int) -> None:
+            positions.append(position)
+
+        async def job() -> None:
+            async with scheduler.slot(Operation.CUT, 10, on_queued=notify):
+                await release.wait()
+
+        tasks = [asyncio.create_task(job()) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(TranscodingQueueFullError):
+            async with scheduler.slot(Operation.CUT, 10):
+                pass
+
+        self.assertEqual(positions, [2])
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = TranscodingScheduler(slots=1, max_queue=5, notify_threshold=1)
+        release = asyncio.Event()
+
+        async def job() -> None:
+            async with scheduler.slot(Operation.CUT, 10):
+                await release.wait()
+
+        first = asyncio.create_task(job())
+        second = asyncio.create_task(job())
+        await asyncio.sleep(0)
+
+        self.assertEqual(scheduler.waiting, 1)
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+
+        self.assertEqual(scheduler.waiting, 0)
+
+        release.set()
+        await first
+
+        self.assertEqual(scheduler.running, 0)
+
+    async def test_shortest_expected_job_runs_first(self):
+        scheduler = TranscodingScheduler(slots=1, max_queue=5, notify_threshold=1)
+        release = asyncio.Event()
+        order = []
+
+        async def job(name: str, operation: Operation, duration: float) -> None:
+            async with scheduler.slot(operation, duration):
+                order.append(name)
+                await release.wait()
+
+        tasks = [
+            asyncio.create_task(job('running', Operation.CUT, 10)),
+            asyncio.create_task(job('long re-encode', Operation.CONVERT_BITRATE, 5400)),
+            asyncio.create_task(job('short cut', Operation.CUT, 10)),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ['running', 'short cut', 'long re-encode'])
+
+
+class TestTranscode(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registered = dict(transcoding._operation_functions)
+
+    def tearDown(self):
+        transcoding._operation_functions.clear()
+        transcoding._operation_functions.update(self.registered)
+
+    async def test_runs_registered_operation_locally_and_learns_its_cost(self):
+        calls = []
+        snapshots = []
+
+        @transcoding_operation(Operation.CUT)
+        async def fake_cut(input_path: str, on_progress=None) -> None:
+            calls.append(input_path)
+            await on_progress(FFmpegProgress(processed_seconds=50, elapsed_seconds=5))
+
+        async def collect(progress: FFmpegProgress) -> None:
+            snapshots.append(progress)
+
+        cost = transcoding.transcoding_scheduler.cost_model.costs[Operation.CUT]
+        samples = cost.samples
+
+        await transcode(Operation.CUT, 100, {'input_path': 'in.mp3'}, on_progress=collect)
+
+        self.assertEqual(calls, ['in.mp3'])
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual(cost.samples, samples + 1)
+
+    async def test_rejects_unregistered_operation(self):
+        transcoding._operation_functions.pop(Operation.CUT, None)
+
+        with self.assertRaises(RuntimeError):
+            await run_operation(Operation.CUT, {})
+
+
+class TestCostModel(unittest.TestCase):
+    def test_learns_real_time_factor(self):
+        cost_model = CostModel(smoothing_factor=0.5)
+
+        cost_model.record(Operation.CONVERT_BITRATE, 100, 10.3)
+        self.assertAlmostEqual(cost_model.costs[Operation.CONVERT_BITRATE].real_time_factor, 0.1)
+
+        cost_model.record(Operation.CONVERT_BITRATE, 100, 20.3)
+        self.assertAlmostEqual(cost_model.costs[Operation.CONVERT_BITRATE].real_time_factor, 0.15)
+        self.assertEqual(cost_model.costs[Operation.CONVERT_BITRATE].samples, 2)
+
+    def test_longer_audio_costs_more(self):
+        cost_model = CostModel()
+
+        self.assertLess(
+            cost_model.estimate(Operation.CUT, 10),
+            cost_model.estimate(Operation.CONVERT_BITRATE, 5400),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
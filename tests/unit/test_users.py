@@ -0,0 +1,51 @@
+import unittest
+from types import SimpleNamespace
+
+from utils.users import UserCache
+
+
+def build_user(user_id: int) -> SimpleNamespace:
+    return SimpleNamespace(user_id=user_id, number_of_files_sent=0)
+
+
+class TestUserCache(unittest.TestCase):
+    def test_counts_hits_and_misses(self):
+        cache = UserCache(max_size=10, ttl=60)
+        user = build_user(1)
+
+        self.assertIsNone(cache.get(1, load=False))
+
+        cache.put(user)
+
+        self.assertIs(cache.get(1, load=False), user)
+        self.assertEqual((cache.stats.hits, cache.stats.misses, cache.stats.hit_rate), (1, 1, 0.5))
+
+    def test_drops_the_least_recently_used_users(self):
+        cache = UserCache(max_size=2, ttl=60)
+
+        for user_id in (1, 2):
+            cache.put(build_user(user_id))
+
+        cache.get(1, load=False)
+        cache.put(build_user(3))
+
+        self.assertIsNone(cache.get(2, load=False))
+        self.assertIsNotNone(cache.get(1, load=False))
+        self.assertEqual((len(cache), cache.stats.evicted), (2, 1))
+
+    def test_reads_expired_and_invalidated_users_again(self):
+        cache = UserCache(max_size=10, ttl=-1)
+        cache.put(build_user(1))
+
+        self.assertIsNone(cache.get(1, load=False))
+        self.assertEqual(len(cache), 0)
+
+        cache.ttl = 60
+        cache.put(build_user(1))
+        cache.invalidate(1)
+
+        self.assertIsNone(cache.get(1, load=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+
+import asyncio
+
+from config.envs import FFMPEG_WORKERS, SHUTDOWN_DRAIN_TIMEOUT
+# Importing the services registers the operations they perform with ``utils.transcoding``.
+from modules.bitrate_changer import service as bitrate_changer_service  # noqa: F401 pylint: disable=unused-import
+from modules.core import service as core_service  # noqa: F401 pylint: disable=unused-import
+from modules.cutter import service as cutter_service  # noqa: F401 pylint: disable=unused-import
+from modules.voice_converter import service as voice_converter_service  # noqa: F401 pylint: disable=unused-import
+from utils.job_queue import TranscodingWorker
+from utils.logging import configure_logging, get_logger
+from utils.shutdown import stop_on_signals
+
+logger = get_logger(__name__)
+
+
+async def run() -> None:
+    stop_event = asyncio.Event()
+
+    with stop_on_signals(stop_event):
+        await TranscodingWorker(FFMPEG_WORKERS).run(stop_event, drain_timeout=SHUTDOWN_DRAIN_TIMEOUT)
+
+
+def main():
+    configure_logging()
+
+    logger.info("Starting transcoding worker")
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
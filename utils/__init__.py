@@ -10,6 +10,7 @@ from .misc import (
     get_file_name,
     get_message,
     get_message_text,
+    get_retry_after_seconds,
     get_user_data,
     get_user_language_or_fallback,
     is_user_data_empty,
@@ -35,6 +36,7 @@ __all__ = [
     "get_logger",
     "get_message",
     "get_message_text",
+    "get_retry_after_seconds",
     "get_user_data",
     "get_user_language_or_fallback",
     "is_user_data_empty",
@@ -0,0 +1,205 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from telegram.ext import CallbackContext
+
+from config.constants import USER_ACTIVITY_BATCH_SIZE
+from database.models import User
+from .languages import language_catalog
+from .logging import get_logger
+from .users import UserCache, user_cache
+
+logger = get_logger(__name__)
+
+ACTIVE_USER_STATUS_ID = 1
+
+# Creates a new user or records the interaction of an existing one atomically, and marks them active today in
+# ``user_activity_daily`` (see ``utils.rollups``). All parts of a ``WITH`` statement see the same snapshot, so
+# ``previous`` is the row as it was before, and ``xmax`` is 0 only for a row that was inserted.
+UPSERT_USER_QUERY = """
+WITH previous AS (
+    SELECT username, user_status_id FROM users WHERE user_id = %s
+),
+upserted AS (
+    INSERT INTO users (
+        user_id, username, language_id, number_of_files_sent, user_status_id, last_interaction_at,
+        created_at, updated_at
+    )
+    VALUES (%s, %s, %s, 0, %s, NOW(), NOW(), NOW())
+    ON CONFLICT (user_id) DO UPDATE
+    SET username = COALESCE(EXCLUDED.username, users.username),
+        user_status_id = EXCLUDED.user_status_id,
+        last_interaction_at = NOW(),
+        updated_at = NOW()
+    RETURNING *, xmax = 0 AS created
+),
+logged AS (
+    INSERT INTO user_activity_daily (day, user_id)
+    SELECT (last_interaction_at AT TIME ZONE 'UTC')::date, user_id FROM upserted
+    ON CONFLICT DO NOTHING
+)
+SELECT upserted.*, previous.username AS previous_username, previous.user_status_id AS previous_user_status_id
+FROM upserted LEFT JOIN previous ON TRUE
+"""
+
+# Joining ``users`` a second time reads the rows as they were before the update, so the changes can be logged. The
+# days the users interacted on are marked in ``user_activity_daily`` by the same statement.
+UPDATE_ACTIVITY_QUERY = """
+WITH activity (user_id, username, last_interaction_at) AS (VALUES {values}),
+updated AS (
+    UPDATE users
+    SET username = COALESCE(activity.username, users.username),
+        user_status_id = %s,
+        last_interaction_at = activity.last_interaction_at,
+        updated_at = NOW()
+    FROM activity, users AS previous
+    WHERE users.user_id = activity.user_id AND previous.id = users.id
+    RETURNING users.*, previous.username AS previous_username, previous.user_status_id AS previous_user_status_id
+),
+logged AS (
+    INSERT INTO user_activity_daily (day, user_id)
+    SELECT (last_interaction_at AT TIME ZONE 'UTC')::date, user_id FROM updated
+    ON CONFLICT DO NOTHING
+)
+SELECT * FROM updated
+"""
+ACTIVITY_VALUES = "(%s::bigint, %s::text, %s::timestamptz)"
+
+
+@dataclass
+class UserActivity:
+    """The latest interaction of a user that is not written yet."""
+
+    username: str | None
+    last_interaction_at: datetime
+
+
+class UserActivityBuffer:
+    """
+    Buffers the interactions of users and writes them to the ``users`` table in bulk.
+
+    An update of a user who is not in the user cache runs a single ``INSERT … ON CONFLICT DO UPDATE``, which creates
+    the user if they are new and records the interaction otherwise. Updates of cached users only record the
+    interaction in memory: the latest username and interaction time of each user are kept, and :meth:`flush` writes
+    all of them, and reactivates users marked as blocked or deleted, with one ``UPDATE … FROM (VALUES …)`` per
+    ``USER_ACTIVITY_BATCH_SIZE`` users. The written rows replace the cached ones.
+
+    :param cache: UserCache: The cache of user rows
+    """
+
+    def __init__(self, cache: UserCache = user_cache):
+        self.cache = cache
+        self._pending: dict[int, UserActivity] = {}
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def record(self, user_id: int, username: str | None) -> str | None:
+        """
+        Records an interaction of a user, creating the user if they are new.
+
+        :param user_id: int: The user's ``user_id``
+        :param username: str | None: The user's current username, if they have one
+        :return: str | None: The username the user is stored with, as far as this process knows
+        """
+        if not self.cache.get(user_id, load=False):
+            user = await asyncio.to_thread(self._upsert_user, user_id, username)
+            self.cache.put(user)
+
+            if user.created:
+                logger.info("User %s started using the bot", user_id)
+            else:
+                log_changes(user)
+
+            return user.username
+
+        previous = self._pending.get(user_id)
+        self._pending[user_id] = UserActivity(
+            username=username or (previous.username if previous else None),
+            last_interaction_at=datetime.now(timezone.utc),
+        )
+
+        return self._pending[user_id].username
+
+    async def flush(self) -> int:
+        """
+        Writes the buffered interactions. If that fails, they are kept for the next flush unless newer ones came in.
+
+        :return: int: The number of users that were updated
+        """
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            try:
+                updated = await asyncio.to_thread(self._update_users, pending)
+            except Exception as error:
+                logger.warning("Writing the activity of %s user(s) failed: %s", len(pending), error)
+
+                for user_id, activity in pending.items():
+                    self._pending.setdefault(user_id, activity)
+
+                return 0
+
+        for user in updated:
+            log_changes(user)
+            self.cache.put(user)
+
+        # A user whose row is gone is created again on their next update.
+        for user_id in pending.keys() - {user.user_id for user in updated}:
+            self.cache.invalidate(user_id)
+
+        return len(updated)
+
+    @staticmethod
+    def _upsert_user(user_id: int, username: str | None) -> User:
+        default_language = language_catalog.default
+        language_id = default_language.id if default_language else None
+
+        return User.statement(
+            UPSERT_USER_QUERY, [user_id, user_id, username, language_id, ACTIVE_USER_STATUS_ID]
+        ).first()
+
+    @staticmethod
+    def _update_users(pending: dict[int, UserActivity]) -> list[User]:
+        activities = list(pending.items())
+        updated = []
+
+        for start in range(0, len(activities), USER_ACTIVITY_BATCH_SIZE):
+            batch = activities[start:start + USER_ACTIVITY_BATCH_SIZE]
+            bindings = [
+                value
+                for user_id, activity in batch
+                for value in (user_id, activity.username, activity.last_interaction_at)
+            ]
+            query = UPDATE_ACTIVITY_QUERY.format(values=", ".join([ACTIVITY_VALUES] * len(batch)))
+
+            updated.extend(User.statement(query, [*bindings, ACTIVE_USER_STATUS_ID]) or [])
+
+        return updated
+
+
+def log_changes(user: User) -> None:
+    """
+    Logs how an interaction changed a user, from a row of :data:`UPSERT_USER_QUERY` or :data:`UPDATE_ACTIVITY_QUERY`.
+
+    :param user: User: The updated user, with its ``previous_username`` and ``previous_user_status_id``
+    """
+    if user.username != user.previous_username:
+        logger.info("User %s changed username from %s to %s", user.user_id, user.previous_username, user.username)
+
+    if user.previous_user_status_id != ACTIVE_USER_STATUS_ID:
+        logger.info("User %s is interacting again. Resetting status to active.", user.user_id)
+
+
+user_activity = UserActivityBuffer()
+
+
+async def flush_user_activity(_context: CallbackContext) -> None:
+    """A ``JobQueue`` callback that writes the buffered user activity, see :meth:`UserActivityBuffer.flush`."""
+    await user_activity.flush()
@@ -0,0 +1,94 @@
+import asyncio
+
+from telegram.ext import CallbackContext
+
+from database.models import Admin
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class AdminRegistry:
+    """
+    The ``admins`` table, held in memory by every process, so authorization checks cost no database round trip.
+
+    It is loaded on first use (``register_modules`` does that at startup). ``/addadmin`` and ``/deladmin`` update it
+    right after writing the table, and :meth:`refresh` reads the table again every ``ADMIN_REFRESH_INTERVAL_SECONDS``
+    to pick up the changes made through other processes. A refresh that overlaps a local change is discarded, so it
+    never brings back an admin who was just removed.
+    """
+
+    def __init__(self):
+        self._admins: frozenset[int] | None = None
+        self._owners: frozenset[int] = frozenset()
+        self._version = 0
+
+    def refresh(self) -> int:
+        """
+        Reads the ``admins`` table again.
+
+        :return: int: The number of admins
+        """
+        version = self._version
+        admins, owners = self._load_admins()
+
+        if version != self._version:
+            logger.debug("Discarded an admin refresh that overlapped a change")
+
+            return len(self._admins)
+
+        self._admins, self._owners = admins, owners
+
+        return len(admins)
+
+    @staticmethod
+    def _load_admins() -> tuple[frozenset[int], frozenset[int]]:
+        rows = Admin.select('admin_user_id', 'is_owner').get()
+
+        return (
+            frozenset(row.admin_user_id for row in rows),
+            frozenset(row.admin_user_id for row in rows if row.is_owner),
+        )
+
+    def _load_once(self) -> None:
+        if self._admins is None:
+            self.refresh()
+
+    def is_admin(self, user_id: int) -> bool:
+        self._load_once()
+
+        return user_id in self._admins
+
+    def is_owner(self, user_id: int) -> bool:
+        self._load_once()
+
+        return user_id in self._owners
+
+    def add(self, user_id: int) -> None:
+        """
+        Records an admin that was just added to the ``admins`` table.
+
+        :param user_id: int: The ``admin_user_id`` of the admin
+        """
+        self._load_once()
+        self._version += 1
+        self._admins = self._admins | {user_id}
+
+    def remove(self, user_id: int) -> None:
+        """
+        Records an admin that was just deleted from the ``admins`` table.
+
+        :param user_id: int: The ``admin_user_id`` of the admin
+        """
+        self._load_once()
+        self._version += 1
+        self._admins = self._admins - {user_id}
+        self._owners = self._owners - {user_id}
+
+
+admin_registry = AdminRegistry()
+
+
+async def refresh_admins(_context: CallbackContext) -> None:
+    """A ``JobQueue`` callback that reads the ``admins`` table again, see :meth:`AdminRegistry.refresh`."""
+    await asyncio.to_thread(admin_registry.refresh)
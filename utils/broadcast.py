@@ -0,0 +1,263 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from config.constants import (
+    BROADCAST_BATCH_SIZE,
+    BROADCAST_BURST,
+    BROADCAST_CONCURRENCY,
+    BROADCAST_MAX_ATTEMPTS,
+    BROADCAST_MESSAGES_PER_SECOND,
+)
+from database.models import User, UserStatus
+from .activity import ACTIVE_USER_STATUS_ID
+from .logging import get_logger
+from .misc import get_retry_after_seconds
+from .users import user_cache
+
+logger = get_logger(__name__)
+
+# How much a flood wait slows the broadcast down, and how much of the full rate every delivered message wins back.
+BACKOFF_FACTOR = 0.75
+MIN_RATE_FACTOR = 0.2
+RECOVERY_FACTOR = 0.01
+
+# The users a broadcast reaches, in ``id`` order, a batch at a time. Blocked and deleted users are skipped; they are
+# active again as soon as they interact with the bot.
+RECIPIENTS_QUERY = """
+SELECT id, user_id FROM users
+WHERE user_status_id = %s AND id > %s {language}
+ORDER BY id
+LIMIT %s
+"""
+RECIPIENTS_LANGUAGE = "AND language_id = %s"
+
+SendFunction = Callable[[int], Awaitable[Any]]
+
+
+class TokenBucket:
+    """
+    Spaces messages out to ``rate`` per second, allowing bursts of up to ``capacity``. Waiters are served in order.
+
+    A flood wait (:meth:`pause`) stops everyone until it is over and lowers the rate, which every delivered message
+    raises a little again (:meth:`recover`), up to the initial one.
+
+    :param rate: float: Messages per second
+    :param capacity: int: The largest burst
+    """
+
+    def __init__(self, rate: float = BROADCAST_MESSAGES_PER_SECOND, capacity: int = BROADCAST_BURST):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a message may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops all sends for ``seconds``, as Telegram asked with a ``RetryAfter``, and slows down afterwards.
+
+        :param seconds: float: The seconds to wait
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self.rate = max(self.rate * BACKOFF_FACTOR, self.max_rate * MIN_RATE_FACTOR)
+
+    def recover(self) -> None:
+        """Speeds up a little after a delivered message."""
+        self.rate = min(self.rate + self.max_rate * RECOVERY_FACTOR, self.max_rate)
+
+
+@dataclass
+class BroadcastResult:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    deleted: int = 0
+    cancelled: bool = False
+
+
+class Broadcast:
+    """
+    Sends a message to all active users, or those of a language, on the event loop.
+
+    The recipients are read a batch at a time into a bounded queue, which ``concurrency`` workers send from, each
+    taking a token of the shared :class:`TokenBucket` before every send. A ``RetryAfter`` pauses all of them and the
+    message is tried again, up to ``BROADCAST_MAX_ATTEMPTS`` times, as it is after network errors. Users who blocked
+    the bot or deleted their account are marked so in bulk and skipped by the next broadcast.
+
+    :param send: SendFunction: Sends the message to a ``chat_id``
+    :param language_id: int | None: Only send to users of this language
+    :param bucket: TokenBucket | None: The rate limit, a new one by default
+    :param concurrency: int: The number of sends in flight at once
+    :param batch_size: int: The number of recipients read at once
+    """
+
+    def __init__(
+            self,
+            send: SendFunction,
+            language_id: int | None = None,
+            bucket: TokenBucket | None = None,
+            concurrency: int = BROADCAST_CONCURRENCY,
+            batch_size: int = BROADCAST_BATCH_SIZE,
+    ):
+        self.send = send
+        self.language_id = language_id
+        self.bucket = bucket or TokenBucket()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.result = BroadcastResult()
+        self.done = False
+        self._unreachable: dict[str, list[int]] = {'blocked': [], 'deleted': []}
+
+    def cancel(self) -> None:
+        """Stops the broadcast. Messages already being sent are still delivered."""
+        self.result.cancelled = True
+
+    async def run(self) -> BroadcastResult:
+        """
+        Sends the message to every recipient, unless cancelled.
+
+        :return: BroadcastResult: How many messages were sent and why the others were not
+        """
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.batch_size)
+        tasks = [
+            asyncio.create_task(self._produce(queue)),
+            *(asyncio.create_task(self._consume(queue)) for _ in range(self.concurrency)),
+        ]
+
+        try:
+            done, _pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+
+            for task in done:
+                task.result()
+        finally:
+            # After a failure, or when ``run`` itself is cancelled, the other tasks would wait on the queue forever.
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._mark_unreachable()
+            self.done = True
+
+        return self.result
+
+    async def _produce(self, queue: asyncio.Queue) -> None:
+        after_id = 0
+
+        while not self.result.cancelled:
+            recipients = await asyncio.to_thread(self._load_recipients, after_id, self.batch_size)
+
+            for _row_id, user_id in recipients:
+                await queue.put(user_id)
+
+            if len(recipients) < self.batch_size:
+                break
+
+            after_id = recipients[-1][0]
+            await self._mark_unreachable()
+
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _consume(self, queue: asyncio.Queue) -> None:
+        while (user_id := await queue.get()) is not None:
+            if not self.result.cancelled:
+                await self._deliver(user_id)
+
+    async def _deliver(self, user_id: int) -> None:
+        for attempt in range(1, BROADCAST_MAX_ATTEMPTS + 1):
+            await self.bucket.acquire()
+
+            try:
+                await self.send(user_id)
+            except RetryAfter as error:
+                seconds = get_retry_after_seconds(error)
+                self.bucket.pause(seconds)
+                logger.warning(
+                    "Broadcast hit the flood limit, pausing for %ss, then %.1f msg/s", seconds, self.bucket.rate
+                )
+            except Forbidden as error:
+                status = 'deleted' if "user is deactivated" in str(error).lower() else 'blocked'
+                logger.info("User %s is unreachable (%s), marking as %s", user_id, error, status)
+                self._unreachable[status].append(user_id)
+                setattr(self.result, status, getattr(self.result, status) + 1)
+                self.result.failed += 1
+
+                return
+            except BadRequest as error:
+                logger.warning("Broadcast delivery to user %s failed: %s", user_id, error)
+                self.result.failed += 1
+
+                return
+            except NetworkError as error:
+                logger.warning("Broadcast delivery to user %s failed (attempt %s): %s", user_id, attempt, error)
+            except Exception as error:
+                logger.warning("Broadcast delivery to user %s failed: %s", user_id, error)
+                self.result.failed += 1
+
+                return
+            else:
+                self.result.sent += 1
+                self.bucket.recover()
+
+                return
+
+        self.result.failed += 1
+
+    async def _mark_unreachable(self) -> None:
+        for status, user_ids in self._unreachable.items():
+            if not user_ids:
+                continue
+
+            self._unreachable[status] = []
+
+            try:
+                await asyncio.to_thread(self._mark_users, user_ids, status)
+            except Exception as error:
+                logger.warning("Marking %s user(s) as %s failed: %s", len(user_ids), status, error)
+
+    def _load_recipients(self, after_id: int, limit: int) -> list[tuple[int, int]]:
+        language = RECIPIENTS_LANGUAGE if self.language_id else ''
+        bindings = [ACTIVE_USER_STATUS_ID, after_id, *([self.language_id] if self.language_id else []), limit]
+        rows = User.statement(RECIPIENTS_QUERY.format(language=language), bindings)
+
+        return [(row.id, row.user_id) for row in rows or []]
+
+    @staticmethod
+    def _mark_users(user_ids: list[int], status: str) -> None:
+        user_status = UserStatus.where('slug', status).first()
+
+        if not user_status:
+            return
+
+        User.where_in('user_id', user_ids).update({'user_status_id': user_status.id})
+
+        for user_id in user_ids:
+            user_cache.invalidate(user_id)
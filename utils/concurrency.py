@@ -0,0 +1,92 @@
+from collections import deque
+from typing import Any, Awaitable
+
+from telegram.ext import BaseUpdateProcessor
+
+from .jobs import cancel_user_jobs, is_job_cancelling_update
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def get_ordering_key(update: object) -> int | None:
+    """
+    Get the key that updates must be serialized on. Updates of the same user share a key, so they are processed in
+    the order they arrived. Falls back to the chat for updates without a user.
+
+    :param update: object: The ``update`` object
+    :return: int | None: The ``user_id`` (or ``chat_id``) of the update; ``None`` if it has neither
+    """
+    user = getattr(update, 'effective_user', None)
+
+    if user:
+        return user.id
+
+    chat = getattr(update, 'effective_chat', None)
+
+    if chat:
+        return chat.id
+
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates of different users concurrently while keeping the updates of each user strictly in order.
+
+    The first update of a user takes one of the ``max_concurrent_updates`` slots and drains that user's backlog
+    sequentially. Later updates of the same user are appended to the backlog and release their slot right away, so a
+    user who keeps sending messages during a long encode never holds more than one slot.
+
+    Updates that start over (``/new``, ``/start``, a new audio, ...) cancel the user's in-flight jobs as soon as they
+    arrive, instead of waiting behind them in the backlog.
+    """
+
+    __slots__ = ('_backlogs',)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._backlogs: dict[int, deque[Awaitable[Any]]] = {}
+
+    @property
+    def busy_keys(self) -> int:
+        """The number of users that currently have an update being processed."""
+        return len(self._backlogs)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = get_ordering_key(update)
+
+        if key is None:
+            await coroutine
+
+            return
+
+        if is_job_cancelling_update(update):
+            cancel_user_jobs(key)
+
+        backlog = self._backlogs.get(key)
+
+        if backlog is not None:
+            backlog.append(coroutine)
+
+            return
+
+        backlog = self._backlogs[key] = deque([coroutine])
+
+        try:
+            while backlog:
+                try:
+                    await backlog.popleft()
+                except Exception:
+                    logger.exception("Unhandled error while processing an update of %s", key)
+        finally:
+            del self._backlogs[key]
+
+            while backlog:
+                backlog.popleft().close()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,82 @@
+import asyncio
+
+from telegram.ext import CallbackContext
+
+from database.models import User
+from .logging import get_logger
+from .persistence import SqlitePersistence
+from .users import user_cache
+
+logger = get_logger(__name__)
+
+# The ``bot_data`` key of the counted files that are not added to ``users.number_of_files_sent`` yet, by ``user_id``.
+# ``bot_data`` is saved by the persistence, so they survive a crash or restart and are written after it.
+FILE_COUNTER_DELTAS = 'file_counter_deltas'
+
+ADD_FILES_SENT_QUERY = """
+WITH deltas (user_id, delta) AS (VALUES {values}),
+updated AS (
+    UPDATE users
+    SET number_of_files_sent = number_of_files_sent + deltas.delta, updated_at = NOW()
+    FROM deltas
+    WHERE users.user_id = deltas.user_id
+    RETURNING users.*
+)
+SELECT * FROM updated
+"""
+DELTA_VALUES = "(%s::bigint, %s::integer)"
+
+
+def add_files_sent(deltas: dict[int, int]) -> list[User]:
+    """
+    Adds counts to ``users.number_of_files_sent`` atomically, with one statement for all users.
+
+    :param deltas: dict[int, int]: The counts to add by ``user_id``
+    :return: list[User]: The updated users
+    """
+    query = ADD_FILES_SENT_QUERY.format(values=", ".join([DELTA_VALUES] * len(deltas)))
+    bindings = [value for user_id, delta in deltas.items() for value in (user_id, delta)]
+
+    return list(User.statement(query, bindings) or [])
+
+
+async def flush_file_counters(context: CallbackContext) -> None:
+    """
+    A ``JobQueue`` callback that writes the counted files to the database. Files counted while it runs stay for the
+    next run, and so do all counts if the write fails.
+
+    Once written, the counts are removed from ``bot_data``. A crash before ``bot_data`` is saved again would write them
+    a second time after the restart, so the sqlite persistence, which only writes the records that changed, saves it
+    right away. The pickle persistence would rewrite its whole file for that, so it saves ``bot_data`` on its own
+    schedule instead, and the window is up to its update interval.
+    """
+    deltas: dict[int, int] = context.bot_data.get(FILE_COUNTER_DELTAS)
+
+    if not deltas:
+        return
+
+    batch = dict(deltas)
+
+    try:
+        updated = await asyncio.to_thread(add_files_sent, batch)
+    except Exception as error:
+        logger.warning("Writing the file counts of %s user(s) failed: %s", len(batch), error)
+
+        return
+
+    for user_id, delta in batch.items():
+        if deltas[user_id] == delta:
+            del deltas[user_id]
+        else:
+            deltas[user_id] -= delta
+
+    for user in updated:
+        user_cache.put(user)
+
+    if len(updated) < len(batch):
+        logger.warning("Dropped the file counts of %s user(s) who do not exist", len(batch) - len(updated))
+
+    persistence = context.application.persistence
+
+    if isinstance(persistence, SqlitePersistence) and persistence.store_data.bot_data:
+        await persistence.update_bot_data(context.bot_data)
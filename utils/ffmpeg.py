@@ -0,0 +1,197 @@
+import asyncio
+import re
+import shlex
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from config.constants import FFMPEG_TIMEOUT_SECONDS
+from .logging import ffmpeg_logger
+
+LINE_SEPARATOR_PATTERN = re.compile(rb'[\r\n]+')
+READ_CHUNK_SIZE = 4096
+STDERR_TAIL_LINES = 50
+
+
+class FFmpegTimeoutError(RuntimeError):
+    """Raised when an ffmpeg process does not finish within its timeout."""
+
+
+@dataclass(frozen=True)
+class FFmpegProgress:
+    processed_seconds: float
+    elapsed_seconds: float
+    is_done: bool = False
+
+    @property
+    def real_time_factor(self) -> float | None:
+        """Seconds of processing per second of processed audio, or ``None`` before any audio has been processed."""
+        if self.processed_seconds <= 0:
+            return None
+
+        return self.elapsed_seconds / self.processed_seconds
+
+
+ProgressCallback = Callable[[FFmpegProgress], Awaitable[object]]
+
+
+class ProgressParser:
+    """
+    Incrementally parses the ``key=value`` lines that ffmpeg writes with ``-progress``. A block of keys ends with a
+    ``progress=continue`` or ``progress=end`` line, at which point a :class:`FFmpegProgress` snapshot is produced.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.processed_seconds = 0.0
+
+    def feed(self, line: str) -> FFmpegProgress | None:
+        """
+        :param line: str: A line of ffmpeg's progress output
+        :return: FFmpegProgress | None: A snapshot if the line ended a block; ``None`` otherwise
+        """
+        key, _, value = line.strip().partition('=')
+
+        if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+            # Despite its name, ``out_time_ms`` is in microseconds as well.
+            self.processed_seconds = int(value) / 1_000_000
+        elif key == 'out_time' and ':' in value:
+            try:
+                hours, minutes, seconds = value.split(':')
+                self.processed_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            except ValueError:
+                pass
+        elif key == 'progress':
+            return FFmpegProgress(
+                processed_seconds=self.processed_seconds,
+                elapsed_seconds=time.monotonic() - self.started_at,
+                is_done=value == 'end',
+            )
+
+        return None
+
+
+async def _iter_lines(stream: asyncio.StreamReader) -> AsyncIterator[str]:
+    """
+    Yields the lines of a stream as they arrive. ffmpeg ends its status lines with ``\\r`` instead of ``\\n``, so both
+    are treated as line separators.
+
+    :param stream: asyncio.StreamReader: The stream to read from
+    """
+    buffer = b''
+
+    while chunk := await stream.read(READ_CHUNK_SIZE):
+        *lines, buffer = LINE_SEPARATOR_PATTERN.split(buffer + chunk)
+
+        for line in lines:
+            if line:
+                yield line.decode(errors='replace')
+
+    if buffer:
+        yield buffer.decode(errors='replace')
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+    await process.wait()
+
+
+async def run_ffmpeg(
+        cmd: list[str],
+        operation: str,
+        timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+        on_progress: ProgressCallback | None = None,
+) -> None:
+    """
+    Runs an ffmpeg command without blocking the event loop. Its output is streamed to ``ffmpeg_logger`` line by line
+    while the process runs.
+
+    The process is killed if it exceeds ``timeout`` or if the awaiting task is cancelled.
+
+    :param cmd: list[str]: The command to run
+    :param operation: str: A human-readable name of the operation, used in logs
+    :param timeout: float | None: Seconds to wait for the process; ``None`` waits forever
+    :param on_progress: ProgressCallback | None: If given, ffmpeg is started with ``-progress pipe:1`` and this is
+        awaited with every progress snapshot
+    :raises FFmpegTimeoutError: The process did not finish in time
+    :raises RuntimeError: The process exited with a non-zero exit code
+    """
+    if on_progress:
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+
+    ffmpeg_logger.debug("Running ffmpeg for %s: %s", operation, shlex.join(cmd))
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stderr_tail: deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+    progress_parser = ProgressParser()
+    last_progress: FFmpegProgress | None = None
+
+    async def pump(stream: asyncio.StreamReader, stream_name: str) -> None:
+        nonlocal last_progress
+
+        async for line in _iter_lines(stream):
+            if stream_name == 'stderr':
+                stderr_tail.append(line)
+            elif on_progress:
+                progress = progress_parser.feed(line)
+
+                if progress:
+                    last_progress = progress
+
+                    try:
+                        await on_progress(progress)
+                    except Exception:
+                        ffmpeg_logger.warning("Progress callback failed for %s", operation, exc_info=True)
+
+                continue
+
+            ffmpeg_logger.debug("%s %s: %s", operation, stream_name, line)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(pump(process.stdout, 'stdout'), pump(process.stderr, 'stderr'), process.wait()),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError as error:
+        ffmpeg_logger.error("ffmpeg command for %s timed out after %ss", operation, timeout)
+
+        raise FFmpegTimeoutError(f"ffmpeg timed out after {timeout}s.\nCommand: {shlex.join(cmd)}") from error
+    finally:
+        if process.returncode is None:
+            ffmpeg_logger.warning("Killing ffmpeg process %s for %s", process.pid, operation)
+
+        await _kill(process)
+
+    if process.returncode != 0:
+        ffmpeg_logger.error("ffmpeg command failed for %s with exit code %s", operation, process.returncode)
+        stderr = '\n'.join(stderr_tail)
+
+        raise RuntimeError(
+            "ffmpeg failed.\n"
+            f"Command: {shlex.join(cmd)}\n\n"
+            f"STDERR:\n{stderr}"
+        )
+
+    if last_progress and last_progress.real_time_factor is not None:
+        ffmpeg_logger.info(
+            "ffmpeg processed %.1fs of audio for %s in %.1fs (%.3fx real time)",
+            last_progress.processed_seconds,
+            operation,
+            last_progress.elapsed_seconds,
+            last_progress.real_time_factor
+        )
+
+    ffmpeg_logger.debug("ffmpeg command completed for %s with exit code 0", operation)
@@ -0,0 +1,609 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from telegram import Bot
+from telegram.error import TelegramError
+from telegram.ext import CallbackContext
+
+from config.constants import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL_SECONDS, JOB_RESUME_WINDOW_HOURS
+from config.envs import FFMPEG_MAX_QUEUE, FFMPEG_QUEUE_NOTIFY_AT, TRANSCODING_BACKEND
+from database.models import Job
+from .ffmpeg import FFmpegProgress, ProgressCallback
+from .fs import delete_file
+from .i18n import t
+from .jobs import JobCancelledError, is_draining, run_user_job
+from .logging import get_logger
+from .sharding import get_shard
+from .transcoding import (
+    AGING_RATE,
+    Operation,
+    QueuePositionCallback,
+    TranscodingQueueFullError,
+    run_operation,
+    transcode,
+    transcoding_scheduler,
+)
+
+logger = get_logger(__name__)
+
+DeliveryFunction = Callable[[Bot, Job], Awaitable[None]]
+
+WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}"
+
+# ``FOR UPDATE SKIP LOCKED`` lets any number of workers claim jobs at the same time without ever getting the same
+# one. The CTE makes the claimed row come back as the result of a ``SELECT``.
+CLAIM_JOB_QUERY = """
+WITH claimed AS (
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, worker = %s, started_at = NOW(), updated_at = NOW()
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status = 'pending'
+        ORDER BY priority
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *
+)
+SELECT * FROM claimed
+"""
+
+# Like ``CLAIM_JOB_QUERY``, the attempt is counted by the database, so concurrent starts cannot lose one.
+START_JOB_QUERY = """
+UPDATE jobs
+SET status = 'running', attempts = attempts + 1, worker = %s, started_at = NOW(), updated_at = NOW()
+WHERE id = %s
+"""
+
+UPDATE_PROGRESS_QUERY = """
+WITH updated AS (
+    UPDATE jobs
+    SET progress_seconds = %s, real_time_factor = %s, updated_at = NOW()
+    WHERE id = %s
+    RETURNING status
+)
+SELECT status FROM updated
+"""
+
+# A running job whose worker has not reported progress for a lease is assumed to be lost with its worker. It is
+# queued again, unless it has used up its attempts.
+REQUEUE_STALE_JOB_QUERY = """
+UPDATE jobs
+SET status = CASE WHEN attempts < %s THEN 'pending' ELSE 'failed' END,
+    error = CASE WHEN attempts < %s THEN error ELSE 'The worker running the job was lost' END,
+    worker = NULL,
+    updated_at = NOW()
+WHERE id = %s AND status = 'running' AND updated_at < NOW() - %s * INTERVAL '1 second'
+"""
+
+CLAIM_DELIVERY_QUERY = """
+WITH claimed AS (
+    UPDATE jobs
+    SET delivery_started_at = NOW(), updated_at = NOW()
+    WHERE id = %s AND status = 'done' AND delivery_started_at IS NULL
+    RETURNING id
+)
+SELECT id FROM claimed
+"""
+
+# Fails a job that was interrupted and cannot be resumed, unless it has been finished in the meantime; the row comes
+# back only if it was failed here.
+FAIL_INTERRUPTED_JOB_QUERY = """
+WITH failed AS (
+    UPDATE jobs
+    SET status = 'failed', error = %s, finished_at = NOW(), updated_at = NOW()
+    WHERE id = %s AND status IN ('created', 'pending', 'running')
+    RETURNING id
+)
+SELECT id FROM failed
+"""
+
+_delivery_functions: dict[Operation, DeliveryFunction] = {}
+
+
+def job_delivery(operation: Operation) -> Callable[[DeliveryFunction], DeliveryFunction]:
+    """
+    Registers the function that sends the result of an operation's jobs to their users. Only jobs whose operation has
+    a delivery function are resumed after a restart.
+
+    :param operation: Operation: The operation whose results the function delivers
+    """
+
+    def decorator(function: DeliveryFunction) -> DeliveryFunction:
+        _delivery_functions[operation] = function
+
+        return function
+
+    return decorator
+
+
+def create_job(
+        operation: Operation,
+        duration: float,
+        parameters: dict[str, Any],
+        user_id: int,
+        chat_id: int,
+        music_message_id: int | None = None,
+        status_message_id: int | None = None,
+        delivery: dict[str, Any] | None = None,
+) -> Job:
+    """
+    Records a transcoding job before it is run, so it can be resumed if the bot goes down before its result has been
+    delivered.
+
+    Jobs are run shortest expected job first. Like :class:`utils.transcoding.TranscodingScheduler`, every second a
+    job waits makes it look one second shorter; since that shift is the same for every job, it is folded into a
+    ``priority`` that is fixed when the job is created.
+
+    :param operation: Operation: The operation to run
+    :param duration: float: The duration of the audio to process in seconds
+    :param parameters: dict[str, Any]: The keyword arguments of the operation's service function
+    :param user_id: int: The ``user_id`` of the user who owns the job
+    :param chat_id: int: The ``chat_id`` the result goes to
+    :param music_message_id: int | None: The message of the original audio, which the result replies to
+    :param status_message_id: int | None: The "uploading" message, deleted once the result is delivered
+    :param delivery: dict[str, Any] | None: Whatever the delivery function needs besides the parameters, plus the
+        user's ``language``
+    :return: Job: The created job
+    """
+    expected_seconds = transcoding_scheduler.cost_model.estimate(operation, duration)
+
+    return Job.create({
+        'user_id': user_id,
+        'chat_id': chat_id,
+        'music_message_id': music_message_id,
+        'status_message_id': status_message_id,
+        'operation': operation.value,
+        'parameters': parameters,
+        'delivery': delivery or {},
+        'status': Job.CREATED,
+        'duration': duration,
+        'expected_seconds': expected_seconds,
+        'priority': expected_seconds + AGING_RATE * time.time(),
+    })
+
+
+def count_pending_jobs() -> int:
+    return Job.where('status', Job.PENDING).count()
+
+
+def get_queue_position(job: Job) -> int:
+    """
+    :param job: Job: A pending job
+    :return: int: The 1-based position of the job among the pending jobs
+    """
+    return 1 + Job.where('status', Job.PENDING).where('priority', '<', job.priority).count()
+
+
+def submit_job(job_id: int) -> None:
+    Job.where('id', job_id).where('status', Job.CREATED).update({'status': Job.PENDING})
+
+
+def claim_job(worker: str) -> Job | None:
+    """
+    Marks the pending job with the lowest priority as running.
+
+    :param worker: str: The name of the claiming worker
+    :return: Job | None: The claimed job; ``None`` if there is no pending job
+    """
+    jobs = Job.statement(CLAIM_JOB_QUERY, [worker])
+
+    return jobs.first() if jobs else None
+
+
+def start_job(job_id: int, worker: str) -> None:
+    Job.statement(START_JOB_QUERY, [worker, job_id])
+
+
+def update_job_progress(job_id: int, progress: FFmpegProgress | None) -> str | None:
+    """
+    Stores the progress of a running job.
+
+    :return: str | None: The current status of the job, e.g. ``cancelled`` if its owner gave up on it
+    """
+    jobs = Job.statement(UPDATE_PROGRESS_QUERY, [
+        progress.processed_seconds if progress else 0,
+        progress.real_time_factor if progress else None,
+        job_id,
+    ])
+
+    return jobs.first().status if jobs else None
+
+
+def requeue_stale_job(job_id: int) -> None:
+    Job.statement(REQUEUE_STALE_JOB_QUERY, [JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, job_id, JOB_LEASE_SECONDS])
+
+
+def finish_job(job_id: int, status: str, error: str | None = None, real_time_factor: float | None = None) -> None:
+    values = {'status': status, 'error': error, 'finished_at': datetime.now(timezone.utc)}
+
+    if real_time_factor is not None:
+        values['real_time_factor'] = real_time_factor
+
+    Job.where('id', job_id).where_in('status', Job.UNFINISHED_STATUSES).update(values)
+
+
+def cancel_job(job_id: int) -> None:
+    finish_job(job_id, Job.CANCELLED)
+
+
+def release_job(job_id: int, worker: str) -> None:
+    """Puts a job that a worker is shutting down with back into the queue, without waiting for its lease to expire."""
+    Job.where('id', job_id).where('status', Job.RUNNING).where('worker', worker).update({
+        'status': Job.PENDING,
+        'worker': None,
+    })
+
+
+def claim_delivery(job_id: int) -> bool:
+    """
+    Marks the result of a finished job as being delivered.
+
+    :return: bool: Whether the delivery was claimed; ``False`` if it had been claimed before
+    """
+    return bool(Job.statement(CLAIM_DELIVERY_QUERY, [job_id]))
+
+
+def mark_delivered(job_id: int) -> None:
+    Job.where('id', job_id).update({'delivered_at': datetime.now(timezone.utc)})
+
+
+def mark_used(job_id: int) -> None:
+    """Marks a finished job whose result its handler used itself, rather than sending it, as delivered."""
+    now = datetime.now(timezone.utc)
+
+    Job.where('id', job_id).update({'delivery_started_at': now, 'delivered_at': now})
+
+
+def fail_interrupted_job(job_id: int) -> bool:
+    """
+    :return: bool: Whether the job was failed; ``False`` if it had been finished before
+    """
+    return bool(Job.statement(FAIL_INTERRUPTED_JOB_QUERY, ["Interrupted and not resumable", job_id]))
+
+
+def get_interrupted_jobs() -> list[Job]:
+    """
+    :return: list[Job]: The recent jobs that were neither finished nor delivered
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=JOB_RESUME_WINDOW_HOURS)
+    jobs = (
+        Job.where('created_at', '>', since)
+        .where_null('delivery_started_at')
+        .where_not_in('status', [Job.FAILED, Job.CANCELLED])
+        .order_by('id')
+        .get()
+    )
+
+    return list(jobs)
+
+
+def get_unconfirmed_deliveries() -> list[Job]:
+    """
+    :return: list[Job]: The recent jobs whose delivery was started but never confirmed, e.g. because the bot went down
+        while uploading their result
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=JOB_RESUME_WINDOW_HOURS)
+    jobs = (
+        Job.where('created_at', '>', since)
+        .where_not_null('delivery_started_at')
+        .where_null('delivered_at')
+        .order_by('id')
+        .get()
+    )
+
+    return list(jobs)
+
+
+async def run_job(
+        job: Job,
+        on_queued: QueuePositionCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+) -> Job:
+    """
+    Runs a created job and waits for it to finish.
+
+    With the ``local`` backend the job runs in this process (see :func:`utils.transcoding.transcode`). With the
+    ``postgres`` backend it is run by a transcoding worker (see ``transcoder.py``), which only works if the workers
+    see the same ``DATA_DIR`` as the bot. Either way, cancelling the wait cancels the job.
+
+    :param job: Job: The job to run
+    :param on_queued: QueuePositionCallback | None: Called with the queue position when the job has to wait
+    :param on_progress: ProgressCallback | None: Receives ffmpeg's progress
+    :raises TranscodingQueueFullError: The queue is full
+    :raises RuntimeError: The job failed
+    :return: Job: The finished job
+    """
+    try:
+        if TRANSCODING_BACKEND == 'postgres':
+            job = await _run_queued_job(job, on_queued, on_progress)
+        else:
+            job = await _run_local_job(job, on_queued, on_progress)
+    except asyncio.CancelledError:
+        if is_draining():
+            # Interrupted by a shutdown: the job stays unfinished, so the next start of the bot resumes it.
+            logger.info("Left %s job %s to be resumed after the restart", job.operation, job.id)
+        else:
+            await asyncio.to_thread(cancel_job, job.id)
+
+        raise
+    except Exception as error:
+        await asyncio.to_thread(finish_job, job.id, Job.FAILED, str(error))
+
+        raise
+
+    if job.status != Job.DONE:
+        raise RuntimeError(f"Transcoding job {job.id} {job.status}: {job.error or 'no error message'}")
+
+    return job
+
+
+async def _run_local_job(
+        job: Job,
+        on_queued: QueuePositionCallback | None,
+        on_progress: ProgressCallback | None,
+) -> Job:
+    await asyncio.to_thread(start_job, job.id, WORKER_NAME)
+
+    transcoding_job = await transcode(Operation(job.operation), job.duration, job.parameters, on_queued, on_progress)
+
+    progress = transcoding_job.progress
+    await asyncio.to_thread(finish_job, job.id, Job.DONE, None, progress.real_time_factor if progress else None)
+
+    return await asyncio.to_thread(Job.find, job.id)
+
+
+async def _run_queued_job(
+        job: Job,
+        on_queued: QueuePositionCallback | None,
+        on_progress: ProgressCallback | None,
+) -> Job:
+    operation = Operation(job.operation)
+
+    if job.status == Job.CREATED:
+        if await asyncio.to_thread(count_pending_jobs) >= FFMPEG_MAX_QUEUE:
+            logger.warning("Rejected transcoding job %s: %s jobs pending", job.id, FFMPEG_MAX_QUEUE)
+
+            raise TranscodingQueueFullError(f"The transcoding queue is full ({FFMPEG_MAX_QUEUE} jobs)")
+
+        await asyncio.to_thread(submit_job, job.id)
+        logger.info("Queued %s job %s for user %s", operation.value, job.id, job.user_id)
+
+        position = await asyncio.to_thread(get_queue_position, job)
+
+        if on_queued and position >= FFMPEG_QUEUE_NOTIFY_AT:
+            try:
+                await on_queued(position)
+            except Exception:
+                logger.warning("Failed to notify queue position %s", position, exc_info=True)
+
+    job = await _wait_for_job(job.id, on_progress)
+
+    if job.status == Job.DONE and job.real_time_factor is not None:
+        transcoding_scheduler.cost_model.record_real_time_factor(operation, job.real_time_factor)
+
+    return job
+
+
+async def _wait_for_job(job_id: int, on_progress: ProgressCallback | None) -> Job:
+    progress_seconds = 0.0
+    lease_checked_at = time.monotonic()
+
+    while True:
+        await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+
+        if time.monotonic() - lease_checked_at >= JOB_LEASE_SECONDS:
+            lease_checked_at = time.monotonic()
+            await asyncio.to_thread(requeue_stale_job, job_id)
+
+        job = await asyncio.to_thread(Job.find, job_id)
+
+        if job is None:
+            raise RuntimeError(f"Transcoding job {job_id} disappeared")
+
+        if job.status in Job.FINISHED_STATUSES:
+            return job
+
+        if on_progress and job.real_time_factor and job.progress_seconds > progress_seconds:
+            progress_seconds = job.progress_seconds
+
+            await on_progress(FFmpegProgress(
+                processed_seconds=progress_seconds,
+                elapsed_seconds=progress_seconds * job.real_time_factor,
+            ))
+
+
+async def deliver_job(bot: Bot, job: Job) -> bool:
+    """
+    Sends the result of a finished job to its user with the operation's delivery function, at most once: a job whose
+    delivery has been started before, e.g. by a bot process that went down while uploading, is skipped rather than
+    risking a duplicate. The job's status message is deleted afterwards.
+
+    :param bot: Bot: The bot to send the result with
+    :param job: Job: The finished job
+    :return: bool: Whether the result was sent
+    """
+    if not await asyncio.to_thread(claim_delivery, job.id):
+        logger.info("Skipped delivering job %s: its delivery was started before", job.id)
+
+        return False
+
+    await _delivery_functions[Operation(job.operation)](bot, job)
+    await asyncio.to_thread(mark_delivered, job.id)
+
+    if job.status_message_id:
+        try:
+            await bot.delete_message(chat_id=job.chat_id, message_id=job.status_message_id)
+        except TelegramError:
+            logger.debug("Failed to delete the status message of job %s", job.id)
+
+    return True
+
+
+async def resume_interrupted_jobs(context: CallbackContext) -> None:
+    """
+    A ``JobQueue`` callback that picks up the jobs a previous run of the bot left behind: finished jobs are delivered,
+    unfinished ones are run again unless they have used up ``JOB_MAX_ATTEMPTS``, and jobs that cannot be resumed are
+    failed with a message asking the user to send the file again.
+
+    The callback's ``data`` is ``(shard, shards)``; only the jobs of the users that are routed to ``shard`` are
+    resumed (see :mod:`utils.sharding`).
+
+    Jobs whose delivery was started but never confirmed are not sent again, since their users may have received them
+    already; they are only logged.
+    """
+    shard, shards = context.job.data
+    jobs = [job for job in await asyncio.to_thread(get_interrupted_jobs) if get_shard(job.user_id, shards) == shard]
+
+    for job in await asyncio.to_thread(get_unconfirmed_deliveries):
+        if get_shard(job.user_id, shards) == shard:
+            logger.warning(
+                "The delivery of %s job %s to user %s was interrupted, the user may not have received it",
+                job.operation,
+                job.id,
+                job.user_id,
+            )
+
+    if jobs:
+        logger.info("Resuming %s interrupted job(s)", len(jobs))
+
+    for job in jobs:
+        context.application.create_task(_resume_job(context.bot, job), name=f"resume_job_{job.id}")
+
+
+async def _resume_job(bot: Bot, job: Job) -> None:
+    operation = Operation(job.operation)
+
+    if operation not in _delivery_functions or (job.status != Job.DONE and job.attempts >= JOB_MAX_ATTEMPTS):
+        # A job that was finished in the meantime, e.g. one whose result its handler used itself, was not lost.
+        if await asyncio.to_thread(fail_interrupted_job, job.id):
+            logger.warning(
+                "Giving up on interrupted %s job %s after %s attempt(s)", operation.value, job.id, job.attempts
+            )
+            await _notify_job_lost(bot, job)
+
+        return
+
+    async def run_and_deliver() -> None:
+        resumed_job = job if job.status == Job.DONE else await run_job(job)
+
+        await deliver_job(bot, resumed_job)
+
+    try:
+        await run_user_job(job.user_id, run_and_deliver())
+
+        logger.info("Resumed %s job %s of user %s", operation.value, job.id, job.user_id)
+    except JobCancelledError:
+        logger.info("Resumed job %s was cancelled by its user", job.id)
+    except (TelegramError, RuntimeError, OSError, TranscodingQueueFullError):
+        logger.exception("Failed to resume job %s", job.id)
+        await _notify_job_lost(bot, job)
+    finally:
+        if not is_draining():
+            delete_file(job.parameters.get('output_path', ''))
+
+
+async def _notify_job_lost(bot: Bot, job: Job) -> None:
+    language = (job.delivery or {}).get('language', 'en')
+
+    try:
+        await bot.send_message(
+            chat_id=job.chat_id,
+            text=t(language, 'errJobLost'),
+            reply_to_message_id=job.music_message_id,
+            allow_sending_without_reply=True,
+        )
+    except TelegramError:
+        logger.debug("Failed to tell user %s that job %s was lost", job.user_id, job.id)
+
+
+class TranscodingWorker:
+    """
+    Claims jobs from the ``jobs`` table and runs them, up to ``slots`` at a time.
+
+    While a job runs, its progress is written back every ``JOB_POLL_INTERVAL_SECONDS``, which also tells the bot the
+    worker is alive; if the job has been cancelled in the meantime, its ffmpeg process is killed.
+    """
+
+    def __init__(self, slots: int, name: str = WORKER_NAME):
+        if slots < 1:
+            raise ValueError("slots must be >= 1")
+
+        self.slots = slots
+        self.name = name
+
+    async def run(self, stop_event: asyncio.Event, drain_timeout: float | None = None) -> None:
+        """
+        Runs jobs until ``stop_event`` is set. Jobs that are running at that point are given ``drain_timeout`` seconds
+        to finish (forever if ``None``); the ones that are still running after that are put back into the queue.
+        """
+        logger.info("Transcoding worker %s started with %s slots", self.name, self.slots)
+
+        slots = asyncio.gather(*(self._run_slot(stop_event) for _ in range(self.slots)))
+        stopped = asyncio.ensure_future(stop_event.wait())
+        await asyncio.wait({slots, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+
+        try:
+            await asyncio.wait_for(slots, timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Transcoding worker %s did not finish its jobs in %ss", self.name, drain_timeout)
+
+        logger.info("Transcoding worker %s stopped", self.name)
+
+    async def _run_slot(self, stop_event: asyncio.Event) -> None:
+        while not stop_event.is_set():
+            job = await asyncio.to_thread(claim_job, self.name)
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+                continue
+
+            await self.run_job(job)
+
+    async def run_job(self, job: Job) -> None:
+        operation = Operation(job.operation)
+        latest_progress: FFmpegProgress | None = None
+
+        async def observe(progress: FFmpegProgress) -> None:
+            nonlocal latest_progress
+            latest_progress = progress
+
+        logger.info("Running %s job %s of user %s", operation.value, job.id, job.user_id)
+        task = asyncio.ensure_future(run_operation(operation, job.parameters, on_progress=observe))
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=JOB_POLL_INTERVAL_SECONDS)
+
+                if done:
+                    break
+
+                if await asyncio.to_thread(update_job_progress, job.id, latest_progress) == Job.CANCELLED:
+                    logger.info("Job %s was cancelled, stopping it", job.id)
+                    task.cancel()
+
+            task.result()
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The worker itself is being cancelled, take the job down with it and let another worker run it.
+                task.cancel()
+                await asyncio.to_thread(release_job, job.id, self.name)
+                logger.info("Released %s job %s", operation.value, job.id)
+
+                raise
+        except Exception as error:
+            logger.exception("%s job %s failed", operation.value, job.id)
+            await asyncio.to_thread(finish_job, job.id, Job.FAILED, str(error))
+        else:
+            real_time_factor = latest_progress.real_time_factor if latest_progress else None
+            await asyncio.to_thread(finish_job, job.id, Job.DONE, None, real_time_factor)
+            logger.info("Finished %s job %s", operation.value, job.id)
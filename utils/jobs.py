@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Coroutine, TypeVar
+
+from telegram import Update
+
+from config.pyi18n import i18n
+from .i18n import t
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar('T')
+
+CANCELLING_COMMANDS = ('start', 'new')
+NEW_FILE_BUTTON_LABELS = frozenset(t(locale, 'btnNewFile') for locale in i18n.available_locales)
+
+_user_jobs: dict[int, set[asyncio.Task]] = {}
+_draining = False
+
+
+class JobCancelledError(Exception):
+    """Raised by :func:`run_user_job` when the job was cancelled because the user started over."""
+
+
+async def run_user_job(user_id: int, coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a long job (e.g. an ffmpeg encode followed by its upload) of a user as a separate task, so that it can be
+    cancelled with :func:`cancel_user_jobs` without cancelling the update handler that awaits it.
+
+    :param user_id: int: The ``user_id`` of the user who owns the job
+    :param coroutine: Coroutine: The job to run
+    :raises JobCancelledError: The job was cancelled before it finished, or the bot is shutting down
+    :return: The result of the job
+    """
+    if _draining:
+        coroutine.close()
+
+        raise JobCancelledError(f"Job of user {user_id} was not started, the bot is shutting down")
+
+    task = asyncio.ensure_future(coroutine)
+    jobs = _user_jobs.setdefault(user_id, set())
+    jobs.add(task)
+
+    try:
+        await asyncio.wait({task})
+    except asyncio.CancelledError:
+        task.cancel()
+
+        raise
+    finally:
+        jobs.discard(task)
+
+        if not jobs:
+            _user_jobs.pop(user_id, None)
+
+    if task.cancelled():
+        raise JobCancelledError(f"Job of user {user_id} was cancelled")
+
+    return task.result()
+
+
+def cancel_user_jobs(user_id: int) -> int:
+    """
+    Cancels all in-flight jobs of a user. Cancelling a job kills its ffmpeg process and skips its upload.
+
+    :param user_id: int: The ``user_id`` of the user whose jobs should be cancelled
+    :return: int: The number of cancelled jobs
+    """
+    jobs = [task for task in _user_jobs.get(user_id, ()) if not task.done()]
+
+    for task in jobs:
+        task.cancel()
+
+    if jobs:
+        logger.info("Cancelled %s in-flight job(s) of user %s", len(jobs), user_id)
+
+    return len(jobs)
+
+
+def has_user_jobs(user_id: int) -> bool:
+    """
+    :param user_id: int: The ``user_id`` of the user
+    :return: bool: Whether the user has an in-flight job
+    """
+    return any(not task.done() for task in _user_jobs.get(user_id, ()))
+
+
+def is_draining() -> bool:
+    """
+    :return: bool: Whether :func:`drain_user_jobs` is active, i.e. jobs that get cancelled now are interrupted by a
+        shutdown rather than given up by their users
+    """
+    return _draining
+
+
+@contextlib.asynccontextmanager
+async def drain_user_jobs(timeout: float | None) -> AsyncIterator[int]:
+    """
+    Stops accepting new jobs and waits up to ``timeout`` seconds for the in-flight ones to finish. The jobs that are
+    still running after that are cancelled; they are resumed the next time the bot starts (see
+    :func:`utils.job_queue.resume_interrupted_jobs`). New jobs are refused until the context exits.
+
+    :param timeout: float | None: How long to wait for the in-flight jobs in seconds; ``None`` waits until they finish
+    :return: AsyncIterator[int]: The number of jobs that had to be interrupted
+    """
+    global _draining  # pylint: disable=global-statement
+    _draining = True
+
+    try:
+        jobs = {task for tasks in _user_jobs.values() for task in tasks if not task.done()}
+        pending: set[asyncio.Task] = set()
+
+        if jobs:
+            logger.info("Waiting up to %ss for %s in-flight job(s) to finish", timeout, len(jobs))
+            _, pending = await asyncio.wait(jobs, timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            await asyncio.wait(pending)
+            logger.warning("Interrupted %s job(s) that did not finish in time, they will be resumed", len(pending))
+
+        yield len(pending)
+    finally:
+        _draining = False
+
+
+def is_job_cancelling_update(update: object) -> bool:
+    """
+    Checks if an update makes the user's in-flight jobs obsolete: ``/start``, ``/new``, the "New File" button or a
+    new audio file.
+
+    :param update: object: The ``update`` object
+    :return: bool: Whether the user's in-flight jobs should be cancelled
+    """
+    if not isinstance(update, Update) or not update.message:
+        return False
+
+    message = update.message
+
+    if message.audio:
+        return True
+
+    text = (message.text or '').strip()
+
+    if text.startswith('/'):
+        command = text[1:].split(maxsplit=1)[0].partition('@')[0] if len(text) > 1 else ''
+
+        return command in CANCELLING_COMMANDS
+
+    return text in NEW_FILE_BUTTON_LABELS
@@ -0,0 +1,125 @@
+import asyncio
+from dataclasses import dataclass
+
+from telegram import Message
+from telegram.ext import CallbackContext, filters
+
+from database.models import Language
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogLanguage:
+    """A row of the ``languages`` table, as kept by the :class:`LanguageCatalog`."""
+
+    id: int
+    iso: str
+    name: str
+    native_name: str
+    flag: str
+    is_default: bool
+
+    @property
+    def label(self) -> str:
+        """The reply keyboard button text for this language, e.g. ``🇬🇧 English``."""
+        return f'{self.flag} {self.native_name}'
+
+
+class LanguageCatalog:
+    """
+    The ``languages`` table, held in memory by every process, since it changes roughly never. Languages are looked up
+    by id, ISO code or button label in constant time.
+
+    It is loaded on first use (``register_modules`` does that at startup) and only read again by :meth:`refresh`, which
+    runs when an admin sends ``/reload_languages`` and every ``LANGUAGE_CATALOG_REFRESH_INTERVAL_SECONDS``. A refresh
+    swaps all lookups at once, so readers never see a half-built catalog.
+    """
+
+    def __init__(self):
+        self._languages: tuple[CatalogLanguage, ...] | None = None
+        self._by_id: dict[int, CatalogLanguage] = {}
+        self._by_iso: dict[str, CatalogLanguage] = {}
+        self._by_label: dict[str, CatalogLanguage] = {}
+        self._default: CatalogLanguage | None = None
+
+    def refresh(self) -> int:
+        """
+        Reads the ``languages`` table again.
+
+        :return: int: The number of languages
+        """
+        languages = self._load_languages()
+
+        self._by_id = {language.id: language for language in languages}
+        self._by_iso = {language.iso: language for language in languages}
+        self._by_label = {language.label: language for language in languages}
+        self._default = next((language for language in languages if language.is_default), None)
+        self._languages = languages
+
+        logger.debug("Loaded %s language(s)", len(languages))
+
+        return len(languages)
+
+    @staticmethod
+    def _load_languages() -> tuple[CatalogLanguage, ...]:
+        return tuple(
+            CatalogLanguage(
+                id=language.id,
+                iso=language.iso,
+                name=language.name,
+                native_name=language.native_name,
+                flag=language.flag,
+                is_default=bool(language.is_default),
+            )
+            for language in Language.ordered()
+        )
+
+    def _load_once(self) -> None:
+        if self._languages is None:
+            self.refresh()
+
+    @property
+    def languages(self) -> tuple[CatalogLanguage, ...]:
+        """All languages in a stable order, so keyboards and handlers agree on it."""
+        self._load_once()
+
+        return self._languages
+
+    @property
+    def default(self) -> CatalogLanguage | None:
+        """The language marked as default, if any."""
+        self._load_once()
+
+        return self._default
+
+    def by_id(self, language_id: int | None) -> CatalogLanguage | None:
+        self._load_once()
+
+        return self._by_id.get(language_id)
+
+    def by_iso(self, iso: str | None) -> CatalogLanguage | None:
+        self._load_once()
+
+        return self._by_iso.get(iso)
+
+    def by_label(self, label: str | None) -> CatalogLanguage | None:
+        self._load_once()
+
+        return self._by_label.get(label)
+
+
+language_catalog = LanguageCatalog()
+
+
+class LanguageButtonFilter(filters.MessageFilter):
+    """Matches messages whose text is the label of a language in the catalog, as it is at the time of the update."""
+
+    def filter(self, message: Message) -> bool:
+        return language_catalog.by_label(message.text) is not None
+
+
+async def refresh_language_catalog(_context: CallbackContext) -> None:
+    """A ``JobQueue`` callback that reads the ``languages`` table again, see :meth:`LanguageCatalog.refresh`."""
+    await asyncio.to_thread(language_catalog.refresh)
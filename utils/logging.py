@@ -1,7 +1,5 @@
 import logging
 import os
-import shlex
-import subprocess
 import sys
 from datetime import datetime
 
@@ -45,27 +43,3 @@ def configure_logging() -> None:
     logger.addHandler(stdout_handler)
     logger.propagate = False
     logger._music_tool_bot_logging_configured = True
-
-
-def run_ffmpeg(cmd: list[str], operation: str) -> subprocess.CompletedProcess[str]:
-    ffmpeg_logger.debug("Running ffmpeg for %s: %s", operation, shlex.join(cmd))
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    for stream_name, output in (("stdout", result.stdout), ("stderr", result.stderr)):
-        if not output:
-            continue
-
-        for line in output.splitlines():
-            ffmpeg_logger.debug("%s %s: %s", operation, stream_name, line)
-
-    if result.returncode != 0:
-        ffmpeg_logger.error("ffmpeg command failed for %s with exit code %s", operation, result.returncode)
-        raise RuntimeError(
-            "ffmpeg failed.\n"
-            f"Command: {shlex.join(cmd)}\n\n"
-            f"STDERR:\n{result.stderr}"
-        )
-
-    ffmpeg_logger.debug("ffmpeg command completed for %s with exit code 0", operation)
-
-    return result
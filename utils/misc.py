@@ -1,9 +1,13 @@
+from datetime import timedelta
+
 from PIL import Image
 from telegram import Message, Update
+from telegram.error import RetryAfter
 from telegram.ext import CallbackContext
 from telegram.ext._utils.types import UD
 
 from config.modules import Module
+from .context import Session
 from .i18n import t
 
 
@@ -126,30 +130,24 @@ def unset_current_module(user_data: UD) -> None:
     user_data['current_module'] = ''
 
 
-def reset_user_data_context(user_id: int, user_data: UD) -> None:
+def reset_user_data_context(user_id: int, user_data: Session) -> None:
     """
-    Resets the user data session. Resets all values in the ``user_data`` dictionary.
+    Resets the user data session. Resets all values of the :class:`Session`.
     The language value is not reset, as it should be kept between sessions.
     User files are preserved on disk and cleaned up periodically by the sweeper service.
 
     :param user_id: int: The user's ``user_id``
-    :param user_data: UD: The ``user_data`` object
+    :param user_data: Session: The ``user_data`` object
     """
-    language = get_user_language_or_fallback(user_data) if ('language' in user_data) else 'en'
-
-    new_user_data = {
-        'tag_editor': {},
-        'bitrate_changer': {},
-        'music_path': '',
-        'music_duration': 0,
-        'art_path': '',
-        'new_art_path': '',
-        'current_module': '',
-        'music_message_id': 0,
-        'language': language,
-    }
-
-    user_data.update(new_user_data)
+    user_data.tag_editor = {}
+    user_data.bitrate_changer = {}
+    user_data.music_path = ''
+    user_data.music_duration = 0
+    user_data.art_path = ''
+    user_data.new_art_path = ''
+    user_data.current_module = ''
+    user_data.music_message_id = 0
+    user_data.language = get_user_language_or_fallback(user_data)
 
 
 async def reply_default_message(update: Update, language: str) -> None:
@@ -185,3 +183,19 @@ def get_file_name(music_tags: dict):
     :return: str: A formatted filename based on audio tags with fallbacks
     """
     return f"{music_tags.get('artist') or 'Unknown'} - {music_tags.get('title') or 'Unknown'}"
+
+
+def get_retry_after_seconds(error: RetryAfter) -> float:
+    """
+    Get the number of seconds Telegram asked us to wait. ``retry_after`` is a ``timedelta`` when ``PTB_TIMEDELTA`` is
+    set and an ``int`` otherwise.
+
+    :param error: RetryAfter: The flood control error
+    :return: float: The seconds to wait before retrying
+    """
+    retry_after = error.retry_after
+
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+
+    return float(retry_after)
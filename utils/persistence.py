@@ -0,0 +1,498 @@
+import asyncio
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+from telegram.ext import (
+    Application,
+    BasePersistence,
+    CallbackContext,
+    ContextTypes,
+    PersistenceInput,
+    PicklePersistence,
+)
+
+from .context import Session
+from .jobs import has_user_jobs
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+USER_DATA = 'user_data'
+CHAT_DATA = 'chat_data'
+SINGLETONS = 'singletons'
+CONVERSATIONS = 'conversations'
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {USER_DATA} (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS {CHAT_DATA} (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS {SINGLETONS} (id TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS {CONVERSATIONS} (
+    name TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (name, id)
+);
+"""
+# ``PRAGMA user_version`` of the file: 1 stores ``user_data`` rows as ``Session.to_bytes``, 0 stored them as pickles.
+SCHEMA_VERSION = 1
+MIGRATION_BATCH_SIZE = 1000
+
+# A record is identified by its table and its key; conversations are keyed by (name, key).
+RecordKey = tuple[str, Any]
+
+
+def encode_session(data: Mapping) -> bytes:
+    """
+    Serializes the ``user_data`` of a user with :meth:`Session.to_bytes`, converting a plain dict first.
+
+    :param data: Mapping: The ``user_data``
+    :return: bytes: The serialized session
+    """
+    return (data if isinstance(data, Session) else Session.from_dict(data)).to_bytes()
+
+
+def decode_session(data: bytes) -> Session:
+    """
+    Reads a session written by :func:`encode_session`, or a pickled ``user_data`` dict of an earlier version.
+
+    :param data: bytes: The serialized session
+    :return: Session: The session
+    """
+    if data.startswith(b'\x80'):
+        return Session.from_dict(pickle.loads(data))
+
+    return Session.from_bytes(data)
+
+
+@dataclass
+class SessionStats:
+    """Counts how the sessions of users who sent an update were found."""
+
+    hits: int = 0
+    misses: int = 0
+    new: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses + self.new
+
+        return self.hits / lookups if lookups else None
+
+
+class SqlitePersistence(BasePersistence[Session, dict, dict]):
+    """
+    Persists the sessions in an SQLite file, one row per user, chat and conversation state.
+
+    :class:`telegram.ext.PicklePersistence` pickles *all* sessions into a single file whenever *one* of them changed.
+    This class only writes the records that changed since they were last written: the ``Application`` hands over the
+    sessions that were touched since the previous run of ``update_persistence``, and of those only the ones whose
+    serialized form differs from the stored one are written, all of them in one transaction.
+
+    Instead of a second copy of every session, only a hash of each stored record is kept in memory. ``user_data`` is
+    stored as :class:`Session` records (see :func:`encode_session`); files with pickled ones are converted on open.
+
+    The ``user_data`` of a user is only loaded when they send an update (see :meth:`refresh_user_data`), and
+    :meth:`evict` drops the sessions of users who have been idle for ``session_ttl`` seconds, or the least recently
+    active ones beyond ``max_sessions``, from memory again. :attr:`stats` counts how often a session was already in
+    memory (hit), had to be loaded (miss) or did not exist yet (new).
+
+    When the file is created, the sessions of the pickle file ``import_from`` (if it exists) are copied into it, so
+    switching from ``PicklePersistence`` keeps the users' sessions.
+
+    :param filepath: Path: The SQLite file
+    :param update_interval: float: Seconds between two runs of ``update_persistence``
+    :param import_from: Path | None: A pickle file of :class:`telegram.ext.PicklePersistence` to import once
+    :param session_ttl: float | None: Seconds after which the session of an idle user is evicted; ``None`` keeps it
+    :param max_sessions: int | None: The maximum number of sessions kept in memory; ``None`` for no limit
+    :param store_data: PersistenceInput | None: Which kinds of data to store
+    """
+
+    def __init__(
+            self,
+            filepath: Path,
+            update_interval: float = 60,
+            import_from: Path | None = None,
+            session_ttl: float | None = None,
+            max_sessions: int | None = None,
+            store_data: PersistenceInput | None = None,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+
+        self.filepath = Path(filepath)
+        self.import_from = import_from
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.stats = SessionStats()
+        # The users whose sessions are in memory, least recently active first, with when they were last active.
+        self._resident: OrderedDict[int, float] = OrderedDict()
+        # Evicted users whose ``drop_user_data`` is still to come, and the sessions of those who came back meanwhile.
+        self._evicting: set[int] = set()
+        self._revived: dict[int, Session] = {}
+        self._connection: sqlite3.Connection | None = None
+        # ``sqlite3`` connections must not be used by two threads at once, and writes run in worker threads.
+        self._connection_lock = threading.Lock()
+        self._write_lock = asyncio.Lock()
+        self._pending: dict[RecordKey, bytes | None] = {}
+        self._digests: dict[RecordKey, int] = {}
+
+    @property
+    def resident_sessions(self) -> int:
+        return len(self._resident)
+
+    async def get_user_data(self) -> dict[int, Session]:
+        # Sessions are loaded lazily, see ``refresh_user_data``.
+        await self._open()
+
+        return {}
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return {chat_id: data for chat_id, data in await self._load_table(CHAT_DATA)}
+
+    async def get_bot_data(self) -> dict:
+        return dict(await self._load_table(SINGLETONS)).get('bot_data', {})
+
+    async def get_callback_data(self) -> Any:
+        return dict(await self._load_table(SINGLETONS)).get('callback_data')
+
+    async def get_conversations(self, name: str) -> dict[tuple, object]:
+        await self._open()
+
+        rows = await asyncio.to_thread(
+            self._execute, f"SELECT id, data FROM {CONVERSATIONS} WHERE name = ?", (name,)
+        )
+        conversations = {}
+
+        for key, data in rows:
+            self._digests[(CONVERSATIONS, (name, key))] = hash(data)
+            conversations[tuple(json.loads(key))] = pickle.loads(data)
+
+        return conversations
+
+    async def update_conversation(self, name: str, key: tuple, new_state: object | None) -> None:
+        await self._write((CONVERSATIONS, (name, json.dumps(list(key)))), new_state)
+
+    async def update_user_data(self, user_id: int, data: Session) -> None:
+        await self._write((USER_DATA, user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        await self._write((CHAT_DATA, chat_id), data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        await self._write((SINGLETONS, 'bot_data'), data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        await self._write((SINGLETONS, 'callback_data'), data)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await self._write((CHAT_DATA, chat_id), None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        if user_id in self._evicting:
+            # The session was only evicted from memory. If the user came back before this call, their new session
+            # was left out of this run of ``update_persistence`` by the ``Application``, so it is written here.
+            self._evicting.discard(user_id)
+            revived = self._revived.pop(user_id, None)
+
+            if revived is not None:
+                await self._write((USER_DATA, user_id), revived)
+
+            return
+
+        await self._write((USER_DATA, user_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Session) -> None:
+        """
+        Called by the ``Application`` before the handlers of an update run. Fills the (then empty) ``user_data`` of a
+        user whose session is not in memory from the file.
+        """
+        if user_id in self._resident:
+            self.stats.hits += 1
+            self._resident.move_to_end(user_id)
+            self._resident[user_id] = time.monotonic()
+
+            return
+
+        if user_id in self._evicting:
+            self._revived[user_id] = user_data
+
+        rows = await asyncio.to_thread(self._execute, f"SELECT data FROM {USER_DATA} WHERE id = ?", (user_id,))
+
+        if rows:
+            self.stats.misses += 1
+            self._digests[(USER_DATA, user_id)] = hash(rows[0][0])
+
+            if not user_data:
+                user_data.update(decode_session(rows[0][0]))
+        else:
+            self.stats.new += 1
+
+        self._resident[user_id] = time.monotonic()
+
+    async def evict(self, application: Application) -> int:
+        """
+        Drops the sessions of idle users from the memory of ``application``, after writing them. Users with an
+        in-flight job are kept, since their handlers still use the session.
+
+        :param application: Application: The application that uses this persistence
+        :return: int: The number of evicted sessions
+        """
+        now = time.monotonic()
+        evicted = []
+
+        for user_id, last_active_at in self._resident.items():
+            is_idle = self.session_ttl is not None and now - last_active_at > self.session_ttl
+            is_over_limit = self.max_sessions is not None and len(self._resident) - len(evicted) > self.max_sessions
+
+            if not is_idle and not is_over_limit:
+                break
+
+            if not has_user_jobs(user_id):
+                evicted.append((user_id, last_active_at))
+
+        dropped = 0
+
+        for user_id, last_active_at in evicted:
+            if user_id in application.user_data:
+                await self.update_user_data(user_id, application.user_data[user_id])
+
+            # A handler may have used the session while it was written, in which case it stays in memory.
+            if self._resident.get(user_id) != last_active_at or has_user_jobs(user_id):
+                continue
+
+            del self._resident[user_id]
+            self._digests.pop((USER_DATA, user_id), None)
+            self._evicting.add(user_id)
+            application.drop_user_data(user_id)
+            dropped += 1
+
+        self.stats.evicted += dropped
+
+        return dropped
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        await self._commit()
+
+        if self._connection:
+            with self._connection_lock:
+                self._connection.close()
+                self._connection = None
+
+    async def _open(self) -> None:
+        if self._connection:
+            return
+
+        is_new = not self.filepath.exists()
+        self._connection = await asyncio.to_thread(self._connect)
+
+        if is_new and self.import_from and self.import_from.exists():
+            await self._import_pickle(self.import_from)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.filepath, check_same_thread=False, isolation_level=None)
+        # With a write-ahead log a commit appends to the log instead of rewriting pages in place, and ``NORMAL``
+        # only syncs the log on checkpoints; a crash can lose the last commits but never corrupts the file.
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate_user_data(connection)
+
+        return connection
+
+    @staticmethod
+    def _migrate_user_data(connection: sqlite3.Connection) -> None:
+        """Rewrites the pickled ``user_data`` rows of a file written by an earlier version as ``Session`` records."""
+        last_id = -2 ** 63
+        migrated = 0
+
+        connection.execute("BEGIN")
+
+        while rows := connection.execute(
+            f"SELECT id, data FROM {USER_DATA} WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, MIGRATION_BATCH_SIZE),
+        ).fetchall():
+            connection.executemany(
+                f"UPDATE {USER_DATA} SET data = ? WHERE id = ?",
+                [(encode_session(decode_session(data)), user_id) for user_id, data in rows],
+            )
+            last_id = rows[-1][0]
+            migrated += len(rows)
+
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.execute("COMMIT")
+
+        if migrated:
+            logger.info("Converted %s pickled session(s) to the session format", migrated)
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        with self._connection_lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    async def _load_table(self, table: str) -> list[tuple[Any, Any]]:
+        await self._open()
+
+        rows = await asyncio.to_thread(self._execute, f"SELECT id, data FROM {table}")
+        records = []
+
+        for key, data in rows:
+            self._digests[(table, key)] = hash(data)
+            records.append((key, pickle.loads(data)))
+
+        return records
+
+    async def _write(self, record_key: RecordKey, value: object | None) -> None:
+        if value is None:
+            data = None
+        elif record_key[0] == USER_DATA:
+            data = encode_session(value)
+        else:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if self._digests.get(record_key) == (None if data is None else hash(data)):
+            return
+
+        self._pending[record_key] = data
+
+        await self._commit()
+
+    async def _commit(self) -> None:
+        async with self._write_lock:
+            # ``update_persistence`` gathers the updates of all touched records. Yielding once lets them all queue
+            # their records, so they are written in a single transaction by whichever of them gets here first.
+            await asyncio.sleep(0)
+
+            pending, self._pending = self._pending, {}
+
+            if not pending:
+                return
+
+            await self._open()
+            await asyncio.to_thread(self._write_records, pending)
+
+            for record_key, data in pending.items():
+                if data is None:
+                    self._digests.pop(record_key, None)
+                else:
+                    self._digests[record_key] = hash(data)
+
+            logger.debug("Wrote %s changed session record(s)", len(pending))
+
+    def _write_records(self, records: dict[RecordKey, bytes | None]) -> None:
+        upserts: dict[str, list[tuple]] = {}
+        deletes: dict[str, list[tuple]] = {}
+
+        for (table, key), data in records.items():
+            key = key if table == CONVERSATIONS else (key,)
+
+            if data is None:
+                deletes.setdefault(table, []).append(key)
+            else:
+                upserts.setdefault(table, []).append((*key, data))
+
+        with self._connection_lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+
+            try:
+                for table, rows in upserts.items():
+                    columns = "name, id, data" if table == CONVERSATIONS else "id, data"
+                    conflict = "name, id" if table == CONVERSATIONS else "id"
+                    placeholders = ", ".join("?" * len(rows[0]))
+                    connection.executemany(
+                        f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+                        f"ON CONFLICT ({conflict}) DO UPDATE SET data = excluded.data",
+                        rows,
+                    )
+
+                for table, keys in deletes.items():
+                    condition = "name = ? AND id = ?" if table == CONVERSATIONS else "id = ?"
+                    connection.executemany(f"DELETE FROM {table} WHERE {condition}", keys)
+
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+
+                raise
+
+    async def _import_pickle(self, path: Path) -> None:
+        legacy = PicklePersistence(filepath=path, store_data=self.store_data)
+
+        if self.bot:
+            legacy.set_bot(self.bot)
+
+        for user_id, data in (await legacy.get_user_data()).items():
+            self._pending[(USER_DATA, user_id)] = encode_session(data)
+
+        for chat_id, data in (await legacy.get_chat_data()).items():
+            self._pending[(CHAT_DATA, chat_id)] = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._pending[(SINGLETONS, 'bot_data')] = pickle.dumps(await legacy.get_bot_data())
+
+        for name, conversations in (legacy.conversations or {}).items():
+            for key, state in conversations.items():
+                self._pending[(CONVERSATIONS, (name, json.dumps(list(key))))] = pickle.dumps(state)
+
+        records = len(self._pending)
+        await asyncio.to_thread(self._write_records, self._pending)
+        self._pending = {}
+
+        logger.info("Imported %s session record(s) from %s into %s", records, path.name, self.filepath.name)
+
+
+class SessionPicklePersistence(PicklePersistence):
+    """
+    A :class:`telegram.ext.PicklePersistence` whose ``user_data`` are :class:`Session` objects. The plain dicts of a
+    pickle file written by an earlier version are converted when it is loaded, and written back as sessions.
+    """
+
+    def __init__(self, filepath: Path | str, update_interval: float = 60):
+        super().__init__(
+            filepath=filepath,
+            update_interval=update_interval,
+            context_types=ContextTypes(user_data=Session),
+        )
+
+    async def get_user_data(self) -> dict[int, Session]:
+        await super().get_user_data()
+
+        for user_id, data in self.user_data.items():
+            if not isinstance(data, Session):
+                self.user_data[user_id] = Session.from_dict(data)
+
+        return deepcopy(self.user_data)
+
+
+async def evict_idle_sessions(context: CallbackContext) -> None:
+    """A ``JobQueue`` callback that evicts idle sessions, see :meth:`SqlitePersistence.evict`."""
+    persistence = context.application.persistence
+
+    if not isinstance(persistence, SqlitePersistence):
+        return
+
+    evicted = await persistence.evict(context.application)
+
+    if evicted:
+        logger.info(
+            "Evicted %s idle session(s), %s in memory (hits=%s misses=%s new=%s)",
+            evicted,
+            persistence.resident_sessions,
+            persistence.stats.hits,
+            persistence.stats.misses,
+            persistence.stats.new,
+        )
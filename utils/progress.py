@@ -0,0 +1,87 @@
+import time
+
+from telegram import Message
+from telegram.error import RetryAfter, TelegramError
+
+from config.constants import PROGRESS_UPDATE_INTERVAL_SECONDS
+from .ffmpeg import FFmpegProgress
+from .i18n import t
+from .logging import get_logger
+from .misc import get_retry_after_seconds
+
+logger = get_logger(__name__)
+
+
+def format_eta(seconds: float) -> str:
+    """
+    Formats a number of seconds as ``m:ss``.
+
+    :param seconds: float: The seconds to format
+    :return: str: The formatted time
+    """
+    minutes, seconds = divmod(max(int(round(seconds)), 0), 60)
+
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """
+    Shows the progress of an ffmpeg job by editing a message with a percentage and an ETA.
+
+    Edits are throttled to one per ``interval`` seconds and skipped when the text would not change, to stay well below
+    Telegram's edit rate limits.
+    """
+
+    def __init__(
+            self,
+            message: Message,
+            language: str,
+            total_seconds: float,
+            interval: float = PROGRESS_UPDATE_INTERVAL_SECONDS,
+    ):
+        self.message = message
+        self.language = language
+        self.total_seconds = total_seconds
+        self.interval = interval
+        self._last_edit_at = 0.0
+        self._last_text = ''
+
+    async def __call__(self, progress: FFmpegProgress) -> None:
+        now = time.monotonic()
+
+        if progress.is_done or self.total_seconds <= 0 or now - self._last_edit_at < self.interval:
+            return
+
+        percent = min(int(progress.processed_seconds * 100 / self.total_seconds), 99)
+        real_time_factor = progress.real_time_factor
+
+        if real_time_factor is None:
+            return
+
+        eta = (self.total_seconds - progress.processed_seconds) * real_time_factor
+        text = t(self.language, 'progress', percent=percent, eta=format_eta(eta))
+
+        if text == self._last_text:
+            return
+
+        self._last_edit_at = now
+
+        try:
+            await self.message.edit_text(text=text)
+            self._last_text = text
+        except RetryAfter as error:
+            self._last_edit_at = now + get_retry_after_seconds(error)
+        except TelegramError as error:
+            logger.debug("Failed to edit progress message: %s", error)
+
+    async def finish(self) -> None:
+        """
+        Puts the "uploading" text back into the message once processing is over, if progress was shown in it.
+        """
+        if not self._last_text:
+            return
+
+        try:
+            await self.message.edit_text(text=t(self.language, 'uploading'))
+        except TelegramError as error:
+            logger.debug("Failed to edit progress message: %s", error)
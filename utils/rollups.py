@@ -0,0 +1,138 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import date
+
+from telegram.ext import CallbackContext
+
+from database.models import User
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+WEEKLY_DAYS = 7
+MONTHLY_ACTIVE_DAYS = 30
+# Users who did not interact within this many days count as churned. It is also how long ``user_activity_daily``
+# keeps its rows, since no rollup looks further back.
+ACTIVE_DAYS = 90
+
+# ``user_activity_daily`` has a row for every day (in UTC) a user interacted on, written along with ``users`` by
+# ``utils.activity``. This counts the distinct users of the windows ending on each of the last ``%s`` days and today,
+# and stores them, replacing the counts of an earlier run.
+ROLLUP_QUERY = """
+WITH today AS (
+    SELECT (NOW() AT TIME ZONE 'UTC')::date AS day
+),
+days AS (
+    SELECT generate_series(today.day - %s, today.day, INTERVAL '1 day')::date AS day FROM today
+),
+counts AS (
+    SELECT
+        days.day,
+        COUNT(DISTINCT activity.user_id) FILTER (WHERE activity.day = days.day) AS daily_users,
+        COUNT(DISTINCT activity.user_id) FILTER (WHERE activity.day > days.day - %s) AS weekly_users,
+        COUNT(DISTINCT activity.user_id) FILTER (WHERE activity.day > days.day - %s) AS monthly_active_users,
+        COUNT(DISTINCT activity.user_id) AS active_users_90d
+    FROM days
+    LEFT JOIN user_activity_daily AS activity ON activity.day > days.day - %s AND activity.day <= days.day
+    GROUP BY days.day
+),
+stored AS (
+    INSERT INTO user_activity_rollups
+        (day, daily_users, weekly_users, monthly_active_users, active_users_90d, created_at, updated_at)
+    SELECT counts.*, NOW(), NOW() FROM counts
+    ON CONFLICT (day) DO UPDATE
+    SET daily_users = EXCLUDED.daily_users,
+        weekly_users = EXCLUDED.weekly_users,
+        monthly_active_users = EXCLUDED.monthly_active_users,
+        active_users_90d = EXCLUDED.active_users_90d,
+        updated_at = NOW()
+    RETURNING *
+)
+SELECT * FROM stored ORDER BY day
+"""
+# The rollup of yesterday still needs the rows of the ``ACTIVE_DAYS`` days up to it.
+PRUNE_QUERY = """
+WITH pruned AS (
+    DELETE FROM user_activity_daily WHERE day < (NOW() AT TIME ZONE 'UTC')::date - %s RETURNING day
+)
+SELECT COUNT(*) AS deleted FROM pruned
+"""
+TODAY_ROLLUP_QUERY = """
+SELECT * FROM user_activity_rollups WHERE day = (NOW() AT TIME ZONE 'UTC')::date
+"""
+DAILY_ACTIVE_USERS_QUERY = """
+SELECT day, daily_users FROM user_activity_rollups
+WHERE day > (NOW() AT TIME ZONE 'UTC')::date - %s
+ORDER BY day
+"""
+
+
+@dataclass(frozen=True)
+class ActivityRollup:
+    """The number of distinct users who interacted on a day, and within the windows ending on it."""
+
+    day: date
+    daily_users: int
+    weekly_users: int
+    monthly_active_users: int
+    active_users_90d: int
+
+    @classmethod
+    def from_row(cls, row: User) -> 'ActivityRollup':
+        return cls(
+            day=row.day,
+            daily_users=row.daily_users,
+            weekly_users=row.weekly_users,
+            monthly_active_users=row.monthly_active_users,
+            active_users_90d=row.active_users_90d,
+        )
+
+
+def roll_up_user_activity(past_days: int = 1) -> list[ActivityRollup]:
+    """
+    Rolls ``user_activity_daily`` up into ``user_activity_rollups`` for today and the ``past_days`` before it, and
+    deletes the rows no rollup needs anymore. Yesterday is rolled up again by default, since its last interactions
+    may have been written after midnight.
+
+    :param past_days: int: The number of days before today to roll up again
+    :return: list[ActivityRollup]: The stored rollups, oldest first
+    """
+    rows = User.statement(ROLLUP_QUERY, [past_days, WEEKLY_DAYS, MONTHLY_ACTIVE_DAYS, ACTIVE_DAYS])
+    pruned = User.statement(PRUNE_QUERY, [ACTIVE_DAYS]).first()
+
+    if pruned and pruned.deleted:
+        logger.info("Pruned %s user activity row(s) older than %s days", pruned.deleted, ACTIVE_DAYS)
+
+    return [ActivityRollup.from_row(row) for row in rows or []]
+
+
+def get_today_rollup() -> ActivityRollup:
+    """
+    Reads the rollup of today, rolling it up first if the ``compact_user_activity`` job has not run yet today.
+
+    :return: ActivityRollup: The rollup of today, as of the last run of the job
+    """
+    rows = User.statement(TODAY_ROLLUP_QUERY)
+
+    if rows:
+        return ActivityRollup.from_row(rows.first())
+
+    return roll_up_user_activity(past_days=0)[-1]
+
+
+def get_daily_active_users(days: int) -> list[tuple[date, int]]:
+    """
+    Reads the daily active users of the last ``days`` days, today included, from the rollups. Days the bot did not
+    run on are missing.
+
+    :param days: int: The number of days
+    :return: list[tuple[date, int]]: The days and their daily active users, oldest first
+    """
+    rows = User.statement(DAILY_ACTIVE_USERS_QUERY, [days])
+
+    return [(row.day, row.daily_users) for row in rows or []]
+
+
+async def compact_user_activity(_context: CallbackContext) -> None:
+    """A ``JobQueue`` callback that rolls the user activity up, see :func:`roll_up_user_activity`."""
+    await asyncio.to_thread(roll_up_user_activity)
@@ -0,0 +1,242 @@
+import asyncio
+import multiprocessing
+import re
+import shutil
+import signal
+import sqlite3
+import threading
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable
+
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+
+from .concurrency import get_ordering_key
+from .logging import get_logger
+from .shutdown import drain_and_stop
+
+logger = get_logger(__name__)
+
+ShardWorker = Callable[[int, int, Any], None]
+
+STOP_TIMEOUT_SECONDS = 30
+# How long to wait before restarting a worker that died, so a worker that crashes right away does not spin.
+RESTART_DELAY_SECONDS = 5
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# ``spawn`` gives every worker a fresh interpreter instead of a fork of the front process and its event loop.
+_context = multiprocessing.get_context('spawn')
+
+
+class ShardLayoutChangedError(Exception):
+    """Raised when the sessions were sharded for a different number of workers than the bot is started with."""
+
+
+def get_shard(key: int | None, shards: int) -> int:
+    """
+    Get the worker an update is routed to. All updates of a user go to the same worker, so their order and the user's
+    session stay in one process.
+
+    :param key: int | None: The ordering key of the update, see :func:`utils.concurrency.get_ordering_key`
+    :param shards: int: The number of workers
+    :return: int: The index of the worker
+    """
+    return key % shards if key is not None else 0
+
+
+def check_shard_layout(path: Path, shards: int) -> None:
+    """
+    Makes sure the bot is started with the number of workers its sessions were sharded for. Users are routed by
+    ``user_id % shards``, and the files of a new number of workers are seeded from the single-process file, so a
+    different number would silently bring back old sessions and lose every session written since.
+
+    :param path: Path: The single-process persistence file
+    :param shards: int: The number of workers, 1 for a single process
+    :raises ShardLayoutChangedError: There are shard files for a different number of workers
+    """
+    pattern = re.compile(rf"{re.escape(path.stem)}\.shard-\d+-of-(\d+){re.escape(path.suffix)}")
+    layouts = {
+        int(match.group(1))
+        for file in path.parent.glob(f"{path.stem}.shard-*")
+        if (match := pattern.fullmatch(file.name))
+    }
+    layouts.discard(shards)
+
+    if layouts:
+        raise ShardLayoutChangedError(
+            f"The sessions in {path.parent} are sharded for {', '.join(map(str, sorted(layouts)))} worker(s), not "
+            f"{shards}. Set BOT_WORKERS back, or move the {path.stem}.shard-* files away to start from {path.name} "
+            f"and lose the sessions written since."
+        )
+
+
+def get_shard_persistence_path(path: Path, shard: int, shards: int) -> Path:
+    """
+    Get the persistence file of a worker. The file is seeded from the single-process file the first time, so existing
+    sessions survive switching to sharded mode. Changing the number of workers afterwards is refused, see
+    :func:`check_shard_layout`.
+
+    A sqlite database is copied with sqlite's backup API, which includes the commits that are still in its write-ahead
+    log rather than only the main file.
+
+    :param path: Path: The single-process persistence file
+    :param shard: int: The index of the worker
+    :param shards: int: The number of workers
+    :return: Path: The persistence file of the worker
+    """
+    shard_path = path.with_name(f"{path.stem}.shard-{shard}-of-{shards}{path.suffix}")
+
+    if shard_path.exists() or not path.exists():
+        return shard_path
+
+    # Copied next to it first, so a crash while seeding does not leave a partial file that would be used afterwards.
+    seed_path = shard_path.with_name(f"{shard_path.name}.seed")
+    seed_path.unlink(missing_ok=True)
+
+    with path.open('rb') as file:
+        is_sqlite = file.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+    if is_sqlite:
+        source = sqlite3.connect(path)
+        target = sqlite3.connect(seed_path)
+
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    else:
+        shutil.copyfile(path, seed_path)
+
+    seed_path.replace(shard_path)
+
+    return shard_path
+
+
+class ShardRouter:
+    """
+    Runs ``shards`` worker processes and routes every update to one of them by the hash of its ``user_id``.
+
+    Each worker is started as ``worker(index, shards, queue)`` and receives the updates as dictionaries (see
+    :meth:`telegram.TelegramObject.to_dict`) on ``queue``, followed by ``None`` when it should stop.
+
+    A worker that dies is restarted after ``restart_delay`` seconds on the same queue, so the updates routed to it in
+    the meantime are handled by the new one; only those the dead worker had already taken are lost.
+    """
+
+    def __init__(self, shards: int, worker: ShardWorker, restart_delay: float = RESTART_DELAY_SECONDS):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+
+        self.shards = shards
+        self.worker = worker
+        self.restart_delay = restart_delay
+        self.queues = [_context.Queue() for _ in range(shards)]
+        self.processes: list[BaseProcess] = []
+        self._stopping = threading.Event()
+        self._supervisor: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self.processes = [self._start_worker(index) for index in range(self.shards)]
+        self._supervisor = threading.Thread(target=self._supervise, name='shard-supervisor', daemon=True)
+        self._supervisor.start()
+
+        logger.info("Started %s shard workers", self.shards)
+
+    def _start_worker(self, index: int) -> BaseProcess:
+        process = _context.Process(
+            target=self.worker,
+            args=(index, self.shards, self.queues[index]),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        process.start()
+
+        return process
+
+    def _supervise(self) -> None:
+        while not self._stopping.is_set():
+            wait([process.sentinel for process in self.processes], timeout=1)
+
+            for index, process in enumerate(self.processes):
+                if process.is_alive() or self._stopping.is_set():
+                    continue
+
+                logger.error(
+                    "Shard worker %s exited with code %s, restarting it in %ss",
+                    process.name,
+                    process.exitcode,
+                    self.restart_delay,
+                )
+
+                if self._stopping.wait(self.restart_delay):
+                    return
+
+                self.processes[index] = self._start_worker(index)
+
+    def route(self, update: Update) -> int:
+        """
+        Sends an update to its worker.
+
+        :param update: Update: The update
+        :return: int: The index of the worker
+        """
+        shard = get_shard(get_ordering_key(update), self.shards)
+        self.queues[shard].put(update.to_dict())
+
+        return shard
+
+    async def handle_update(self, update: Update, _context: CallbackContext) -> None:
+        """A ``TypeHandler`` callback that routes every update of the front application."""
+        self.route(update)
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS) -> None:
+        """
+        Asks every worker to finish its pending updates and waits up to ``timeout`` seconds for them to exit.
+        """
+        self._stopping.set()
+
+        if self._supervisor:
+            self._supervisor.join()
+            self._supervisor = None
+
+        for queue in self.queues:
+            queue.put(None)
+
+        for process in self.processes:
+            process.join(timeout)
+
+            if process.is_alive():
+                logger.warning("Shard worker %s did not stop in time, terminating it", process.name)
+                process.terminate()
+                process.join()
+
+        self.processes.clear()
+        logger.info("Stopped shard workers")
+
+
+async def serve_shard(application: Application, queue: Any, drain_timeout: float | None = None) -> None:
+    """
+    Runs an application that receives its updates from a :class:`ShardRouter` instead of Telegram, until the router
+    stops it. The worker then drains its in-flight jobs (see :func:`utils.shutdown.drain_and_stop`).
+
+    :param application: Application: The worker's application
+    :param queue: The worker's queue
+    :param drain_timeout: float | None: How long in-flight jobs get to finish on shutdown in seconds
+    """
+    # The front process coordinates shutdown; a Ctrl+C in the terminal reaches the workers too and must not kill them
+    # before they have drained their updates.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async with application:
+        await application.start()
+
+        try:
+            while (data := await asyncio.to_thread(queue.get)) is not None:
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        finally:
+            await drain_and_stop(application, drain_timeout)
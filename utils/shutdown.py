@@ -0,0 +1,86 @@
+import asyncio
+import contextlib
+import signal
+from typing import Iterator
+
+from telegram.ext import Application
+
+from .activity import user_activity
+from .jobs import drain_user_jobs
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@contextlib.contextmanager
+def stop_on_signals(stop_event: asyncio.Event) -> Iterator[None]:
+    """
+    Sets ``stop_event`` on SIGINT and SIGTERM while the context is active.
+
+    :param stop_event: asyncio.Event: The event to set
+    """
+    loop = asyncio.get_running_loop()
+    stop_signals = []
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop_event.set)
+            stop_signals.append(signal_number)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on Windows or outside the main thread; ``stop_event`` still works.
+            pass
+
+    try:
+        yield
+    finally:
+        for signal_number in stop_signals:
+            loop.remove_signal_handler(signal_number)
+
+
+async def drain_and_stop(application: Application, drain_timeout: float | None) -> None:
+    """
+    Stops a running application gracefully. Call it once no new updates come in.
+
+    In-flight jobs get ``drain_timeout`` seconds to finish and are interrupted after that, to be resumed by the next
+    start. Updates that are still queued are then processed without starting new jobs, the sessions are flushed to
+    the persistence and the buffered user activity is written to the database.
+
+    :param application: Application: The running application
+    :param drain_timeout: float | None: How long to wait for in-flight jobs in seconds; ``None`` waits until they finish
+    """
+    async with drain_user_jobs(drain_timeout) as interrupted:
+        await application.stop()
+
+    await user_activity.flush()
+
+    logger.info("Stopped gracefully (%s job(s) interrupted)", interrupted)
+
+
+async def run_polling(
+        application: Application,
+        drain_timeout: float | None = None,
+        stop_event: asyncio.Event | None = None,
+) -> None:
+    """
+    Runs the application in polling mode until SIGINT/SIGTERM is received or ``stop_event`` is set, then stops polling
+    and drains the in-flight jobs (see :func:`drain_and_stop`).
+
+    Unlike :meth:`telegram.ext.Application.run_polling`, which waits for every running handler however long it takes,
+    this bounds the shutdown so it fits into the container's stop grace period.
+
+    :param application: Application: The application to run
+    :param drain_timeout: float | None: How long in-flight jobs get to finish on shutdown in seconds
+    :param stop_event: asyncio.Event | None: An event that stops the application when set
+    """
+    stop_event = stop_event or asyncio.Event()
+
+    with stop_on_signals(stop_event):
+        async with application:
+            await application.start()
+            await application.updater.start_polling()
+
+            try:
+                await stop_event.wait()
+            finally:
+                await application.updater.stop()
+                await drain_and_stop(application, drain_timeout)
@@ -0,0 +1,332 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from config.envs import FFMPEG_MAX_QUEUE, FFMPEG_QUEUE_NOTIFY_AT, FFMPEG_WORKERS
+from .ffmpeg import FFmpegProgress, ProgressCallback
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+QueuePositionCallback = Callable[[int], Awaitable[object]]
+OperationFunction = Callable[..., Awaitable[None]]
+
+JOB_OVERHEAD_SECONDS = 0.3
+COST_SMOOTHING_FACTOR = 0.2
+AGING_RATE = 1.0
+
+
+class Operation(Enum):
+    CUT = 'cut'
+    CONVERT_BITRATE = 'convert_bitrate'
+    CONVERT_TO_VOICE = 'convert_to_voice'
+    CONVERT_M4A_TO_MP3 = 'convert_m4a_to_mp3'
+
+
+# Seconds of processing per second of audio, used until the first jobs of an operation have been measured.
+DEFAULT_REAL_TIME_FACTORS = {
+    Operation.CUT: 0.002,
+    Operation.CONVERT_BITRATE: 0.05,
+    Operation.CONVERT_TO_VOICE: 0.04,
+    Operation.CONVERT_M4A_TO_MP3: 0.05,
+}
+
+
+class TranscodingQueueFullError(Exception):
+    """Raised when a job is rejected because the transcoding queue is full."""
+
+
+_operation_functions: dict[Operation, OperationFunction] = {}
+
+
+def transcoding_operation(operation: Operation) -> Callable[[OperationFunction], OperationFunction]:
+    """
+    Registers the service function that performs an operation, so jobs can be run from their operation and
+    parameters alone, in this process or in a transcoding worker. The function must accept an ``on_progress`` keyword
+    argument.
+
+    :param operation: Operation: The operation the function performs
+    """
+
+    def decorator(function: OperationFunction) -> OperationFunction:
+        _operation_functions[operation] = function
+
+        return function
+
+    return decorator
+
+
+async def run_operation(
+        operation: Operation,
+        parameters: dict[str, Any],
+        on_progress: ProgressCallback | None = None,
+) -> None:
+    """
+    Runs the service function registered for an operation.
+
+    :param operation: Operation: The operation to run
+    :param parameters: dict[str, Any]: The keyword arguments of the service function
+    :param on_progress: ProgressCallback | None: Receives ffmpeg's progress
+    """
+    function = _operation_functions.get(operation)
+
+    if function is None:
+        raise RuntimeError(f"No service function is registered for {operation.value}")
+
+    await function(**parameters, on_progress=on_progress)
+
+
+@dataclass
+class OperationCost:
+    real_time_factor: float
+    samples: int = 0
+
+
+class CostModel:
+    """
+    Estimates how long a job takes from its operation and audio duration.
+
+    Each operation has a real-time factor (processing seconds per audio second) that starts at a conservative default
+    and is then learned as an exponential moving average of the measured jobs.
+    """
+
+    def __init__(self, smoothing_factor: float = COST_SMOOTHING_FACTOR):
+        self.smoothing_factor = smoothing_factor
+        self.costs = {
+            operation: OperationCost(real_time_factor=real_time_factor)
+            for operation, real_time_factor in DEFAULT_REAL_TIME_FACTORS.items()
+        }
+
+    def estimate(self, operation: Operation, duration: float) -> float:
+        """
+        :param operation: Operation: The operation of the job
+        :param duration: float: The duration of the audio to process in seconds
+        :return: float: The expected run time of the job in seconds
+        """
+        return JOB_OVERHEAD_SECONDS + self.costs[operation].real_time_factor * max(duration, 0)
+
+    def record(self, operation: Operation, duration: float, elapsed: float) -> None:
+        """
+        Feeds the measured run time of a finished job into the model.
+
+        :param operation: Operation: The operation of the job
+        :param duration: float: The duration of the processed audio in seconds
+        :param elapsed: float: The measured run time of the job in seconds
+        """
+        if duration <= 0:
+            return
+
+        self.record_real_time_factor(operation, max(elapsed - JOB_OVERHEAD_SECONDS, 0) / duration)
+
+    def record_real_time_factor(self, operation: Operation, measured: float) -> None:
+        """
+        Feeds the real-time factor of a finished job, as measured by ffmpeg's progress output, into the model.
+
+        :param operation: Operation: The operation of the job
+        :param measured: float: Seconds of processing per second of audio
+        """
+        cost = self.costs[operation]
+
+        if cost.samples:
+            cost.real_time_factor += self.smoothing_factor * (measured - cost.real_time_factor)
+        else:
+            cost.real_time_factor = measured
+
+        cost.samples += 1
+
+
+@dataclass(eq=False)
+class TranscodingJob:
+    operation: Operation
+    duration: float
+    started_at: float = field(default_factory=time.monotonic)
+    progress: FFmpegProgress | None = None
+
+    def observe(self, progress: FFmpegProgress) -> None:
+        """
+        Records the latest progress snapshot of the job's ffmpeg process.
+
+        :param progress: FFmpegProgress: The progress snapshot
+        """
+        self.progress = progress
+
+    @property
+    def percent(self) -> int | None:
+        """How much of the audio has been processed, or ``None`` if unknown."""
+        if not self.progress or self.duration <= 0:
+            return None
+
+        return min(int(self.progress.processed_seconds * 100 / self.duration), 100)
+
+
+@dataclass(eq=False)
+class _Waiter:
+    operation: Operation
+    expected_cost: float
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def priority(self, now: float) -> float:
+        # Shortest expected job first; every second spent waiting makes a job look one second shorter, so long jobs
+        # are not starved by a steady stream of short ones.
+        return self.expected_cost - AGING_RATE * (now - self.enqueued_at)
+
+
+class TranscodingScheduler:
+    """
+    Limits how many ffmpeg jobs run at once across the whole bot.
+
+    A job holds one of ``slots`` slots while it runs. When all slots are taken, up to ``max_queue`` jobs wait; a freed
+    slot goes to the waiting job with the shortest expected run time, adjusted for how long it has waited. Any job
+    beyond ``max_queue`` is rejected with :class:`TranscodingQueueFullError`, so the bot sheds load instead of
+    oversubscribing the CPU.
+    """
+
+    def __init__(self, slots: int, max_queue: int, notify_threshold: int, cost_model: CostModel | None = None):
+        if slots < 1:
+            raise ValueError("slots must be >= 1")
+
+        self.slots = slots
+        self.max_queue = max_queue
+        self.notify_threshold = notify_threshold
+        self.cost_model = cost_model or CostModel()
+        self.running = 0
+        self.jobs: set[TranscodingJob] = set()
+        self._waiters: list[_Waiter] = []
+
+    @property
+    def waiting(self) -> int:
+        """The number of jobs waiting for a free slot."""
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(
+            self,
+            operation: Operation,
+            duration: float,
+            on_queued: QueuePositionCallback | None = None,
+    ) -> AsyncIterator[TranscodingJob]:
+        """
+        Holds a transcoding slot for the duration of the ``async with`` block, waiting in the queue if none is free.
+
+        The block receives a :class:`TranscodingJob` whose progress can be observed while ffmpeg runs. When the block
+        exits without an error, the job's real-time factor is fed into the cost model; it is taken from the observed
+        progress if there is any and from the wall-clock run time otherwise.
+
+        :param operation: Operation: The operation the job performs
+        :param duration: float: The duration of the audio the job processes in seconds
+        :param on_queued: QueuePositionCallback | None: Called with the 1-based queue position when the job has to wait
+            behind at least ``notify_threshold`` other jobs
+        :raises TranscodingQueueFullError: The queue already holds ``max_queue`` jobs
+        """
+        await self._acquire(operation, duration, on_queued)
+        job = TranscodingJob(operation=operation, duration=duration)
+        self.jobs.add(job)
+
+        try:
+            yield job
+        finally:
+            self.jobs.discard(job)
+            self._release()
+
+        if job.progress and job.progress.real_time_factor is not None:
+            self.cost_model.record_real_time_factor(operation, job.progress.real_time_factor)
+        else:
+            self.cost_model.record(operation, duration, time.monotonic() - job.started_at)
+
+    async def _acquire(self, operation: Operation, duration: float, on_queued: QueuePositionCallback | None) -> None:
+        if self.running < self.slots and not self._waiters:
+            self.running += 1
+
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            logger.warning("Rejected transcoding job: %s running, %s waiting", self.running, len(self._waiters))
+
+            raise TranscodingQueueFullError(f"The transcoding queue is full ({self.max_queue} jobs)")
+
+        waiter = _Waiter(
+            operation=operation,
+            expected_cost=self.cost_model.estimate(operation, duration),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        now = time.monotonic()
+        position = 1 + sum(other.priority(now) <= waiter.priority(now) for other in self._waiters)
+        self._waiters.append(waiter)
+        logger.info(
+            "Queued %s job at position %s expected_cost=%.1fs",
+            operation.value,
+            position,
+            waiter.expected_cost
+        )
+
+        try:
+            if on_queued and position >= self.notify_threshold:
+                try:
+                    await on_queued(position)
+                except Exception:
+                    logger.warning("Failed to notify queue position %s", position, exc_info=True)
+
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over right before the cancellation, pass it on.
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+            raise
+
+    def _release(self) -> None:
+        now = time.monotonic()
+
+        while self._waiters:
+            waiter = min(self._waiters, key=lambda candidate: candidate.priority(now))
+            self._waiters.remove(waiter)
+
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+
+                return
+
+        self.running -= 1
+
+
+transcoding_scheduler = TranscodingScheduler(
+    slots=FFMPEG_WORKERS,
+    max_queue=FFMPEG_MAX_QUEUE,
+    notify_threshold=FFMPEG_QUEUE_NOTIFY_AT,
+)
+
+
+async def transcode(
+        operation: Operation,
+        duration: float,
+        parameters: dict[str, Any],
+        on_queued: QueuePositionCallback | None = None,
+        on_progress: ProgressCallback | None = None,
+) -> TranscodingJob:
+    """
+    Runs an operation in this process once :data:`transcoding_scheduler` has a free slot.
+
+    :param operation: Operation: The operation to run
+    :param duration: float: The duration of the audio to process in seconds
+    :param parameters: dict[str, Any]: The keyword arguments of the operation's service function
+    :param on_queued: QueuePositionCallback | None: Called with the queue position when the job has to wait
+    :param on_progress: ProgressCallback | None: Receives ffmpeg's progress
+    :raises TranscodingQueueFullError: The queue is full
+    :return: TranscodingJob: The finished job, with its last progress snapshot
+    """
+    async with transcoding_scheduler.slot(operation, duration, on_queued) as job:
+        async def observe(progress: FFmpegProgress) -> None:
+            job.observe(progress)
+
+            if on_progress:
+                await on_progress(progress)
+
+        await run_operation(operation, parameters, on_progress=observe)
+
+    return job
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from config.constants import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+from database.models import User
+
+UPDATE_USER_QUERY = """
+WITH updated AS (
+    UPDATE users SET {assignments}, updated_at = NOW() WHERE user_id = %s RETURNING *
+)
+SELECT * FROM updated
+"""
+
+
+@dataclass
+class UserCacheStats:
+    """Counts how often a looked up user was cached."""
+
+    hits: int = 0
+    misses: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else None
+
+
+class UserCache:
+    """
+    Keeps the ``users`` rows of recently active users, keyed by ``user_id``, so the handlers of one update do not read
+    the same row again and again.
+
+    A row is kept for ``ttl`` seconds after it was read or written, and the least recently used rows beyond
+    ``max_size`` are dropped. Writes through :func:`update_user` and ``utils.activity`` replace the cached row with the
+    written one; anything else that writes a user must :meth:`invalidate` it. It is also used by the database writes
+    that run in ``asyncio.to_thread`` workers, e.g. when a broadcast marks users as blocked, so all access is locked.
+
+    :param max_size: int: The maximum number of cached users
+    :param ttl: float: Seconds a row is used before it is read again
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = UserCacheStats()
+        self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: int, load: bool = True) -> User | None:
+        """
+        Get the row of a user, from the cache if it is there and fresh.
+
+        :param user_id: int: The user's ``user_id``
+        :param load: bool: Whether to read a missing row from the database
+        :return: User | None: The user, or ``None`` if they do not exist (or are not cached and ``load`` is false)
+        """
+        with self._lock:
+            cached = self._users.get(user_id)
+
+            if cached and time.monotonic() - cached[0] <= self.ttl:
+                self.stats.hits += 1
+                self._users.move_to_end(user_id)
+
+                return cached[1]
+
+            if cached:
+                del self._users[user_id]
+
+            self.stats.misses += 1
+
+        if not load:
+            return None
+
+        user = User.where('user_id', '=', user_id).first()
+
+        if user:
+            self.put(user)
+
+        return user
+
+    def put(self, user: User) -> None:
+        """
+        Caches the row of a user as it was just read or written.
+
+        :param user: User: The user
+        """
+        with self._lock:
+            self._users[user.user_id] = (time.monotonic(), user)
+            self._users.move_to_end(user.user_id)
+
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+                self.stats.evicted += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drops the row of a user, so it is read again on the next lookup.
+
+        :param user_id: int: The user's ``user_id``
+        """
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+def update_user(user_id: int, **values) -> User | None:
+    """
+    Updates columns of a user in one query, without reading the row first, and caches the updated row.
+
+    :param user_id: int: The user's ``user_id``
+    :param values: The columns to set and their values
+    :return: User | None: The updated user, or ``None`` if there is no such user
+    """
+    assignments = ", ".join(f"{column} = %s" for column in values)
+    users = User.statement(UPDATE_USER_QUERY.format(assignments=assignments), [*values.values(), user_id])
+    user = users.first() if users else None
+
+    if user:
+        user_cache.put(user)
+    else:
+        user_cache.invalidate(user_id)
+
+    return user
@@ -0,0 +1,226 @@
+import asyncio
+import hmac
+import json
+import secrets
+from urllib.parse import urlsplit
+
+import h11
+from telegram import Update
+from telegram.ext import Application
+
+from config.constants import HEALTH_CHECK_PATH
+from .logging import get_logger
+from .shutdown import drain_and_stop, stop_on_signals
+
+logger = get_logger(__name__)
+
+SECRET_TOKEN_HEADER = b'x-telegram-bot-api-secret-token'
+READ_CHUNK_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+KEEP_ALIVE_TIMEOUT_SECONDS = 75
+
+
+class WebhookServer:
+    """
+    A small HTTP/1.1 server that receives updates from Telegram and puts them into the ``update_queue`` of an
+    application. From there they are processed exactly like polled updates.
+
+    Requests to ``path`` must carry the secret token in the ``X-Telegram-Bot-Api-Secret-Token`` header. The same server
+    answers health checks on ``HEALTH_CHECK_PATH``. Connections are kept alive, so Telegram can reuse up to
+    ``max_connections`` of them instead of opening a new one per update.
+    """
+
+    def __init__(self, application: Application, path: str, secret_token: str, listen: str, port: int):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token.encode()
+        self.listen = listen
+        self.port = port
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        logger.info("Webhook server listening on %s:%s%s", self.listen, self.port, self.path)
+
+    async def stop(self) -> None:
+        if not self._server:
+            return
+
+        self._server.close()
+
+        for writer in list(self._writers):
+            writer.close()
+
+        await self._server.wait_closed()
+        self._server = None
+        logger.info("Webhook server stopped")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = h11.Connection(h11.SERVER)
+        self._writers.add(writer)
+
+        try:
+            while True:
+                request = await self._read_request(connection, reader)
+
+                if request is None:
+                    break
+
+                status, payload = await self._dispatch(*request)
+                body = json.dumps(payload).encode()
+                writer.write(connection.send(h11.Response(status_code=status, headers=[
+                    ('content-type', 'application/json'),
+                    ('content-length', str(len(body))),
+                ])))
+                writer.write(connection.send(h11.Data(data=body)))
+                writer.write(connection.send(h11.EndOfMessage()))
+                await writer.drain()
+
+                if connection.our_state is not h11.DONE or connection.their_state is not h11.DONE:
+                    break
+
+                connection.start_next_cycle()
+        except (h11.ProtocolError, ConnectionError, asyncio.TimeoutError) as error:
+            logger.debug("Closing webhook connection: %r", error)
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_request(
+            self,
+            connection: h11.Connection,
+            reader: asyncio.StreamReader,
+    ) -> tuple[h11.Request, bytes | None] | None:
+        """
+        Reads the next request of a connection.
+
+        :return: The request and its body, where the body is ``None`` if it exceeded ``MAX_BODY_SIZE``; ``None`` if
+            the client closed the connection
+        """
+        request = None
+        body = bytearray()
+
+        while True:
+            event = connection.next_event()
+
+            if event is h11.NEED_DATA:
+                connection.receive_data(
+                    await asyncio.wait_for(reader.read(READ_CHUNK_SIZE), timeout=KEEP_ALIVE_TIMEOUT_SECONDS)
+                )
+            elif isinstance(event, h11.Request):
+                request = event
+            elif isinstance(event, h11.Data):
+                body += event.data
+
+                if len(body) > MAX_BODY_SIZE:
+                    return request, None
+            elif isinstance(event, h11.EndOfMessage):
+                return request, bytes(body)
+            elif isinstance(event, h11.ConnectionClosed):
+                return None
+
+    async def _dispatch(self, request: h11.Request, body: bytes | None) -> tuple[int, dict]:
+        target = request.target.decode(errors='replace').split('?', 1)[0]
+
+        if target == HEALTH_CHECK_PATH:
+            if request.method != b'GET':
+                return 405, {'ok': False, 'description': 'Method not allowed'}
+
+            return self._health()
+
+        if target != self.path:
+            return 404, {'ok': False, 'description': 'Not found'}
+
+        if request.method != b'POST':
+            return 405, {'ok': False, 'description': 'Method not allowed'}
+
+        secret_token = dict(request.headers).get(SECRET_TOKEN_HEADER, b'')
+
+        if not hmac.compare_digest(secret_token, self.secret_token):
+            logger.warning("Rejected webhook request with an invalid secret token")
+
+            return 403, {'ok': False, 'description': 'Invalid secret token'}
+
+        if body is None:
+            return 413, {'ok': False, 'description': 'Request body too large'}
+
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as error:
+            logger.warning("Rejected malformed webhook update: %r", error)
+
+            return 400, {'ok': False, 'description': 'Malformed update'}
+
+        await self.application.update_queue.put(update)
+
+        return 200, {'ok': True}
+
+    def _health(self) -> tuple[int, dict]:
+        running = self.application.running
+
+        return 200 if running else 503, {
+            'ok': running,
+            'pending_updates': self.application.update_queue.qsize(),
+        }
+
+
+async def run_webhook(
+        application: Application,
+        url: str,
+        listen: str,
+        port: int,
+        secret_token: str = '',
+        max_connections: int = 40,
+        drain_timeout: float | None = None,
+        stop_event: asyncio.Event | None = None,
+) -> None:
+    """
+    Runs the application in webhook mode until SIGINT/SIGTERM is received or ``stop_event`` is set, then stops serving
+    and drains the in-flight jobs (see :func:`utils.shutdown.drain_and_stop`).
+
+    The webhook is registered with Telegram on start. Without a ``secret_token`` a random one is generated, since the
+    webhook is registered again on every start anyway.
+
+    :param application: Application: The application to run
+    :param url: str: The public HTTPS URL Telegram sends updates to; its path is served by the local server
+    :param listen: str: The address to listen on
+    :param port: int: The port to listen on
+    :param secret_token: str: The secret token Telegram sends along with every update
+    :param max_connections: int: The maximum number of simultaneous connections Telegram opens to the server (1-100)
+    :param drain_timeout: float | None: How long in-flight jobs get to finish on shutdown in seconds
+    :param stop_event: asyncio.Event | None: An event that stops the application when set
+    """
+    if not url:
+        raise ValueError("A webhook URL is required in webhook mode")
+
+    secret_token = secret_token or secrets.token_urlsafe(32)
+    stop_event = stop_event or asyncio.Event()
+    server = WebhookServer(
+        application,
+        path=urlsplit(url).path or '/',
+        secret_token=secret_token,
+        listen=listen,
+        port=port,
+    )
+
+    with stop_on_signals(stop_event):
+        async with application:
+            await application.start()
+            await server.start()
+
+            try:
+                await application.bot.set_webhook(
+                    url=url,
+                    secret_token=secret_token,
+                    max_connections=max_connections,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+                logger.info("Webhook set to %s (max_connections=%s)", url, max_connections)
+
+                await stop_event.wait()
+            finally:
+                # Stop accepting updates first, so the ones already queued are all processed before the application
+                # stops.
+                await server.stop()
+                await drain_and_stop(application, drain_timeout)